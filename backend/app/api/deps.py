@@ -5,16 +5,21 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.database import AsyncSessionLocal
+from app.db.database import get_sessionmaker
 from app.core.security import decode_access_token, TokenData
+from app.services.instagram import CacheManager
 
 # HTTP Bearer token scheme
 security_scheme = HTTPBearer(auto_error=False)
 
+# Shared by every request so they reuse one Redis pool and stats recorder
+_cache_manager: Optional[CacheManager] = None
+
 
 async def get_db() -> Generator:
     """Get async database session"""
-    async with AsyncSessionLocal() as session:
+    SessionLocal = get_sessionmaker()
+    async with SessionLocal() as session:
         try:
             yield session
             await session.commit()
@@ -74,7 +79,16 @@ async def get_current_user_optional(
     return decode_access_token(token)
 
 
+def get_cache_manager() -> CacheManager:
+    """Get the process-wide cache manager"""
+    global _cache_manager
+    if _cache_manager is None:
+        _cache_manager = CacheManager()
+    return _cache_manager
+
+
 # Common dependency aliases
 CurrentUser = Depends(get_current_user)
 OptionalCurrentUser = Depends(get_current_user_optional)
 DBSession = Depends(get_db)
+Cache = Depends(get_cache_manager)
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, HTTPException, status
+from typing import Dict, Any
+
+from app.api.deps import Cache, CurrentUser
+from app.core.security import TokenData
+from app.services.instagram import CacheManager
+
+router = APIRouter()
+
+
+@router.get("/stats", response_model=Dict[str, Any])
+async def get_cache_stats(
+    current_user: TokenData = CurrentUser, cache: CacheManager = Cache
+):
+    """Cache hit ratio, sizes and evictions (O(1) in Redis, safe to poll)."""
+    return await cache.get_stats()
+
+
+@router.delete("/negative", response_model=Dict[str, Any])
+async def purge_negative_cache(
+    current_user: TokenData = CurrentUser, cache: CacheManager = Cache
+):
+    """Purge every cached not-found / non-business account lookup."""
+    deleted = await cache.purge_negative()
+    if deleted is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Redis unavailable",
+        )
+    return {"deleted": deleted}
+
+
+@router.delete("/negative/{username}", response_model=Dict[str, Any])
+async def purge_negative_cache_entry(
+    username: str,
+    current_user: TokenData = CurrentUser,
+    cache: CacheManager = Cache,
+):
+    """Purge the cached lookup failure for one username."""
+    if not await cache.invalidate_negative(username):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Redis unavailable",
+        )
+    return {"username": username, "deleted": True}
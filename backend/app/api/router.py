@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.endpoints import analysis, influencers, brands, health
+from app.api.endpoints import analysis, influencers, brands, health, cache
 
 api_router = APIRouter()
 
@@ -10,3 +10,4 @@ api_router.include_router(
     influencers.router, prefix="/influencers", tags=["influencers"]
 )
 api_router.include_router(brands.router, prefix="/brands", tags=["brands"])
+api_router.include_router(cache.router, prefix="/cache", tags=["cache"])
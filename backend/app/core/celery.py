@@ -36,4 +36,8 @@ celery_app.conf.beat_schedule = {
         "task": "app.services.analysis.worker.cleanup_expired_data",
         "schedule": 86400.0,  # Run once per day
     },
+    "warm-cache": {
+        "task": "app.services.analysis.worker.warm_cache_task",
+        "schedule": settings.CACHE_WARM_INTERVAL_MINUTES * 60.0,
+    },
 }
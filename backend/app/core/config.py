@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import List
+from typing import Dict, List
 import os
 
 
@@ -29,6 +29,62 @@ class Settings(BaseSettings):
     INSTAGRAM_BUSINESS_ACCOUNT_ID: str = ""
     INSTAGRAM_API_BASE_URL: str = "https://graph.facebook.com/v18.0"
     INSTAGRAM_RATE_LIMIT_PER_HOUR: int = 200
+    # Extra "<access_token>:<business_account_id>" pairs pooled with the one
+    # above, each with its own rate limit bucket (JSON list in the env)
+    INSTAGRAM_CREDENTIALS: List[str] = []
+    # How long a throttled / rejected credential is left out of the pool
+    INSTAGRAM_CREDENTIAL_EJECT_SECONDS: int = 300
+    INSTAGRAM_CREDENTIAL_AUTH_EJECT_SECONDS: int = 3600
+    # Longest a call waits for rate limit capacity before giving up
+    INSTAGRAM_RATE_LIMIT_MAX_WAIT_SECONDS: int = 300
+    # Adapt each rate limit bucket to the usage the Graph API reports in the
+    # X-App-Usage / X-Business-Use-Case-Usage headers, keeping it under the
+    # target percentage with an hourly capacity between the bounds
+    INSTAGRAM_USAGE_ADAPTIVE: bool = True
+    INSTAGRAM_USAGE_TARGET_PERCENT: int = 85
+    INSTAGRAM_ADAPTIVE_MIN_CALLS_PER_HOUR: int = 20
+    INSTAGRAM_ADAPTIVE_MAX_CALLS_PER_HOUR: int = 400
+    # Capacity moves at most one step per interval, however many responses
+    INSTAGRAM_ADAPTIVE_INTERVAL_SECONDS: int = 60
+    # Share of each rate limit bucket guaranteed to each priority lane. A lane
+    # may borrow idle tokens from the others, but not below this fraction of
+    # their share
+    INSTAGRAM_PRIORITY_SHARES: Dict[str, float] = {
+        "interactive": 0.75,
+        "background": 0.25,
+    }
+    INSTAGRAM_PRIORITY_FLOOR: float = 0.5
+    # While Redis is down, the processes of a host share a file-backed
+    # fallback bucket holding this fraction of the quota; keep it at most
+    # 1 / number of hosts
+    INSTAGRAM_DEGRADED_QUOTA_FRACTION: float = 0.5
+    INSTAGRAM_FALLBACK_BUCKET_DIR: str = "/tmp"
+    # Circuit breaker around Graph API calls, shared by all workers through
+    # Redis: opens when the error rate or slow-call rate over the window
+    # (once it has enough calls) crosses its threshold, fails fast while
+    # open, then lets a few probe calls through
+    INSTAGRAM_BREAKER_WINDOW_SECONDS: int = 60
+    INSTAGRAM_BREAKER_MIN_CALLS: int = 20
+    INSTAGRAM_BREAKER_FAILURE_RATE: float = 0.5
+    INSTAGRAM_BREAKER_SLOW_CALL_SECONDS: float = 10.0
+    INSTAGRAM_BREAKER_SLOW_CALL_RATE: float = 0.5
+    INSTAGRAM_BREAKER_OPEN_SECONDS: int = 30
+    INSTAGRAM_BREAKER_HALF_OPEN_PROBES: int = 3
+    # Retries across all workers are capped at this fraction of the successful
+    # calls in the breaker window, plus a floor for low traffic
+    INSTAGRAM_RETRY_BUDGET_RATIO: float = 0.1
+    INSTAGRAM_RETRY_BUDGET_MIN: int = 10
+    # Tokens reserved up front per profile an analysis job will fetch
+    INSTAGRAM_JOB_RESERVATION_PER_PROFILE: int = 1
+
+    # Instagram HTTP transport (shared pooled client)
+    INSTAGRAM_HTTP2: bool = True
+    INSTAGRAM_HTTP_TIMEOUT_SECONDS: float = 30.0
+    INSTAGRAM_HTTP_MAX_CONNECTIONS: int = 20
+    INSTAGRAM_HTTP_MAX_KEEPALIVE: int = 10
+    INSTAGRAM_HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 60.0
+    # Cross-worker fetch lease; expires if the holder crashes
+    INSTAGRAM_FETCH_LOCK_SECONDS: int = 60
 
     # Security
     JWT_SECRET: str = "your-secret-key-change-in-production"
@@ -42,7 +98,50 @@ class Settings(BaseSettings):
     # Analysis Settings
     ANALYSIS_MAX_INFLUENCERS: int = 5
     ANALYSIS_MEDIA_LIMIT: int = 20
+    # Posts analyzed per profile. Above ANALYSIS_MEDIA_LIMIT, further media
+    # pages are fetched (one rate limit token each), e.g. 300 for deep analyses
+    ANALYSIS_MAX_POSTS: int = 20
+    # Analysis pipeline (see AnalysisOrchestrator.run_pipeline): influencer
+    # fetches (or batch prefetches) in flight at once, usernames per batch
+    # prefetch, items buffered between stages and profiles persisted per commit
+    ANALYSIS_INFLUENCER_CONCURRENCY: int = 5
+    ANALYSIS_PIPELINE_FETCH_CHUNK: int = 10
+    ANALYSIS_PIPELINE_QUEUE_SIZE: int = 10
+    ANALYSIS_PERSIST_BATCH_SIZE: int = 20
+    # Processes per worker extracting features off the event loop (0 = inline)
+    ANALYSIS_FEATURE_WORKERS: int = 2
+    INSTAGRAM_MEDIA_PAGE_SIZE: int = 25  # Business Discovery max per page
+    # First page size when only posts newer than stored snapshots are needed
+    INSTAGRAM_INCREMENTAL_PAGE_SIZE: int = 5
     CACHE_TTL_PROFILE_HOURS: int = 6
     CACHE_TTL_MEDIA_HOURS: int = 1
+    # Entries past their TTL are still served (and refreshed in the background)
+    # for this long before they are dropped
+    CACHE_STALE_GRACE_HOURS: int = 6
+    # Not-found / non-business accounts are remembered for this long
+    CACHE_TTL_NEGATIVE_MINUTES: int = 30
+    # Per-host SQLite fallback tier used while Redis is unavailable
+    CACHE_DISK_ENABLED: bool = True
+    CACHE_DISK_PATH: str = "/tmp/ig_cache.sqlite3"
+
+    # Cache warming (beat task): refresh the most analyzed profiles before
+    # they expire. Runs in the background rate limit lane: it never waits
+    # for tokens and skips profiles when there is no spare quota
+    CACHE_WARM_INTERVAL_MINUTES: int = 30
+    CACHE_WARM_LOOKBACK_DAYS: int = 14
+    CACHE_WARM_MAX_PROFILES: int = 100
+    CACHE_WARM_MARGIN_MINUTES: int = 45
+    # Derived analysis features are keyed by content, so they can live long
+    CACHE_TTL_FEATURES_HOURS: int = 24 * 7
+    # Cache hit/miss counters are buffered in-process and flushed this often
+    CACHE_STATS_FLUSH_SECONDS: float = 10.0
+    # Cache entries larger than this are zlib-compressed
+    CACHE_COMPRESS_MIN_BYTES: int = 1024
+
+    # In-process L1 cache in front of Redis
+    CACHE_LOCAL_ENABLED: bool = True
+    CACHE_LOCAL_MAX_ENTRIES: int = 1000
+    CACHE_LOCAL_MAX_BYTES: int = 32 * 1024 * 1024
+    CACHE_LOCAL_MAX_TTL_SECONDS: int = 300
 
 settings = Settings()
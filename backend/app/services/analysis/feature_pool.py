@@ -0,0 +1,114 @@
+"""Process pool running feature extraction off the event loop
+
+extract_features (regex extraction, spam filtering, category classification,
+engagement metrics) is pure CPU work whose cost grows with caption volume.
+Run inline it blocks the worker's event loop, and with it rate limiter
+waits, DB I/O and every other job on that loop. Here it is handed to a
+per-process ProcessPoolExecutor instead.
+
+Only the fields extract_features reads are sent to the pool, as plain
+dicts, and the pool runs the same function, so results are identical to
+inline execution.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+import structlog
+
+from app.core.config import settings
+from app.services.analysis.features import extract_features
+
+logger = structlog.get_logger()
+
+# Post fields extract_features reads
+POST_FIELDS = (
+    "id",
+    "caption",
+    "comments_count",
+    "like_count",
+    "permalink",
+    "timestamp",
+)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_pid: Optional[int] = None
+# Set when pool processes cannot be started here (e.g. in a daemonic process)
+_pool_disabled = False
+
+
+def compact_posts(posts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Strip raw media dicts down to the fields extract_features reads"""
+    return [{k: p[k] for k in POST_FIELDS if k in p} for p in posts]
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    """This process's pool, or None when extraction runs inline"""
+    global _pool, _pool_pid
+
+    if _pool_disabled or settings.ANALYSIS_FEATURE_WORKERS <= 0:
+        return None
+    if _pool is not None and _pool_pid == os.getpid():
+        return _pool
+
+    # A pool inherited across fork belongs to the parent: start our own.
+    # Spawned (not forked) children don't inherit the event loop, Redis
+    # connections or locks held by other threads.
+    _pool = ProcessPoolExecutor(
+        max_workers=settings.ANALYSIS_FEATURE_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+    _pool_pid = os.getpid()
+    return _pool
+
+
+async def extract_features_offloaded(
+    posts: List[Dict[str, Any]], followers_count: int
+) -> Dict[str, Any]:
+    """
+    extract_features, run in the process pool.
+
+    Falls back to inline extraction when the pool is disabled
+    (ANALYSIS_FEATURE_WORKERS = 0) or unusable.
+
+    Args:
+        posts: Raw media dicts (InstagramMedia.raw_data)
+        followers_count: Profile follower count
+
+    Returns:
+        Same dict as extract_features
+    """
+    global _pool_disabled
+
+    pool = _get_pool()
+    if pool is None:
+        return extract_features(posts, followers_count)
+
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(
+            pool, extract_features, compact_posts(posts), followers_count
+        )
+    except BrokenProcessPool as e:
+        # A pool process died (e.g. OOM-killed): start a new pool next time
+        logger.warning("Feature pool broken, extracting inline", error=str(e))
+        shutdown_feature_pool(wait=False)
+    except (AssertionError, OSError) as e:
+        # Pool processes cannot be started from this process
+        logger.warning("Feature pool unavailable, extracting inline", error=str(e))
+        shutdown_feature_pool(wait=False)
+        _pool_disabled = True
+    return extract_features(posts, followers_count)
+
+
+def shutdown_feature_pool(wait: bool = True) -> None:
+    """Stop this process's pool (call on worker shutdown)"""
+    global _pool, _pool_pid
+
+    if _pool is not None and _pool_pid == os.getpid():
+        _pool.shutdown(wait=wait, cancel_futures=True)
+    _pool = None
+    _pool_pid = None
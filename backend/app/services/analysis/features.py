@@ -0,0 +1,164 @@
+"""Per-profile feature extraction and its content-addressed cache key
+
+The CPU-bound part of the analysis (hashtag/keyword extraction, spam
+filtering, category classification, engagement metrics and collaboration
+detection) depends only on a profile's media and follower count. It is
+computed here as a plain dict so it can be cached and reused whenever the
+media list is unchanged.
+"""
+
+import hashlib
+import inspect
+import json
+from dataclasses import asdict
+from typing import List, Dict, Any
+
+from app.services.analysis import text_processor, categories, engagement
+from app.services.analysis.text_processor import TextProcessor
+from app.services.analysis.categories import CategoryClassifier
+from app.services.analysis.engagement import EngagementCalculator
+
+# Bump when the shape of the extracted features changes
+FEATURE_SCHEMA_VERSION = 1
+
+
+def _pipeline_version() -> str:
+    """
+    Fingerprint of the code and data the features are derived from.
+
+    Hashes the source of the text processing, taxonomy (FASHION_CATEGORIES,
+    STOPWORDS, SPAM_HASHTAGS) and engagement modules, so any change to them
+    yields new cache keys and old entries simply age out.
+    """
+    digest = hashlib.sha256(str(FEATURE_SCHEMA_VERSION).encode())
+    for module in (text_processor, categories, engagement):
+        try:
+            digest.update(inspect.getsource(module).encode())
+        except (OSError, TypeError):
+            # Source unavailable (e.g. bytecode-only install): fall back to
+            # the data the module exposes
+            digest.update(module.__name__.encode())
+    digest.update(
+        repr(
+            sorted(
+                (slug, sorted(c.keywords), c.weight)
+                for slug, c in categories.FASHION_CATEGORIES.items()
+            )
+        ).encode()
+    )
+    digest.update(repr(sorted(text_processor.STOPWORDS)).encode())
+    digest.update(repr(sorted(text_processor.SPAM_HASHTAGS)).encode())
+    return digest.hexdigest()[:16]
+
+
+PIPELINE_VERSION = _pipeline_version()
+
+
+def feature_key(posts: List[Dict[str, Any]], followers_count: int) -> str:
+    """
+    Cache key for the features of a media list.
+
+    Covers each post's id, counters and the text the features are extracted
+    from, plus the follower count (engagement rates) and PIPELINE_VERSION.
+
+    Args:
+        posts: Raw media dicts (InstagramMedia.raw_data)
+        followers_count: Profile follower count
+
+    Returns:
+        Hex digest identifying the features
+    """
+    material = [
+        PIPELINE_VERSION,
+        followers_count,
+        [
+            (
+                p.get("id"),
+                p.get("like_count"),
+                p.get("comments_count"),
+                p.get("caption"),
+                p.get("permalink"),
+                p.get("timestamp"),
+            )
+            for p in posts
+        ],
+    ]
+    blob = json.dumps(material, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def extract_features(
+    posts: List[Dict[str, Any]], followers_count: int
+) -> Dict[str, Any]:
+    """
+    Extract the derived features of a profile.
+
+    Args:
+        posts: Raw media dicts (InstagramMedia.raw_data)
+        followers_count: Profile follower count
+
+    Returns:
+        Dict with filtered "hashtags", "keywords", "hashtag_frequency"
+        (top 20), top 3 "categories", "engagement" metrics, "top_posts" and
+        "collaboration_signals"
+    """
+    text = TextProcessor()
+
+    all_hashtags = []
+    all_keywords = []
+    posts_data = []
+    collab_signals = []
+
+    for media in posts:
+        caption = media.get("caption", "")
+        if caption:
+            all_hashtags.extend(text.extract_hashtags(caption))
+            all_keywords.extend(text.extract_keywords(caption))
+
+            # Detect collaborations
+            signals = text.detect_collaboration_signals(caption)
+            if signals["is_collaboration"]:
+                for mention in signals["mentions"]:
+                    collab_signals.append(
+                        {
+                            "brand_username": mention,
+                            "collaboration_type": signals["collaboration_type"]
+                            or "mention",
+                            "post_permalink": media.get("permalink", ""),
+                            "posted_at": media.get("timestamp", ""),
+                        }
+                    )
+
+        posts_data.append(
+            {
+                "id": media.get("id", ""),
+                "caption": caption,
+                "comments_count": media.get("comments_count", 0),
+                "like_count": media.get("like_count"),
+                "permalink": media.get("permalink", ""),
+                "posted_at": media.get("timestamp", ""),
+            }
+        )
+
+    # Filter spam hashtags
+    filtered_hashtags = text.filter_hashtags(all_hashtags)
+
+    # Classify categories
+    category_scores = CategoryClassifier().classify(filtered_hashtags, all_keywords)
+
+    engagement_metrics = EngagementCalculator.analyze_engagement(
+        posts_data, followers_count
+    )
+    top_posts = EngagementCalculator.get_top_posts(posts_data, followers_count, n=3)
+
+    return {
+        "hashtags": filtered_hashtags,
+        "keywords": all_keywords,
+        "hashtag_frequency": text.analyze_hashtag_frequency(
+            filtered_hashtags, top_n=20
+        ),
+        "categories": [slug for slug, _ in category_scores[:3]],
+        "engagement": asdict(engagement_metrics),
+        "top_posts": top_posts,
+        "collaboration_signals": collab_signals,
+    }
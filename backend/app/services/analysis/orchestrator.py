@@ -1,50 +1,190 @@
 """Analysis orchestrator - coordinates the entire analysis pipeline"""
 
-from typing import List, Dict, Any
+import asyncio
+import copy
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 from datetime import datetime
 import structlog
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.services.instagram import InstagramService
-from app.services.analysis import (
-    TextProcessor,
-    CategoryClassifier,
-    EngagementCalculator,
-    WeightedJaccardSimilarity,
-    ScoringEngine,
+from app.core.config import settings
+from app.services.instagram import (
+    CacheManager,
+    InstagramService,
+    InstagramProfile,
+    InstagramMedia,
+    InstagramAPIError,
+    AccountNotFoundError,
+    PrivateAccountError,
+    RateLimitExceeded,
 )
+from app.services.analysis import WeightedJaccardSimilarity, ScoringEngine
+from app.services.analysis.features import feature_key
+from app.services.analysis.feature_pool import extract_features_offloaded
 
 logger = structlog.get_logger()
 
+ROLE_BRAND = "brand"
+ROLE_INFLUENCER = "influencer"
+
+# Marks the end of a pipeline queue
+_DONE = object()
+
+
+@dataclass
+class AnalyzedProfile:
+    """One profile leaving the CPU stage of the pipeline, ready to persist"""
+
+    username: str  # as requested
+    role: str  # ROLE_BRAND or ROLE_INFLUENCER
+    data: Dict[str, Any]  # analyze_brand / analyze_influencer output
+    media: List[InstagramMedia]
+
 
 class AnalysisOrchestrator:
     """
     Orchestrates the entire brand-influencer analysis pipeline.
 
-    Pipeline steps:
-    1. Fetch brand profile
-    2. Extract brand hashtags/keywords
-    3. Classify brand categories
-    4. For each influencer:
-       a. Fetch profile with cache
-       b. Extract hashtags/keywords
-       c. Classify categories
-       d. Calculate engagement
-       e. Detect collaborations
-       f. Calculate similarity with brand
-       g. Calculate final score
-    5. Save results
+    run_pipeline() runs a job as overlapping stages connected by bounded
+    queues:
+    1. brand: fetch and analyze the brand profile (hashtags/keywords,
+       categories)
+    2. fetch: fetch influencer profiles with cache, in prefetched chunks,
+       at most ANALYSIS_INFLUENCER_CONCURRENCY at a time
+    3. cpu: once the brand is ready, analyze each influencer
+       a. Extract hashtags/keywords
+       b. Classify categories
+       c. Calculate engagement
+       d. Detect collaborations
+       e. Calculate similarity with brand
+       f. Calculate final score
+    4. persist: save results in batches
+
+    Feature extraction (1 and a-d) is cached per media content (see
+    features.py) and runs in a process pool (see feature_pool.py).
     """
 
-    def __init__(self, instagram_service: InstagramService, db_session: AsyncSession):
+    def __init__(
+        self,
+        instagram_service: InstagramService,
+        db_session: AsyncSession,
+        feature_cache: Optional[CacheManager] = None,
+    ):
         self.instagram = instagram_service
         self.db = db_session
-        self.text_processor = TextProcessor()
-        self.category_classifier = CategoryClassifier()
-        self.engagement_calculator = EngagementCalculator()
+        # None disables feature caching
+        self.feature_cache = feature_cache or instagram_service.cache
         self.similarity_calculator = WeightedJaccardSimilarity()
         self.scoring_engine = ScoringEngine()
+        # Profiles fetched up front via prefetch_profiles()
+        self._prefetched: Dict[str, Union[InstagramProfile, InstagramAPIError]] = {}
+        # Media already stored per username (MediaSnapshot); enables
+        # incremental refreshes that only fetch newer posts
+        self.known_media: Dict[str, List[InstagramMedia]] = {}
+
+    async def prefetch_profiles(self, usernames: List[str]) -> None:
+        """
+        Fetch all profiles for a job in as few batch round-trips as possible.
+
+        Later analyze_* calls use the prefetched profiles; usernames whose
+        batch sub-request failed transiently fall back to a single fetch.
+        """
+        self._prefetched.update(
+            await self.instagram.get_profiles_with_cache(
+                usernames,
+                media_limit=settings.ANALYSIS_MEDIA_LIMIT,
+                use_cache=True,
+                known_media=self.known_media,
+            )
+        )
+
+    async def _get_profile(self, username: str) -> InstagramProfile:
+        """Get a prefetched profile, or fetch it individually"""
+        outcome = self._prefetched.pop(username, None)
+        if isinstance(outcome, (AccountNotFoundError, PrivateAccountError)):
+            raise outcome
+
+        if isinstance(outcome, InstagramProfile):
+            profile = outcome
+        else:
+            profile = await self.instagram.get_profile_with_cache(
+                username,
+                media_limit=settings.ANALYSIS_MEDIA_LIMIT,
+                use_cache=True,
+                known_media=self.known_media.get(username),
+            )
+
+        if (
+            settings.ANALYSIS_MAX_POSTS > len(profile.media)
+            and profile.media_after_cursor
+        ):
+            # Profiles may be shared with the cache: extend a copy. Without
+            # a cursor (no more posts, or media merged by an incremental
+            # refresh) the profile is used as it is, not re-paged from the
+            # newest post.
+            profile = copy.copy(profile)
+            profile.media = await self._more_media(username, profile)
+
+        return profile
+
+    async def _more_media(
+        self, username: str, profile: InstagramProfile
+    ) -> List[InstagramMedia]:
+        """
+        Page past the profile's first media page, up to ANALYSIS_MAX_POSTS.
+
+        Continues from the profile's media cursor, which is cached along
+        with the media, so only posts past the first page are fetched. A
+        failing page stops paging; the posts fetched so far are kept.
+        """
+        cap = settings.ANALYSIS_MAX_POSTS
+        media = list(profile.media)
+        seen = {m.id for m in media}
+        pages = self.instagram.iter_media_pages(
+            username, max_posts=cap - len(media), after=profile.media_after_cursor
+        )
+        try:
+            async with aclosing(pages):
+                async for page in pages:
+                    media.extend(m for m in page if m.id not in seen)
+                    seen.update(m.id for m in page)
+        except (InstagramAPIError, RateLimitExceeded) as e:
+            logger.warning(
+                "Media paging stopped early",
+                username=username,
+                posts=len(media),
+                error=str(e),
+            )
+        return media[:cap]
+
+    async def _get_features(self, profile: InstagramProfile) -> Dict[str, Any]:
+        """Derived features for a profile, reused while its media is unchanged"""
+        posts = [m.raw_data for m in profile.media]
+        key = feature_key(posts, profile.followers_count)
+
+        if self.feature_cache is not None:
+            features = await self.feature_cache.get_features(key)
+            if features is not None:
+                logger.debug("Using cached features", username=profile.username)
+                return features
+
+        # Off the event loop: caption volume must not stall other coroutines
+        features = await extract_features_offloaded(posts, profile.followers_count)
+        if self.feature_cache is not None:
+            await self.feature_cache.set_features(key, features)
+        return features
 
     async def analyze_brand(self, username: str) -> Dict[str, Any]:
         """
@@ -56,37 +196,15 @@ class AnalysisOrchestrator:
         logger.info("Analyzing brand", username=username)
 
         # Fetch brand profile
-        profile = await self.instagram.get_profile_with_cache(
-            username, media_limit=20, use_cache=True
-        )
-
-        # Extract hashtags from all captions
-        all_hashtags = []
-        all_keywords = []
-        captions = []
-
-        for media in profile.media:
-            if media.caption:
-                hashtags = self.text_processor.extract_hashtags(media.caption)
-                keywords = self.text_processor.extract_keywords(media.caption)
-
-                all_hashtags.extend(hashtags)
-                all_keywords.extend(keywords)
-                captions.append(media.caption)
+        profile = await self._get_profile(username)
 
-        # Filter spam hashtags
-        filtered_hashtags = self.text_processor.filter_hashtags(all_hashtags)
+        features = await self._get_features(profile)
+        return self._brand_data(profile, features)
 
-        # Get hashtag frequency
-        hashtag_freq = self.text_processor.analyze_hashtag_frequency(
-            filtered_hashtags, top_n=20
-        )
-
-        # Classify categories
-        category_scores = self.category_classifier.classify(
-            filtered_hashtags, all_keywords
-        )
-        categories = [slug for slug, _ in category_scores[:3]]  # Top 3 categories
+    def _brand_data(
+        self, profile: InstagramProfile, features: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        categories = features["categories"]
 
         return {
             "username": profile.username,
@@ -94,9 +212,11 @@ class AnalysisOrchestrator:
             "media_count": profile.media_count,
             "biography": profile.biography,
             "categories": categories,
-            "top_hashtags": [{"hashtag": h, "count": c} for h, c in hashtag_freq],
-            "keywords": list(set(all_keywords))[:20],  # Top 20 unique keywords
-            "hashtags": filtered_hashtags,
+            "top_hashtags": [
+                {"hashtag": h, "count": c} for h, c in features["hashtag_frequency"]
+            ],
+            "keywords": list(set(features["keywords"]))[:20],  # Top 20 unique
+            "hashtags": features["hashtags"],
         }
 
     async def analyze_influencer(
@@ -115,73 +235,21 @@ class AnalysisOrchestrator:
         logger.info("Analyzing influencer", username=username)
 
         # Fetch influencer profile
-        profile = await self.instagram.get_profile_with_cache(
-            username, media_limit=20, use_cache=True
-        )
-
-        # Extract hashtags and keywords
-        all_hashtags = []
-        all_keywords = []
-        captions = []
-        posts_data = []
-
-        for media in profile.media:
-            if media.caption:
-                hashtags = self.text_processor.extract_hashtags(media.caption)
-                keywords = self.text_processor.extract_keywords(media.caption)
-
-                all_hashtags.extend(hashtags)
-                all_keywords.extend(keywords)
-                captions.append(media.caption)
-
-            posts_data.append(
-                {
-                    "id": media.id,
-                    "caption": media.caption,
-                    "comments_count": media.comments_count,
-                    "like_count": media.like_count,
-                    "permalink": media.permalink,
-                    "posted_at": media.timestamp,
-                }
-            )
+        profile = await self._get_profile(username)
 
-        # Filter hashtags
-        filtered_hashtags = self.text_processor.filter_hashtags(all_hashtags)
-
-        # Classify categories
-        category_scores = self.category_classifier.classify(
-            filtered_hashtags, all_keywords
-        )
-        categories = [slug for slug, _ in category_scores[:3]]
-
-        # Calculate engagement
-        engagement_metrics = self.engagement_calculator.analyze_engagement(
-            posts_data, profile.followers_count
-        )
-
-        # Detect collaborations
-        collab_signals = []
-        for media in profile.media:
-            if media.caption:
-                signals = self.text_processor.detect_collaboration_signals(
-                    media.caption
-                )
-                if signals["is_collaboration"]:
-                    for mention in signals["mentions"]:
-                        collab_signals.append(
-                            {
-                                "brand_username": mention,
-                                "collaboration_type": signals["collaboration_type"]
-                                or "mention",
-                                "post_permalink": media.permalink,
-                                "posted_at": media.timestamp,
-                            }
-                        )
+        features = await self._get_features(profile)
+        return self._influencer_data(profile, features, brand_data)
 
-        # Get top 3 posts by engagement
-        top_posts = self.engagement_calculator.get_top_posts(
-            posts_data, profile.followers_count, n=3
-        )
+    def _influencer_data(
+        self,
+        profile: InstagramProfile,
+        features: Dict[str, Any],
+        brand_data: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        filtered_hashtags = features["hashtags"]
+        all_keywords = features["keywords"]
+        categories = features["categories"]
+        avg_engagement_rate = features["engagement"]["avg_engagement_rate"]
 
         # Calculate similarity with brand
         similarity_result = self.similarity_calculator.calculate(
@@ -198,7 +266,7 @@ class AnalysisOrchestrator:
 
         # Calculate engagement quality score
         engagement_score = self.scoring_engine.calculate_engagement_score(
-            engagement_metrics.avg_engagement_rate, profile.followers_count
+            avg_engagement_rate, profile.followers_count
         )
 
         # Calculate final score
@@ -209,9 +277,7 @@ class AnalysisOrchestrator:
         )
 
         # Get hashtag distribution
-        hashtag_dist = dict(
-            self.text_processor.analyze_hashtag_frequency(filtered_hashtags, top_n=10)
-        )
+        hashtag_dist = dict(features["hashtag_frequency"][:10])
 
         return {
             "username": profile.username,
@@ -219,7 +285,7 @@ class AnalysisOrchestrator:
             "followers_count": profile.followers_count,
             "media_count": profile.media_count,
             "biography": profile.biography,
-            "avg_engagement_rate": engagement_metrics.avg_engagement_rate,
+            "avg_engagement_rate": avg_engagement_rate,
             "scores": {
                 "similarity_score": similarity_result["similarity_score"],
                 "engagement_score": engagement_score,
@@ -228,8 +294,151 @@ class AnalysisOrchestrator:
                 "grade": score_breakdown.grade,
             },
             "categories": categories,
-            "top_posts": top_posts,
-            "collaboration_signals": collab_signals[:10],  # Limit to 10
+            "top_posts": features["top_posts"],
+            "collaboration_signals": features["collaboration_signals"][:10],
             "hashtag_distribution": hashtag_dist,
             "common_hashtags_with_brand": similarity_result["common_hashtags"],
         }
+
+    async def run_pipeline(
+        self,
+        brand_username: str,
+        influencer_usernames: List[str],
+        persist: Callable[[List[AnalyzedProfile]], Awaitable[List[AnalyzedProfile]]],
+    ) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Analyze a brand and its influencers as a staged pipeline.
+
+        - Brand: fetched and analyzed on its own, while influencers are
+          fetched (batch-prefetched per ANALYSIS_PIPELINE_FETCH_CHUNK
+          usernames), so influencer fetches start before the brand is
+          analyzed. At most ANALYSIS_INFLUENCER_CONCURRENCY influencer
+          fetches or batch prefetches are in flight at once.
+        - CPU: influencer features and scores, in arrival order, once the
+          brand is analyzed (until then fetched influencers stay queued).
+        - Persistence: whatever is waiting is handed to ``persist`` as one
+          batch (up to ANALYSIS_PERSIST_BATCH_SIZE), so batches grow when
+          the database is the bottleneck.
+
+        Stages are connected by queues of ANALYSIS_PIPELINE_QUEUE_SIZE: a
+        slow stage blocks the one feeding it, which keeps memory bounded
+        for large jobs. A failing influencer is logged and skipped; a
+        failing brand fails the pipeline.
+
+        Args:
+            brand_username: Brand Instagram username
+            influencer_usernames: Influencer Instagram usernames
+            persist: Stores a batch and returns the profiles it stored;
+                raising fails the pipeline
+
+        Returns:
+            (brand data, stored influencer analyses)
+        """
+        queue_size = settings.ANALYSIS_PIPELINE_QUEUE_SIZE
+        fetched: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        analyzed: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+        chunk_size = settings.ANALYSIS_PIPELINE_FETCH_CHUNK
+        chunks: asyncio.Queue = asyncio.Queue()
+        for start in range(0, len(influencer_usernames), chunk_size):
+            chunks.put_nowait(influencer_usernames[start : start + chunk_size])
+
+        brand_data: Dict[str, Any] = {}
+        brand_ready = asyncio.Event()
+        # Graph API fetches in flight at once: batch prefetches of a chunk
+        # and per-influencer fetches (fallbacks and deeper media pages)
+        fetch_slots = asyncio.Semaphore(settings.ANALYSIS_INFLUENCER_CONCURRENCY)
+
+        async def brand_stage() -> None:
+            profile = await self._get_profile(brand_username)
+            features = await self._get_features(profile)
+            brand_data.update(self._brand_data(profile, features))
+            await analyzed.put(
+                AnalyzedProfile(brand_username, ROLE_BRAND, brand_data, profile.media)
+            )
+            brand_ready.set()
+
+        async def fetch_one(username: str) -> None:
+            async with fetch_slots:
+                try:
+                    outcome = await self._get_profile(username)
+                except Exception as e:
+                    outcome = e
+            await fetched.put((username, outcome))
+
+        async def fetch_stage() -> None:
+            async def fetch_chunks() -> None:
+                while not chunks.empty():
+                    chunk = chunks.get_nowait()
+                    try:
+                        async with fetch_slots:
+                            await self.prefetch_profiles(chunk)
+                    except Exception as e:
+                        logger.warning(
+                            "Batch prefetch failed, fetching individually",
+                            count=len(chunk),
+                            error=str(e),
+                        )
+                    await asyncio.gather(*(fetch_one(u) for u in chunk))
+
+            workers = min(settings.ANALYSIS_INFLUENCER_CONCURRENCY, chunks.qsize())
+            await asyncio.gather(*(fetch_chunks() for _ in range(workers)))
+            await fetched.put(_DONE)
+
+        async def cpu_stage() -> None:
+            # Scores need the brand; until it is analyzed, fetched influencers
+            # wait in the bounded queue and hold further fetches back
+            await brand_ready.wait()
+            while (item := await fetched.get()) is not _DONE:
+                username, outcome = item
+                try:
+                    if isinstance(outcome, Exception):
+                        raise outcome
+                    features = await self._get_features(outcome)
+                    data = self._influencer_data(outcome, features, brand_data)
+                except Exception as e:
+                    logger.error(
+                        "Failed to analyze influencer", username=username, error=str(e)
+                    )
+                    continue
+                logger.info("Analyzed influencer", username=username)
+                await analyzed.put(
+                    AnalyzedProfile(username, ROLE_INFLUENCER, data, outcome.media)
+                )
+            await analyzed.put(_DONE)
+
+        async def persist_stage() -> List[Dict[str, Any]]:
+            batch_size = settings.ANALYSIS_PERSIST_BATCH_SIZE
+            stored: List[Dict[str, Any]] = []
+            while True:
+                item = await analyzed.get()
+                batch: List[AnalyzedProfile] = []
+                while item is not _DONE:
+                    batch.append(item)
+                    if len(batch) >= batch_size or analyzed.empty():
+                        break
+                    item = analyzed.get_nowait()
+                if batch:
+                    stored.extend(
+                        p.data
+                        for p in await persist(batch)
+                        if p.role == ROLE_INFLUENCER
+                    )
+                if item is _DONE:
+                    return stored
+
+        tasks = [
+            asyncio.create_task(brand_stage()),
+            asyncio.create_task(fetch_stage()),
+            asyncio.create_task(cpu_stage()),
+            asyncio.create_task(persist_stage()),
+        ]
+        try:
+            *_, stored = await asyncio.gather(*tasks)
+        finally:
+            # One stage failed: stop the others instead of leaving them blocked,
+            # and let them unwind before returning
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return brand_data, stored
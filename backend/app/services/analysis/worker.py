@@ -1,11 +1,54 @@
 """Celery tasks for analysis"""
 
-from typing import List
+import asyncio
+from typing import List, Optional
 from celery import shared_task
+from celery.signals import worker_process_shutdown
+from sqlalchemy.ext.asyncio import AsyncSession
 import structlog
 
 logger = structlog.get_logger()
 
+# Long-lived event loop per worker process. Reusing it across tasks keeps the
+# shared Instagram HTTP client and the DB pool valid between tasks instead of
+# rebuilding them for every asyncio.run().
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _run_async(coro):
+    """Run a coroutine on this worker process's event loop"""
+    global _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        _worker_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_worker_loop)
+    return _worker_loop.run_until_complete(coro)
+
+
+@worker_process_shutdown.connect
+def _shutdown_worker_resources(**kwargs):
+    """Close pooled connections when the worker process exits"""
+    from app.db.database import dispose_engine_if_exists
+    from app.services.instagram.http import close_http_client
+    from app.services.instagram.rate_limiter import close_wakeup_listener
+    from app.services.analysis.feature_pool import shutdown_feature_pool
+
+    shutdown_feature_pool()
+
+    if _worker_loop is None or _worker_loop.is_closed():
+        return
+
+    async def shutdown():
+        await close_wakeup_listener()
+        await close_http_client()
+        await dispose_engine_if_exists()
+
+    try:
+        _worker_loop.run_until_complete(shutdown())
+    except Exception as e:
+        logger.warning("Error closing worker resources", error=str(e))
+    finally:
+        _worker_loop.close()
+
 
 @shared_task(bind=True, max_retries=3)
 def analyze_influencers_task(
@@ -19,14 +62,13 @@ def analyze_influencers_task(
         brand_username: Brand Instagram username
         influencer_usernames: List of influencer usernames to analyze
     """
-    import asyncio
     from sqlalchemy import select, update
-    from sqlalchemy.ext.asyncio import AsyncSession
     from datetime import datetime, timedelta
 
+    from app.core.config import settings
     from app.db.database import get_sessionmaker, get_engine, Base
     from app.models import AnalysisJob, AnalysisResult, InfluencerProfile, BrandProfile
-    from app.services.instagram import InstagramService
+    from app.services.instagram import InstagramService, drain_background_refreshes
     from app.services.analysis.orchestrator import AnalysisOrchestrator
 
     logger.info(
@@ -45,52 +87,34 @@ def analyze_influencers_task(
             logger.warning("create_all failed (continuing)", error=str(e))
 
         SessionLocal = get_sessionmaker()
-        async with SessionLocal() as db:
-            instagram_service = InstagramService()
+        instagram_service = InstagramService()
+        # Set the job's quota aside up front; what cache hits leave unused is
+        # returned when the job ends
+        reservation = instagram_service.reserve_quota(
+            (1 + len(influencer_usernames))
+            * settings.INSTAGRAM_JOB_RESERVATION_PER_PROFILE
+        )
+        async with SessionLocal() as db, reservation:
             orchestrator = AnalysisOrchestrator(instagram_service, db)
 
             try:
                 # Mark job as running
                 await _mark_job_running(db, job_id)
 
-                # 1. Analyze brand
-                logger.info("Analyzing brand", job_id=job_id, brand=brand_username)
-                brand_data = await orchestrator.analyze_brand(brand_username)
-
-                # Upsert brand profile minimal info
-                brand_profile = await _upsert_brand_profile(db, brand_data)
-
-                # 2. Analyze each influencer
-                results = []
-                total = len(influencer_usernames)
-
-                for idx, username in enumerate(influencer_usernames):
-                    # Update progress
-                    progress = int((idx / total) * 100)
-                    logger.info(
-                        "Analyzing influencer",
-                        job_id=job_id,
-                        username=username,
-                        progress=progress,
-                    )
-
-                    try:
-                        result = await orchestrator.analyze_influencer(
-                            username, brand_data
-                        )
-                        results.append(result)
-
-                        # Upsert influencer profile and persist analysis result
-                        influencer = await _upsert_influencer_profile(db, result)
-                        await _store_analysis_result(db, job_id, influencer.id, result)
-                    except Exception as e:
-                        logger.error(
-                            "Failed to analyze influencer",
-                            job_id=job_id,
-                            username=username,
-                            error=str(e),
-                        )
-                        # Continue with other influencers
+                # Stored media lets cache misses refresh incrementally
+                orchestrator.known_media = await _load_known_media(
+                    db, [brand_username, *influencer_usernames]
+                )
+
+                # Fetch, analyze and persist as overlapping stages; only the
+                # persistence stage uses the session
+                async def persist(batch):
+                    return await _store_analyzed_batch(db, job_id, batch)
+
+                logger.info("Running analysis pipeline", job_id=job_id)
+                _, results = await orchestrator.run_pipeline(
+                    brand_username, influencer_usernames, persist
+                )
 
                 # Sort by final score descending
                 results.sort(key=lambda x: x["scores"]["final_score"], reverse=True)
@@ -115,17 +139,22 @@ def analyze_influencers_task(
 
     # Run async function in sync Celery task
     try:
-        result = asyncio.run(run_analysis())
-        return result
+        result = _run_async(run_analysis())
     except Exception as exc:
         logger.error("Task failed, retrying", error=str(exc))
         raise self.retry(exc=exc, countdown=60)
 
+    # The loop only runs while a task does: let stale-cache refreshes
+    # started by this job finish instead of pausing until the next one
+    pending = _run_async(drain_background_refreshes())
+    if pending:
+        logger.info("Background refreshes still running", count=pending)
+    return result
+
 
 @shared_task
 def cleanup_expired_data():
     """Periodic task to clean up expired data (runs daily)"""
-    import asyncio
     from sqlalchemy import text
     from app.db.database import AsyncSessionLocal
     from datetime import datetime, timedelta
@@ -155,10 +184,38 @@ def cleanup_expired_data():
 
             await db.commit()
 
-    asyncio.run(cleanup())
+    _run_async(cleanup())
     logger.info("Cleanup completed")
 
 
+@shared_task
+def warm_cache_task():
+    """Periodic task refreshing frequently analyzed profiles before they expire"""
+    from datetime import datetime, timedelta
+
+    from app.core.config import settings
+    from app.db.database import get_sessionmaker
+    from app.services.instagram import InstagramService
+
+    async def warm():
+        since = datetime.utcnow() - timedelta(days=settings.CACHE_WARM_LOOKBACK_DAYS)
+        SessionLocal = get_sessionmaker()
+        async with SessionLocal() as db:
+            usernames = await _rank_usernames_for_warming(
+                db, since, settings.CACHE_WARM_MAX_PROFILES
+            )
+            known_media = await _load_known_media(db, usernames)
+
+        return await InstagramService().warm_profiles(
+            usernames,
+            media_limit=settings.ANALYSIS_MEDIA_LIMIT,
+            known_media=known_media,
+        )
+
+    logger.info("Starting cache warming")
+    return _run_async(warm())
+
+
 # --------------------
 # Helper async functions
 # --------------------
@@ -188,6 +245,47 @@ async def _mark_job_done(db: AsyncSession, job_id: str, api_calls_used: int | No
     await db.commit()
 
 
+async def _store_analyzed_batch(db: AsyncSession, job_id: str, batch: list) -> list:
+    """
+    Write a batch of analyzed profiles (AnalyzedProfile) in a single commit.
+
+    Each influencer is written under a savepoint, so one failing write only
+    drops that influencer; a failing brand write fails the batch.
+
+    Returns:
+        The profiles that were stored
+    """
+    from app.services.analysis.orchestrator import ROLE_BRAND
+
+    stored = []
+    for item in batch:
+        if item.role == ROLE_BRAND:
+            brand_profile = await _upsert_brand_profile(db, item.data)
+            await _store_media_snapshots(db, brand_profile.id, "brand", item.media)
+            stored.append(item)
+            continue
+        try:
+            async with db.begin_nested():
+                influencer = await _upsert_influencer_profile(db, item.data)
+                await _store_analysis_result(db, job_id, influencer.id, item.data)
+                await _store_media_snapshots(
+                    db, influencer.id, "influencer", item.media
+                )
+        except Exception as e:
+            logger.error(
+                "Failed to store influencer analysis",
+                job_id=job_id,
+                username=item.username,
+                error=str(e),
+            )
+            continue
+        stored.append(item)
+
+    await db.commit()
+    logger.info("Stored analysis batch", job_id=job_id, count=len(stored))
+    return stored
+
+
 async def _upsert_brand_profile(db: AsyncSession, brand_data: dict):
     from sqlalchemy import select
     from app.models import BrandProfile
@@ -217,7 +315,7 @@ async def _upsert_brand_profile(db: AsyncSession, brand_data: dict):
         brand.biography = brand_data.get("biography", brand.biography)
         brand.categories = brand_data.get("categories", brand.categories)
         brand.last_fetched_at = datetime.utcnow()
-    await db.commit()
+    await db.flush()
     return brand
 
 
@@ -257,7 +355,7 @@ async def _upsert_influencer_profile(db: AsyncSession, infl_data: dict):
         if infl_data.get("avg_engagement_rate") is not None:
             influencer.avg_engagement_rate = int(round(infl_data["avg_engagement_rate"] * 100))
         influencer.last_fetched_at = datetime.utcnow()
-    await db.commit()
+    await db.flush()
     return influencer
 
 
@@ -284,4 +382,109 @@ async def _store_analysis_result(
         common_hashtags=common_tags,
     )
     db.add(result)
-    await db.commit()
+    await db.flush()
+
+
+async def _load_known_media(db: AsyncSession, usernames: List[str]) -> dict:
+    """Load stored media snapshots per username as InstagramMedia lists"""
+    from sqlalchemy import select
+    from app.models import MediaSnapshot, BrandProfile, InfluencerProfile
+    from app.services.instagram import InstagramMedia
+
+    known: dict = {}
+    for profile_model, profile_type in (
+        (BrandProfile, "brand"),
+        (InfluencerProfile, "influencer"),
+    ):
+        rows = await db.execute(
+            select(profile_model.ig_username, MediaSnapshot)
+            .join(MediaSnapshot, MediaSnapshot.profile_id == profile_model.id)
+            .where(MediaSnapshot.profile_type == profile_type)
+            .where(profile_model.ig_username.in_(usernames))
+            .order_by(MediaSnapshot.posted_at.desc())
+        )
+        for username, snap in rows.all():
+            known.setdefault(username, []).append(
+                InstagramMedia(
+                    {
+                        "id": snap.ig_media_id,
+                        "caption": snap.caption,
+                        "comments_count": snap.comments_count or 0,
+                        "like_count": snap.like_count,
+                        "media_type": snap.media_type,
+                        "permalink": snap.permalink,
+                        "timestamp": snap.posted_at.strftime("%Y-%m-%dT%H:%M:%S%z")
+                        if snap.posted_at
+                        else "",
+                    }
+                )
+            )
+    return known
+
+
+async def _store_media_snapshots(
+    db: AsyncSession, profile_id, profile_type: str, media: list
+) -> None:
+    """Upsert media snapshots for a profile, refreshing counters of known posts"""
+    from sqlalchemy import select
+    from app.models import MediaSnapshot
+    from datetime import datetime, timedelta
+
+    if not media:
+        return
+
+    result = await db.execute(
+        select(MediaSnapshot)
+        .where(MediaSnapshot.profile_id == profile_id)
+        .where(MediaSnapshot.profile_type == profile_type)
+    )
+    existing = {snap.ig_media_id: snap for snap in result.scalars().all()}
+
+    now = datetime.utcnow()
+    for item in media:
+        snap = existing.get(item.id)
+        if snap is None:
+            db.add(
+                MediaSnapshot(
+                    profile_id=profile_id,
+                    profile_type=profile_type,
+                    ig_media_id=item.id,
+                    caption=item.caption,
+                    comments_count=item.comments_count,
+                    like_count=item.like_count,
+                    media_type=item.media_type,
+                    permalink=item.permalink,
+                    posted_at=item.posted_at,
+                    fetched_at=now,
+                    expires_at=now + timedelta(days=90),
+                )
+            )
+        else:
+            snap.comments_count = item.comments_count
+            snap.like_count = item.like_count
+            snap.fetched_at = now
+    await db.flush()
+
+
+async def _rank_usernames_for_warming(
+    db: AsyncSession, since, limit: int
+) -> List[str]:
+    """Usernames (brands and influencers) ranked by recent job appearances"""
+    from collections import Counter
+    from sqlalchemy import select
+    from app.models import AnalysisJob, BrandProfile
+
+    rows = await db.execute(
+        select(AnalysisJob.influencer_usernames, BrandProfile.ig_username)
+        .outerjoin(BrandProfile, BrandProfile.id == AnalysisJob.brand_profile_id)
+        .where(AnalysisJob.created_at >= since)
+    )
+
+    counts: Counter = Counter()
+    for influencer_usernames, brand_username in rows.all():
+        if brand_username:
+            counts[brand_username] += 1
+        for username in influencer_usernames or []:
+            counts[username] += 1
+
+    return [username for username, _ in counts.most_common(limit)]
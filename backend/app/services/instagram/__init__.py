@@ -8,13 +8,32 @@ from app.services.instagram.client import (
     RateLimitError,
     AccountNotFoundError,
     PrivateAccountError,
+    CredentialError,
+    ApiUsage,
+)
+from app.services.instagram.credentials import (
+    Credential,
+    CredentialPool,
+    NoActiveCredentialsError,
 )
 from app.services.instagram.rate_limiter import (
     TokenBucketRateLimiter,
     RateLimitExceeded,
+    Reservation,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_BACKGROUND,
 )
 from app.services.instagram.cache import CacheManager
-from app.services.instagram.service import InstagramService
+from app.services.instagram.cache_stats import CacheStats
+from app.services.instagram.local_cache import LocalTTLCache
+from app.services.instagram.disk_cache import DiskCache
+from app.services.instagram.host_bucket import HostBucket
+from app.services.instagram.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.services.instagram.http import get_http_client, close_http_client
+from app.services.instagram.service import (
+    InstagramService,
+    drain_background_refreshes,
+)
 
 __all__ = [
     # Client
@@ -25,11 +44,30 @@ __all__ = [
     "RateLimitError",
     "AccountNotFoundError",
     "PrivateAccountError",
+    "CredentialError",
+    "ApiUsage",
     # Rate Limiter
     "TokenBucketRateLimiter",
     "RateLimitExceeded",
+    "Reservation",
+    "PRIORITY_INTERACTIVE",
+    "PRIORITY_BACKGROUND",
+    "HostBucket",
+    # Circuit breaker
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "Credential",
+    "CredentialPool",
+    "NoActiveCredentialsError",
     # Cache
     "CacheManager",
+    "CacheStats",
+    "LocalTTLCache",
+    "DiskCache",
+    # HTTP transport
+    "get_http_client",
+    "close_http_client",
     # Service
     "InstagramService",
+    "drain_background_refreshes",
 ]
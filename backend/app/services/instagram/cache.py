@@ -1,20 +1,64 @@
 """Redis Cache Manager for Instagram API responses
 
 Implements caching strategy:
-- Profile data: 6 hours TTL
-- Media data: 1 hour TTL
+- Profile metadata: 6 hours TTL (CACHE_TTL_PROFILE_HOURS)
+- Media list: 1 hour TTL (CACHE_TTL_MEDIA_HOURS)
+- Negative entries (account not found / not a business account): 30 minutes
+  TTL (CACHE_TTL_NEGATIVE_MINUTES)
+- Derived analysis features, keyed by a hash of the media they were
+  extracted from: 7 days TTL (CACHE_TTL_FEATURES_HOURS)
+
+The TTLs above are soft: entries stay in Redis for a further
+CACHE_STALE_GRACE_HOURS so callers can serve them stale while refreshing.
+
+Profile metadata and media are stored under separate keys so each part
+expires, and is refreshed, on its own schedule. Values use the compact
+encoding from codec.py.
+
+Hit/miss/set counters are kept in Redis (see cache_stats.py) so get_stats
+never has to scan the keyspace.
+
+An optional in-process L1 tier (LocalTTLCache) sits in front of Redis.
+Writes and invalidations are broadcast over Redis pub/sub so other processes
+drop their L1 copies.
+
+An optional per-host disk tier (DiskCache) mirrors every write. While Redis
+is unreachable, reads are served from and writes kept on disk; the writes
+are replayed into Redis when it comes back.
 """
 
-import json
-from typing import Optional, Dict, Any
+import asyncio
+import sqlite3
+import uuid
+from typing import Optional, Dict, Any, List, Tuple, Awaitable
 from datetime import datetime, timedelta
 import redis.asyncio as redis
 import structlog
 
 from app.core.config import settings
+from app.services.instagram.cache_stats import CacheStats, get_cache_stats_recorder
+from app.services.instagram.codec import encode_entry, decode_entry
+from app.services.instagram.disk_cache import DiskCache, get_disk_cache
+from app.services.instagram.local_cache import LocalTTLCache, get_local_cache
 
 logger = structlog.get_logger()
 
+# Pub/sub channel carrying "<process id>|<cache key>" invalidations
+INVALIDATION_CHANNEL = "ig:cache:invalidate"
+_PROCESS_ID = uuid.uuid4().hex
+_listener_task: Optional[asyncio.Task] = None
+# Seconds between invalidation listener reconnect attempts (doubling)
+_LISTENER_MIN_BACKOFF = 1.0
+_LISTENER_MAX_BACKOFF = 60.0
+
+# Set while Redis is unreachable and the disk tier is serving instead
+_redis_down = False
+_resync_task: Optional[asyncio.Task] = None
+
+# Error kinds stored in negative cache entries
+NEGATIVE_NOT_FOUND = "not_found"
+NEGATIVE_PRIVATE = "private"
+
 
 class CacheManager:
     """Redis-based cache manager for Instagram API responses"""
@@ -22,23 +66,225 @@ class CacheManager:
     def __init__(
         self,
         redis_client: Optional[redis.Redis] = None,
-        profile_ttl_hours: int = 6,
-        media_ttl_hours: int = 1,
+        profile_ttl_hours: Optional[int] = None,
+        media_ttl_hours: Optional[int] = None,
+        local_cache: Optional[LocalTTLCache] = None,
+        stats: Optional[CacheStats] = None,
+        disk_cache: Optional[DiskCache] = None,
     ):
         self.redis = redis_client
-        self.profile_ttl = profile_ttl_hours * 3600  # Convert to seconds
-        self.media_ttl = media_ttl_hours * 3600
+        self.profile_ttl_hours = profile_ttl_hours or settings.CACHE_TTL_PROFILE_HOURS
+        self.media_ttl_hours = media_ttl_hours or settings.CACHE_TTL_MEDIA_HOURS
+        self.profile_ttl = self.profile_ttl_hours * 3600  # Convert to seconds
+        self.media_ttl = self.media_ttl_hours * 3600
+        # Extra Redis lifetime during which expired entries may be served stale
+        self.stale_grace = settings.CACHE_STALE_GRACE_HOURS * 3600
+        self.negative_ttl = settings.CACHE_TTL_NEGATIVE_MINUTES * 60
+        self.features_ttl = settings.CACHE_TTL_FEATURES_HOURS * 3600
+        # L1 tier shared by every CacheManager in the process (None = disabled)
+        self.local = local_cache or get_local_cache()
+        self.stats = stats or get_cache_stats_recorder()
+        # Per-host fallback tier used while Redis is down (None = disabled)
+        self.disk = disk_cache or get_disk_cache()
 
     async def _get_redis(self) -> redis.Redis:
         """Get or create Redis connection"""
         if self.redis is None:
             self.redis = redis.from_url(settings.REDIS_URL)
+        if self.local is not None:
+            self._ensure_invalidation_listener()
         return self.redis
 
     def _make_key(self, key_type: str, identifier: str) -> str:
         """Create cache key with prefix"""
         return f"ig:{key_type}:{identifier.lower()}"
 
+    @staticmethod
+    def is_stale(entry: Optional[Dict[str, Any]], margin_seconds: float = 0) -> bool:
+        """
+        Whether a cache entry is past its soft TTL (but not yet evicted).
+
+        Args:
+            entry: Cache entry
+            margin_seconds: Also count entries expiring within this many seconds
+        """
+        if not entry or not entry.get("expires_at"):
+            return False
+        try:
+            expires_at = datetime.fromisoformat(entry["expires_at"])
+        except (TypeError, ValueError):
+            return False
+        return expires_at <= datetime.utcnow() + timedelta(seconds=margin_seconds)
+
+    # --------------------
+    # Tiered get/set/delete
+    # --------------------
+
+    async def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Read an entry from L1, then Redis (filling L1 on a Redis hit)"""
+        return (await self._get_many([key]))[key]
+
+    async def _get_many(self, keys: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Read entries from L1, then the rest from Redis in a single MGET"""
+        results: Dict[str, Optional[Dict[str, Any]]] = {}
+        remote: List[str] = []
+        for key in keys:
+            entry = self.local.get(key) if self.local is not None else None
+            if entry is not None:
+                self.stats.record_hit(key, local=True)
+                results[key] = entry
+            else:
+                remote.append(key)
+
+        if remote:
+            r = await self._get_redis()
+            try:
+                values = await r.mget(remote)
+            except redis.ConnectionError:
+                if self.disk is None:
+                    raise
+                # Degrade to this host's disk copy instead of missing
+                _mark_redis_down()
+                found = await self._disk_get(remote)
+                values = [found.get(key) for key in remote]
+            else:
+                self._check_redis_recovered(r)
+
+            for key, raw in zip(remote, values):
+                entry = decode_entry(raw) if raw else None
+                if entry is None:
+                    self.stats.record_miss(key)
+                else:
+                    self.stats.record_hit(key)
+                    self._fill_local(key, entry, len(raw))
+                results[key] = entry
+            if not _redis_down:
+                await self.stats.maybe_flush(r)
+        return results
+
+    async def _set(
+        self, key: str, data: Dict[str, Any], ttl: int, keep_stale: bool = True
+    ) -> None:
+        """Write an entry to Redis and L1, invalidating other processes' L1"""
+        await self._set_many([(key, data, ttl)], keep_stale=keep_stale)
+
+    async def _set_many(
+        self, items: List[Tuple[str, Dict[str, Any], int]], keep_stale: bool = True
+    ) -> None:
+        """Write (key, data, ttl) entries in one pipelined round-trip"""
+        written = []
+        for key, data, ttl in items:
+            # expires_at marks the soft TTL; Redis keeps the entry until the
+            # hard TTL
+            payload = encode_entry(data, ttl)
+            redis_ttl = ttl + self.stale_grace if keep_stale else ttl
+            written.append((key, payload, redis_ttl))
+
+        r = await self._get_redis()
+        try:
+            async with r.pipeline(transaction=False) as pipe:
+                for key, payload, redis_ttl in written:
+                    pipe.setex(key, redis_ttl, payload)
+                    if self.local is not None:
+                        pipe.publish(INVALIDATION_CHANNEL, f"{_PROCESS_ID}|{key}")
+                await pipe.execute()
+        except redis.ConnectionError:
+            if self.disk is None:
+                raise
+            # Keep the entries on disk and push them to Redis once it is back
+            _mark_redis_down()
+            await self._disk_put(written, dirty=True)
+        else:
+            self._check_redis_recovered(r)
+            await self._disk_put(written)
+
+        for key, payload, redis_ttl in written:
+            self.stats.record_set(key, len(payload), redis_ttl)
+            # Cache exactly what a Redis read would return
+            self._fill_local(key, decode_entry(payload), len(payload))
+        if not _redis_down:
+            await self.stats.maybe_flush(r)
+
+    async def _delete(self, key: str) -> None:
+        """Delete an entry from Redis, the disk tier and every process's L1"""
+        if self.local is not None:
+            self.local.delete(key)
+        if self.disk is not None:
+            await self._disk_call(self.disk.delete_many([key]))
+
+        r = await self._get_redis()
+        await r.delete(key)
+        self.stats.record_delete(key)
+        await self._broadcast_invalidation(r, key)
+
+    # --------------------
+    # Disk fallback tier
+    # --------------------
+
+    async def _disk_call(self, op: Awaitable[Any], default: Any = None) -> Any:
+        """Run a disk tier operation; disk errors never fail a cache call"""
+        try:
+            return await op
+        except sqlite3.Error as e:
+            logger.warning("Disk cache error", error=str(e))
+            return default
+
+    async def _disk_get(self, keys: List[str]) -> Dict[str, bytes]:
+        return await self._disk_call(self.disk.get_many(keys), default={})
+
+    async def _disk_put(
+        self, written: List[Tuple[str, bytes, int]], dirty: bool = False
+    ) -> None:
+        if self.disk is not None:
+            await self._disk_call(self.disk.put_many(written, dirty=dirty))
+
+    def _check_redis_recovered(self, r: redis.Redis) -> None:
+        """After an outage, start pushing entries written meanwhile to Redis"""
+        global _redis_down, _resync_task
+        if not _redis_down:
+            return
+        _redis_down = False
+        logger.info("Redis available again, resyncing disk cache")
+        if self.disk is not None and (_resync_task is None or _resync_task.done()):
+            _resync_task = asyncio.get_running_loop().create_task(
+                _resync_from_disk(r, self.disk)
+            )
+
+    def _fill_local(self, key: str, entry: Dict[str, Any], size: int) -> None:
+        """Store a decoded entry in L1 for no longer than its soft TTL"""
+        if self.local is None:
+            return
+        try:
+            expires_at = datetime.fromisoformat(entry["expires_at"])
+        except (KeyError, TypeError, ValueError):
+            return
+        remaining = (expires_at - datetime.utcnow()).total_seconds()
+        ttl = min(remaining, settings.CACHE_LOCAL_MAX_TTL_SECONDS)
+        self.local.set(key, entry, size, ttl)
+
+    async def _broadcast_invalidation(self, r: redis.Redis, key: str) -> None:
+        if self.local is None:
+            return
+        await r.publish(INVALIDATION_CHANNEL, f"{_PROCESS_ID}|{key}")
+
+    def _ensure_invalidation_listener(self) -> None:
+        """Start the per-process pub/sub listener evicting L1 entries"""
+        global _listener_task
+        loop = asyncio.get_running_loop()
+        if (
+            _listener_task is not None
+            and not _listener_task.done()
+            and _listener_task.get_loop() is loop
+        ):
+            return
+        _listener_task = loop.create_task(
+            _listen_for_invalidations(self.redis, self.local)
+        )
+
+    # --------------------
+    # Public API
+    # --------------------
+
     async def get_profile(self, username: str) -> Optional[Dict[str, Any]]:
         """
         Get cached profile data.
@@ -48,11 +294,10 @@ class CacheManager:
         """
         key = self._make_key("profile", username)
         try:
-            r = await self._get_redis()
-            data = await r.get(key)
-            if data:
+            entry = await self._get(key)
+            if entry:
                 logger.debug("Profile cache hit", username=username)
-                return json.loads(data)
+                return entry
             logger.debug("Profile cache miss", username=username)
             return None
         except redis.ConnectionError:
@@ -65,22 +310,88 @@ class CacheManager:
 
         Args:
             username: Instagram username
-            data: Profile data to cache
+            data: Profile metadata to cache (without the media list)
 
         Returns:
             True if cached successfully
         """
         key = self._make_key("profile", username)
         try:
-            r = await self._get_redis()
-            # Add cache metadata
-            cache_data = {
-                "data": data,
-                "cached_at": datetime.utcnow().isoformat(),
-                "expires_at": (datetime.utcnow() + timedelta(hours=6)).isoformat(),
-            }
-            await r.setex(key, self.profile_ttl, json.dumps(cache_data))
-            logger.debug("Profile cached", username=username, ttl_hours=6)
+            await self._set(key, data, self.profile_ttl)
+            logger.debug(
+                "Profile cached", username=username, ttl_hours=self.profile_ttl_hours
+            )
+            return True
+        except redis.ConnectionError:
+            logger.warning("Redis unavailable, cache skipped")
+            return False
+
+    async def get_profiles(self, usernames: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Get cached metadata, media and negative entries for many usernames
+        in one Redis round-trip.
+
+        Returns:
+            Dict mapping each username to {"profile": entry or None,
+            "media": entry or None, "negative": error kind or None}
+        """
+        kinds = ("profile", "media", "negative")
+        keys = {
+            (username, kind): self._make_key(kind, username)
+            for username in usernames
+            for kind in kinds
+        }
+        try:
+            entries = await self._get_many(list(keys.values()))
+        except redis.ConnectionError:
+            logger.warning("Redis unavailable, cache miss")
+            entries = {}
+
+        results: Dict[str, Dict[str, Any]] = {}
+        for username in usernames:
+            found = {kind: entries.get(keys[(username, kind)]) for kind in kinds}
+            negative = found["negative"]
+            found["negative"] = negative["data"].get("error") if negative else None
+            results[username] = found
+
+        logger.debug(
+            "Bulk cache read",
+            requested=len(usernames),
+            profile_hits=sum(1 for v in results.values() if v["profile"]),
+        )
+        return results
+
+    async def set_profiles(
+        self,
+        profiles: Dict[str, Dict[str, Any]],
+        media: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> bool:
+        """
+        Cache metadata (and optionally media) for many usernames in one
+        pipelined round-trip.
+
+        Args:
+            profiles: Username -> profile metadata (without the media list)
+            media: Username -> media payload ({"data": [...], "limit": N})
+
+        Returns:
+            True if cached successfully
+        """
+        items = [
+            (self._make_key("profile", username), data, self.profile_ttl)
+            for username, data in profiles.items()
+        ]
+        items += [
+            (self._make_key("media", username), data, self.media_ttl)
+            for username, data in (media or {}).items()
+        ]
+        if not items:
+            return True
+        try:
+            await self._set_many(items)
+            logger.debug(
+                "Profiles cached", profiles=len(profiles), media=len(media or {})
+            )
             return True
         except redis.ConnectionError:
             logger.warning("Redis unavailable, cache skipped")
@@ -95,11 +406,10 @@ class CacheManager:
         """
         key = self._make_key("media", username)
         try:
-            r = await self._get_redis()
-            data = await r.get(key)
-            if data:
+            entry = await self._get(key)
+            if entry:
                 logger.debug("Media cache hit", username=username)
-                return json.loads(data)
+                return entry
             logger.debug("Media cache miss", username=username)
             return None
         except redis.ConnectionError:
@@ -112,21 +422,17 @@ class CacheManager:
 
         Args:
             username: Instagram username
-            data: Media data to cache
+            data: Media payload to cache ({"data": [...], "limit": N})
 
         Returns:
             True if cached successfully
         """
         key = self._make_key("media", username)
         try:
-            r = await self._get_redis()
-            cache_data = {
-                "data": data,
-                "cached_at": datetime.utcnow().isoformat(),
-                "expires_at": (datetime.utcnow() + timedelta(hours=1)).isoformat(),
-            }
-            await r.setex(key, self.media_ttl, json.dumps(cache_data))
-            logger.debug("Media cached", username=username, ttl_hours=1)
+            await self._set(key, data, self.media_ttl)
+            logger.debug(
+                "Media cached", username=username, ttl_hours=self.media_ttl_hours
+            )
             return True
         except redis.ConnectionError:
             logger.warning("Redis unavailable, cache skipped")
@@ -136,8 +442,7 @@ class CacheManager:
         """Invalidate cached profile data"""
         key = self._make_key("profile", username)
         try:
-            r = await self._get_redis()
-            await r.delete(key)
+            await self._delete(key)
             logger.debug("Profile cache invalidated", username=username)
             return True
         except redis.ConnectionError:
@@ -147,30 +452,241 @@ class CacheManager:
         """Invalidate cached media data"""
         key = self._make_key("media", username)
         try:
-            r = await self._get_redis()
-            await r.delete(key)
+            await self._delete(key)
             logger.debug("Media cache invalidated", username=username)
             return True
         except redis.ConnectionError:
             return False
 
+    async def get_features(self, feature_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get cached analysis features.
+
+        Args:
+            feature_key: Content hash from analysis.features.feature_key
+
+        Returns:
+            Features dict or None if not cached
+        """
+        key = self._make_key("features", feature_key)
+        try:
+            entry = await self._get(key)
+            return entry["data"] if entry else None
+        except redis.ConnectionError:
+            logger.warning("Redis unavailable, cache miss")
+            return None
+
+    async def set_features(self, feature_key: str, data: Dict[str, Any]) -> bool:
+        """
+        Cache analysis features.
+
+        Args:
+            feature_key: Content hash from analysis.features.feature_key
+            data: Features dict
+
+        Returns:
+            True if cached successfully
+        """
+        key = self._make_key("features", feature_key)
+        try:
+            # Content-addressed: an entry is never stale, only unused
+            await self._set(key, data, self.features_ttl, keep_stale=False)
+            return True
+        except redis.ConnectionError:
+            logger.warning("Redis unavailable, cache skipped")
+            return False
+
+    async def get_negative(self, username: str) -> Optional[str]:
+        """
+        Get a cached lookup failure for a username.
+
+        Returns:
+            NEGATIVE_NOT_FOUND, NEGATIVE_PRIVATE or None if not cached
+        """
+        key = self._make_key("negative", username)
+        try:
+            entry = await self._get(key)
+            if entry:
+                logger.debug("Negative cache hit", username=username)
+                return entry["data"].get("error")
+            return None
+        except redis.ConnectionError:
+            logger.warning("Redis unavailable, cache miss")
+            return None
+
+    async def set_negative(self, username: str, error: str) -> bool:
+        """
+        Cache a lookup failure so the username is not fetched again for a while.
+
+        Args:
+            username: Instagram username
+            error: NEGATIVE_NOT_FOUND or NEGATIVE_PRIVATE
+
+        Returns:
+            True if cached successfully
+        """
+        key = self._make_key("negative", username)
+        try:
+            # Never served stale: the account may have been fixed meanwhile
+            await self._set(key, {"error": error}, self.negative_ttl, keep_stale=False)
+            logger.debug("Negative entry cached", username=username, error=error)
+            return True
+        except redis.ConnectionError:
+            logger.warning("Redis unavailable, cache skipped")
+            return False
+
+    async def invalidate_negative(self, username: str) -> bool:
+        """Invalidate a cached lookup failure"""
+        key = self._make_key("negative", username)
+        try:
+            await self._delete(key)
+            logger.debug("Negative cache invalidated", username=username)
+            return True
+        except redis.ConnectionError:
+            return False
+
+    async def purge_negative(self) -> Optional[int]:
+        """
+        Delete every cached lookup failure.
+
+        Returns:
+            Number of entries deleted, or None if Redis is unavailable
+        """
+        try:
+            r = await self._get_redis()
+            deleted = 0
+            batch: List[bytes] = []
+            async for key in r.scan_iter(match="ig:negative:*", count=500):
+                batch.append(key)
+                if len(batch) >= 500:
+                    deleted += await self._delete_many(r, batch)
+                    batch = []
+            if batch:
+                deleted += await self._delete_many(r, batch)
+            logger.info("Negative cache purged", deleted=deleted)
+            return deleted
+        except redis.ConnectionError:
+            logger.warning("Redis unavailable, purge skipped")
+            return None
+
+    async def _delete_many(self, r: redis.Redis, keys: List[bytes]) -> int:
+        """Delete raw Redis keys and drop them from every process's L1"""
+        deleted = await r.delete(*keys)
+        for key in keys:
+            key = key.decode() if isinstance(key, bytes) else key
+            self.stats.record_delete(key)
+            if self.local is not None:
+                self.local.delete(key)
+            await self._broadcast_invalidation(r, key)
+        return deleted
+
     async def get_stats(self) -> Dict[str, Any]:
-        """Get cache statistics"""
+        """
+        Get cache statistics from Redis counters (never scans the keyspace).
+
+        Returns:
+            Dict with overall hit ratio, per-kind counters ("profile",
+            "media", "negative"), Redis eviction counts and L1 stats
+        """
+        local_stats = self.local.stats() if self.local is not None else None
+        # Entry kind -> (soft TTL, hard TTL) in seconds
+        ttls = {
+            "profile": (self.profile_ttl, self.profile_ttl + self.stale_grace),
+            "media": (self.media_ttl, self.media_ttl + self.stale_grace),
+            "negative": (self.negative_ttl, self.negative_ttl),
+            "features": (self.features_ttl, self.features_ttl),
+        }
         try:
             r = await self._get_redis()
-            # Count keys by pattern
-            profile_keys = await r.keys("ig:profile:*")
-            media_keys = await r.keys("ig:media:*")
-
-            return {
-                "profile_cache_entries": len(profile_keys),
-                "media_cache_entries": len(media_keys),
-                "profile_ttl_hours": 6,
-                "media_ttl_hours": 1,
-            }
-        except redis.ConnectionError:
-            return {
-                "profile_cache_entries": 0,
-                "media_cache_entries": 0,
-                "error": "Redis unavailable",
-            }
+            await self.stats.flush(r)
+            kinds = await CacheStats.read(
+                r, {kind: hard for kind, (_, hard) in ttls.items()}
+            )
+            info = await r.info("stats")
+        except redis.ConnectionError:
+            return {"local": local_stats, "error": "Redis unavailable"}
+
+        for kind, (soft, hard) in ttls.items():
+            kinds[kind]["ttl_seconds"] = soft
+            kinds[kind]["stale_until_seconds"] = hard
+
+        hits = sum(k["hits"] for k in kinds.values())
+        misses = sum(k["misses"] for k in kinds.values())
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+            "bytes_stored_estimate": sum(
+                k["bytes_stored_estimate"] for k in kinds.values()
+            ),
+            "kinds": kinds,
+            # Server-wide: Redis is shared with the rate limiter and broker
+            "redis_evicted_keys": info.get("evicted_keys", 0),
+            "redis_expired_keys": info.get("expired_keys", 0),
+            "local": local_stats,
+        }
+
+
+def _mark_redis_down() -> None:
+    global _redis_down
+    if not _redis_down:
+        logger.warning("Redis unavailable, serving cache from disk")
+    _redis_down = True
+
+
+async def _resync_from_disk(r: redis.Redis, disk: DiskCache) -> None:
+    """Replay entries written to disk during a Redis outage into Redis"""
+    resynced = 0
+    try:
+        while True:
+            batch = await disk.dirty(limit=500)
+            if not batch:
+                break
+            async with r.pipeline(transaction=False) as pipe:
+                for key, payload, ttl in batch:
+                    pipe.setex(key, max(ttl, 1), payload)
+                    # Other processes may hold L1 copies from before the outage
+                    pipe.publish(INVALIDATION_CHANNEL, f"{_PROCESS_ID}|{key}")
+                await pipe.execute()
+            await disk.mark_clean([key for key, _, _ in batch])
+            resynced += len(batch)
+    except (redis.ConnectionError, sqlite3.Error) as e:
+        # Entries stay dirty and are retried after the next recovery
+        _mark_redis_down()
+        logger.warning("Disk cache resync interrupted", error=str(e))
+    logger.info("Disk cache resynced", entries=resynced)
+
+
+async def _listen_for_invalidations(r: redis.Redis, local: LocalTTLCache) -> None:
+    """
+    Evict L1 entries written or invalidated by other processes.
+
+    Runs until cancelled: any failure is logged and the subscription is
+    re-established after a backoff, since a dead listener would leave L1
+    serving stale entries.
+    """
+    delay = _LISTENER_MIN_BACKOFF
+    while True:
+        pubsub = r.pubsub()
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            # Messages may have been missed while (re)connecting
+            local.clear()
+            delay = _LISTENER_MIN_BACKOFF
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                origin, _, key = message["data"].decode().partition("|")
+                if origin != _PROCESS_ID:
+                    local.delete(key)
+        except Exception:
+            logger.exception(
+                "Cache invalidation listener failed, retrying", retry_in=delay
+            )
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, _LISTENER_MAX_BACKOFF)
+        finally:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
@@ -0,0 +1,154 @@
+"""Cache statistics kept in Redis counters
+
+Counters live in one hash (ig:stats) and are aggregated in-process, then
+flushed with a single pipelined round-trip at most every
+CACHE_STATS_FLUSH_SECONDS, so reads and writes do not pay an extra
+round-trip each.
+
+Live entry counts are estimated with hourly HyperLogLogs of the keys
+written (ig:stats:keys:<kind>:<hour>) that expire with the entries, so
+reporting never scans the keyspace.
+"""
+
+import time
+from collections import Counter
+from typing import Dict, Any, Optional, Set, Tuple
+import redis.asyncio as redis
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+STATS_KEY = "ig:stats"
+KEYS_HLL_PREFIX = "ig:stats:keys"
+HLL_BUCKET_SECONDS = 3600
+
+
+def key_kind(key: str) -> str:
+    """Entry kind of a cache key (ig:<kind>:<identifier>)"""
+    parts = key.split(":", 2)
+    return parts[1] if len(parts) == 3 else "other"
+
+
+class CacheStats:
+    """In-process buffer of cache counters, flushed to Redis periodically"""
+
+    def __init__(self, flush_seconds: Optional[float] = None):
+        self.flush_seconds = (
+            settings.CACHE_STATS_FLUSH_SECONDS
+            if flush_seconds is None
+            else flush_seconds
+        )
+        self._counters: Counter = Counter()
+        # (hll key, hll ttl) -> cache keys written in that bucket
+        self._written: Dict[Tuple[str, int], Set[str]] = {}
+        self._last_flush = time.monotonic()
+
+    def record_hit(self, key: str, local: bool = False) -> None:
+        kind = key_kind(key)
+        self._counters[f"{kind}:hits"] += 1
+        if local:
+            self._counters[f"{kind}:local_hits"] += 1
+
+    def record_miss(self, key: str) -> None:
+        self._counters[f"{key_kind(key)}:misses"] += 1
+
+    def record_set(self, key: str, size: int, redis_ttl: int) -> None:
+        kind = key_kind(key)
+        self._counters[f"{kind}:sets"] += 1
+        self._counters[f"{kind}:bytes_written"] += size
+
+        bucket = int(time.time()) // HLL_BUCKET_SECONDS
+        # Keep the bucket as long as any entry written during it can live
+        hll_ttl = redis_ttl + HLL_BUCKET_SECONDS
+        self._written.setdefault(
+            (f"{KEYS_HLL_PREFIX}:{kind}:{bucket}", hll_ttl), set()
+        ).add(key)
+
+    def record_delete(self, key: str) -> None:
+        self._counters[f"{key_kind(key)}:deletes"] += 1
+
+    async def maybe_flush(self, r: redis.Redis) -> None:
+        """Flush buffered counters if the flush interval has elapsed"""
+        if time.monotonic() - self._last_flush >= self.flush_seconds:
+            await self.flush(r)
+
+    async def flush(self, r: redis.Redis) -> None:
+        """Write buffered counters to Redis in one pipeline"""
+        self._last_flush = time.monotonic()
+        if not self._counters and not self._written:
+            return
+
+        counters, self._counters = self._counters, Counter()
+        written, self._written = self._written, {}
+        try:
+            async with r.pipeline(transaction=False) as pipe:
+                for field, amount in counters.items():
+                    pipe.hincrby(STATS_KEY, field, amount)
+                for (hll_key, hll_ttl), keys in written.items():
+                    pipe.pfadd(hll_key, *keys)
+                    pipe.expire(hll_key, hll_ttl)
+                await pipe.execute()
+        except redis.ConnectionError:
+            # Counters are best-effort: keep them for the next flush
+            self._counters.update(counters)
+            for bucket, keys in written.items():
+                self._written.setdefault(bucket, set()).update(keys)
+            logger.warning("Redis unavailable, cache stats not flushed")
+
+    @staticmethod
+    async def read(
+        r: redis.Redis, kinds: Dict[str, int]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Read aggregated stats.
+
+        Args:
+            r: Redis client
+            kinds: Entry kind -> hard TTL in seconds (how far back to count
+                written keys)
+
+        Returns:
+            Dict mapping each kind to its counters and derived figures
+        """
+        now_bucket = int(time.time()) // HLL_BUCKET_SECONDS
+        async with r.pipeline(transaction=False) as pipe:
+            pipe.hgetall(STATS_KEY)
+            for kind, ttl in kinds.items():
+                buckets = range(now_bucket - ttl // HLL_BUCKET_SECONDS, now_bucket + 1)
+                pipe.pfcount(*(f"{KEYS_HLL_PREFIX}:{kind}:{b}" for b in buckets))
+            raw, *entry_counts = await pipe.execute()
+
+        counters = {
+            (k.decode() if isinstance(k, bytes) else k): int(v) for k, v in raw.items()
+        }
+        stats: Dict[str, Dict[str, Any]] = {}
+        for kind, entries in zip(kinds, entry_counts):
+            hits = counters.get(f"{kind}:hits", 0)
+            misses = counters.get(f"{kind}:misses", 0)
+            sets = counters.get(f"{kind}:sets", 0)
+            bytes_written = counters.get(f"{kind}:bytes_written", 0)
+            avg_size = bytes_written / sets if sets else 0.0
+            stats[kind] = {
+                "hits": hits,
+                "local_hits": counters.get(f"{kind}:local_hits", 0),
+                "misses": misses,
+                "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+                "sets": sets,
+                "deletes": counters.get(f"{kind}:deletes", 0),
+                "bytes_written": bytes_written,
+                "avg_entry_bytes": round(avg_size, 1),
+                # Keys written within the hard TTL; an upper bound on live ones
+                "entries_estimate": entries,
+                "bytes_stored_estimate": int(entries * avg_size),
+            }
+        return stats
+
+
+_stats = CacheStats()
+
+
+def get_cache_stats_recorder() -> CacheStats:
+    """Process-wide stats buffer shared by every CacheManager"""
+    return _stats
@@ -0,0 +1,355 @@
+"""Circuit breaker and retry budget for Graph API calls, shared through Redis
+
+During a Graph API incident every in-flight job would otherwise keep
+calling (and retrying) and burn rate limit tokens. Outcomes of all calls
+are counted in Redis in short time buckets; when the error rate or the
+slow-call rate over the window crosses its threshold, the breaker opens
+and every worker fails fast with CircuitOpenError. After a cool-down it
+lets a few probe calls through (half-open): a successful probe closes it,
+a failed one re-opens it.
+
+The same window counters drive the retry budget: retries across all
+workers are capped at a fraction of the successful calls, so retrying
+cannot multiply the load on a struggling API.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+import redis.asyncio as redis
+import structlog
+
+from app.core.config import settings
+from app.services.instagram.client import (
+    InstagramAPIError,
+    RateLimitError,
+    CredentialError,
+    AccountNotFoundError,
+    PrivateAccountError,
+)
+
+logger = structlog.get_logger()
+
+# Width of the time buckets the window is made of
+BUCKET_SECONDS = 10
+
+# Answers about one account or credential: the API itself is working
+HEALTHY_ERRORS = (
+    AccountNotFoundError,
+    PrivateAccountError,
+    RateLimitError,
+    CredentialError,
+)
+
+
+class CircuitOpenError(InstagramAPIError):
+    """Raised instead of calling the Graph API while the breaker is open"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(
+            "Instagram API circuit breaker is open", error_code="circuit_open"
+        )
+        self.retry_after = retry_after
+
+
+# Decide whether a call may go out: {allowed, probe or retry_after_ms}
+ALLOW_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local open_seconds = tonumber(ARGV[2])
+local max_probes = tonumber(ARGV[3])
+
+local state = redis.call('HMGET', key, 'state', 'changed_at', 'probes')
+local current = state[1] or 'closed'
+if current == 'closed' then
+    return {1, 0}
+end
+
+local changed_at = tonumber(state[2]) or 0
+if now < changed_at + open_seconds then
+    if current == 'open' then
+        return {0, math.ceil((changed_at + open_seconds - now) * 1000)}
+    end
+elseif current == 'open' or current == 'half_open' then
+    -- Cool-down over (or probes lost to crashed workers): new probe round
+    redis.call('HSET', key, 'state', 'half_open', 'changed_at', now, 'probes', 0)
+end
+
+local probes = tonumber(redis.call('HGET', key, 'probes')) or 0
+if probes >= max_probes then
+    return {0, 1000}
+end
+redis.call('HINCRBY', key, 'probes', 1)
+return {1, 1}
+"""
+
+# Count a call outcome and trip/close the breaker; returns the new state
+RECORD_SCRIPT = """
+local key = KEYS[1]
+local prefix = KEYS[2]
+local now = tonumber(ARGV[1])
+local ok = ARGV[2] == '1'
+local slow = ARGV[3] == '1'
+local probe = ARGV[4] == '1'
+local window = tonumber(ARGV[5])
+local bucket_seconds = tonumber(ARGV[6])
+local min_calls = tonumber(ARGV[7])
+local failure_rate = tonumber(ARGV[8])
+local slow_rate = tonumber(ARGV[9])
+
+local bucket = math.floor(now / bucket_seconds)
+local buckets = math.ceil(window / bucket_seconds)
+
+if probe then
+    if ok then
+        -- Start over with a clean window
+        for b = bucket - buckets + 1, bucket do
+            redis.call('DEL', prefix .. b)
+        end
+        redis.call('HSET', key, 'state', 'closed', 'changed_at', now, 'probes', 0)
+        return 'closed'
+    end
+    redis.call('HSET', key, 'state', 'open', 'changed_at', now, 'probes', 0)
+    redis.call('EXPIRE', key, 86400)
+    return 'open'
+end
+
+local bucket_key = prefix .. bucket
+redis.call('HINCRBY', bucket_key, 'calls', 1)
+if not ok then redis.call('HINCRBY', bucket_key, 'failures', 1) end
+if slow then redis.call('HINCRBY', bucket_key, 'slow', 1) end
+redis.call('EXPIRE', bucket_key, window + bucket_seconds)
+
+local current = redis.call('HGET', key, 'state') or 'closed'
+if current ~= 'closed' then
+    return current
+end
+
+local calls, failures, slow_calls = 0, 0, 0
+for b = bucket - buckets + 1, bucket do
+    local counts = redis.call('HMGET', prefix .. b, 'calls', 'failures', 'slow')
+    calls = calls + (tonumber(counts[1]) or 0)
+    failures = failures + (tonumber(counts[2]) or 0)
+    slow_calls = slow_calls + (tonumber(counts[3]) or 0)
+end
+if calls >= min_calls
+    and (failures / calls >= failure_rate or slow_calls / calls >= slow_rate) then
+    redis.call('HSET', key, 'state', 'open', 'changed_at', now, 'probes', 0)
+    redis.call('EXPIRE', key, 86400)
+    return 'open'
+end
+return 'closed'
+"""
+
+# Spend one retry if the budget allows it
+RETRY_SCRIPT = """
+local prefix = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local bucket_seconds = tonumber(ARGV[3])
+local ratio = tonumber(ARGV[4])
+local minimum = tonumber(ARGV[5])
+
+local bucket = math.floor(now / bucket_seconds)
+local buckets = math.ceil(window / bucket_seconds)
+local successes, retries = 0, 0
+for b = bucket - buckets + 1, bucket do
+    local counts = redis.call('HMGET', prefix .. b, 'calls', 'failures', 'retries')
+    successes = successes + (tonumber(counts[1]) or 0) - (tonumber(counts[2]) or 0)
+    retries = retries + (tonumber(counts[3]) or 0)
+end
+if retries >= successes * ratio + minimum then
+    return 0
+end
+redis.call('HINCRBY', prefix .. bucket, 'retries', 1)
+redis.call('EXPIRE', prefix .. bucket, window + bucket_seconds)
+return 1
+"""
+
+
+class CircuitBreaker:
+    """Redis-coordinated circuit breaker with a retry budget"""
+
+    def __init__(
+        self,
+        name: str = "graph_api",
+        redis_client: Optional[redis.Redis] = None,
+        key_prefix: str = "ig:cb",
+    ):
+        self.redis = redis_client
+        # Connections belong to the loop that opened them: a client created
+        # here is replaced when used from another loop. In production each
+        # process keeps one loop (the API server's, or a worker's persistent
+        # loop from _run_async); tests each run their own loop
+        self._owns_redis = redis_client is None
+        self._redis_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.state_key = f"{key_prefix}:{name}"
+        self.window_prefix = f"{key_prefix}:{name}:w:"
+        # Known open until then: fail fast without asking Redis
+        self._open_until = 0.0
+
+    async def _get_redis(self) -> redis.Redis:
+        """Get or create the Redis connection of the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._owns_redis and (self.redis is None or self._redis_loop is not loop):
+            self.redis = redis.from_url(settings.REDIS_URL)
+            self._redis_loop = loop
+        return self.redis
+
+    def check(self) -> None:
+        """
+        Fail fast if this process already knows the breaker is open.
+
+        Cheap (no Redis call); use it before spending rate limit tokens.
+
+        Raises:
+            CircuitOpenError: While the breaker is known to be open
+        """
+        remaining = self._open_until - time.time()
+        if remaining > 0:
+            raise CircuitOpenError(retry_after=remaining)
+
+    async def _allow(self) -> bool:
+        """Ask Redis whether a call may go out; returns True for a probe"""
+        try:
+            r = await self._get_redis()
+            allowed, detail = await r.eval(
+                ALLOW_SCRIPT,
+                1,
+                self.state_key,
+                time.time(),
+                settings.INSTAGRAM_BREAKER_OPEN_SECONDS,
+                settings.INSTAGRAM_BREAKER_HALF_OPEN_PROBES,
+            )
+        except redis.ConnectionError:
+            # Without Redis there is nothing to coordinate on: let calls through
+            return False
+        if not allowed:
+            retry_after = detail / 1000
+            self._open_until = time.time() + retry_after
+            raise CircuitOpenError(retry_after=retry_after)
+        return detail == 1
+
+    async def _record(self, ok: bool, elapsed: float, probe: bool) -> None:
+        slow = elapsed >= settings.INSTAGRAM_BREAKER_SLOW_CALL_SECONDS
+        try:
+            r = await self._get_redis()
+            state = await r.eval(
+                RECORD_SCRIPT,
+                2,
+                self.state_key,
+                self.window_prefix,
+                time.time(),
+                "1" if ok else "0",
+                "1" if slow else "0",
+                "1" if probe else "0",
+                settings.INSTAGRAM_BREAKER_WINDOW_SECONDS,
+                BUCKET_SECONDS,
+                settings.INSTAGRAM_BREAKER_MIN_CALLS,
+                settings.INSTAGRAM_BREAKER_FAILURE_RATE,
+                settings.INSTAGRAM_BREAKER_SLOW_CALL_RATE,
+            )
+        except redis.ConnectionError:
+            return
+        state = state.decode() if isinstance(state, bytes) else state
+
+        if state == "open":
+            if self._open_until <= time.time():
+                logger.warning(
+                    "Instagram API circuit breaker open",
+                    probe=probe,
+                    open_seconds=settings.INSTAGRAM_BREAKER_OPEN_SECONDS,
+                )
+            self._open_until = time.time() + settings.INSTAGRAM_BREAKER_OPEN_SECONDS
+        elif probe and state == "closed":
+            logger.info("Instagram API circuit breaker closed")
+            self._open_until = 0.0
+
+    @asynccontextmanager
+    async def guard(self) -> AsyncIterator[None]:
+        """
+        Run one Graph API call under the breaker.
+
+        Errors that are answers about a single account or credential
+        (HEALTHY_ERRORS) count as successes; other InstagramAPIErrors and
+        timeouts count as failures, and slow calls count towards the
+        slow-call rate.
+
+        Raises:
+            CircuitOpenError: If the breaker is open (the call is not made)
+        """
+        self.check()
+        probe = await self._allow()
+        start = time.monotonic()
+        try:
+            yield
+        except HEALTHY_ERRORS:
+            await self._record(True, time.monotonic() - start, probe)
+            raise
+        except (InstagramAPIError, asyncio.TimeoutError):
+            await self._record(False, time.monotonic() - start, probe)
+            raise
+        else:
+            await self._record(True, time.monotonic() - start, probe)
+
+    async def try_spend_retry(self) -> bool:
+        """
+        Take one retry from the global budget.
+
+        Returns:
+            True if the retry may go ahead (also when Redis is unavailable)
+        """
+        try:
+            r = await self._get_redis()
+            allowed = await r.eval(
+                RETRY_SCRIPT,
+                1,
+                self.window_prefix,
+                time.time(),
+                settings.INSTAGRAM_BREAKER_WINDOW_SECONDS,
+                BUCKET_SECONDS,
+                settings.INSTAGRAM_RETRY_BUDGET_RATIO,
+                settings.INSTAGRAM_RETRY_BUDGET_MIN,
+            )
+        except redis.ConnectionError:
+            return True
+        return allowed == 1
+
+    async def get_status(self) -> Dict[str, Any]:
+        """Breaker state and call counts over the current window"""
+        bucket = int(time.time()) // BUCKET_SECONDS
+        buckets = -(-settings.INSTAGRAM_BREAKER_WINDOW_SECONDS // BUCKET_SECONDS)
+        try:
+            r = await self._get_redis()
+            async with r.pipeline(transaction=False) as pipe:
+                pipe.hmget(self.state_key, "state", "changed_at")
+                for b in range(bucket - buckets + 1, bucket + 1):
+                    pipe.hmget(
+                        f"{self.window_prefix}{b}",
+                        "calls",
+                        "failures",
+                        "slow",
+                        "retries",
+                    )
+                (state, changed_at), *counts = await pipe.execute()
+        except redis.ConnectionError:
+            return {"state": "unknown"}
+
+        totals = [sum(int(c[i] or 0) for c in counts) for i in range(4)]
+        return {
+            "state": state.decode() if isinstance(state, bytes) else state or "closed",
+            "changed_at": float(changed_at) if changed_at else None,
+            "calls": totals[0],
+            "failures": totals[1],
+            "slow_calls": totals[2],
+            "retries": totals[3],
+        }
+
+
+_breaker = CircuitBreaker()
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """Process-wide breaker for Graph API calls"""
+    return _breaker
@@ -3,12 +3,17 @@
 Business Discovery API wrapper for fetching public Instagram profile and media data.
 """
 
+import json
 import httpx
-from typing import Optional, List, Dict, Any
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Any, Mapping, Tuple, Union
 from datetime import datetime
+from urllib.parse import urlencode
 import structlog
 
 from app.core.config import settings
+from app.services.instagram.http import get_http_client
+from app.services.instagram.rate_limiter import TokenBucketRateLimiter
 
 logger = structlog.get_logger()
 
@@ -36,6 +41,12 @@ class RateLimitError(InstagramAPIError):
         self.retry_after = retry_after
 
 
+class CredentialError(InstagramAPIError):
+    """Raised when the access token / business account itself is rejected"""
+
+    pass
+
+
 class AccountNotFoundError(InstagramAPIError):
     """Raised when the Instagram account is not found or not accessible"""
 
@@ -57,6 +68,64 @@ class PrivateAccountError(InstagramAPIError):
         self.username = username
 
 
+def _next_cursor(edge: Dict[str, Any]) -> Optional[str]:
+    """Get the `after` cursor of a paged edge, if there is a next page"""
+    paging = edge.get("paging") or {}
+    return (paging.get("cursors") or {}).get("after")
+
+
+# Graph API error codes for application / account level throttling
+RATE_LIMIT_ERROR_CODES = {4, 17, 32, 613}
+# Invalid or expired token, missing permission (also 200-299), blocked account
+CREDENTIAL_ERROR_CODES = {10, 102, 190, 368}
+
+
+# Usage counters reported as percentages of the quota
+USAGE_FIELDS = ("call_count", "total_time", "total_cputime")
+
+
+@dataclass
+class ApiUsage:
+    """Quota usage reported in Graph API response headers"""
+
+    percent: float  # Highest usage percentage across the reported counters
+    regain_seconds: int = 0  # Time until throttling lifts, 0 if not throttled
+
+
+def parse_usage_headers(headers: Mapping[str, str]) -> Optional[ApiUsage]:
+    """
+    Parse the X-App-Usage and X-Business-Use-Case-Usage headers.
+
+    Args:
+        headers: Response headers (lowercase lookups must work)
+
+    Returns:
+        The combined usage, or None if neither header is present/parseable
+    """
+    entries = []
+    try:
+        app_usage = headers.get("x-app-usage")
+        if app_usage:
+            entries.append(json.loads(app_usage))
+        buc_usage = headers.get("x-business-use-case-usage")
+        if buc_usage:
+            for business_entries in json.loads(buc_usage).values():
+                entries.extend(business_entries)
+    except (ValueError, AttributeError, TypeError):
+        logger.debug("Unparseable Graph API usage header")
+
+    entries = [e for e in entries if isinstance(e, dict)]
+    if not entries:
+        return None
+
+    percent = max(float(e.get(f) or 0) for e in entries for f in USAGE_FIELDS)
+    # Reported in minutes
+    regain_minutes = max(
+        float(e.get("estimated_time_to_regain_access") or 0) for e in entries
+    )
+    return ApiUsage(percent=percent, regain_seconds=int(regain_minutes * 60))
+
+
 class InstagramProfile:
     """Represents an Instagram profile from Business Discovery API"""
 
@@ -73,10 +142,13 @@ class InstagramProfile:
         self.profile_picture_url = data.get("profile_picture_url", "")
         self.is_verified = data.get("is_verified", False)
         self.media: List[InstagramMedia] = []
+        # Cursor of the next media page (None if no more pages)
+        self.media_after_cursor: Optional[str] = None
 
         # Parse media if present
         if "media" in data and "data" in data["media"]:
             self.media = [InstagramMedia(m) for m in data["media"]["data"]]
+            self.media_after_cursor = _next_cursor(data["media"])
 
 
 class InstagramMedia:
@@ -112,18 +184,129 @@ class InstagramGraphAPI:
         access_token: Optional[str] = None,
         business_account_id: Optional[str] = None,
         base_url: Optional[str] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        rate_limiter: Optional[TokenBucketRateLimiter] = None,
     ):
         self.access_token = access_token or settings.INSTAGRAM_ACCESS_TOKEN
         self.business_account_id = (
             business_account_id or settings.INSTAGRAM_BUSINESS_ACCOUNT_ID
         )
         self.base_url = base_url or settings.INSTAGRAM_API_BASE_URL
+        # None -> use the shared per-process pooled client
+        self._http_client = http_client
+        # Bucket the reported API usage is fed back into (None -> not adapted)
+        self.rate_limiter = rate_limiter
+        self.last_usage: Optional[ApiUsage] = None
 
         if not self.access_token or not self.business_account_id:
             raise ValueError(
                 "Instagram access token and business account ID are required"
             )
 
+    # Graph API accepts at most 50 sub-requests per batch call
+    MAX_BATCH_SIZE = 50
+
+    PROFILE_FIELDS = [
+        "id",
+        "username",
+        "name",
+        "followers_count",
+        "follows_count",
+        "media_count",
+        "biography",
+        "website",
+        "profile_picture_url",
+        "is_verified",
+    ]
+
+    MEDIA_FIELDS = [
+        "id",
+        "caption",
+        "comments_count",
+        "like_count",
+        "media_type",
+        "media_url",
+        "thumbnail_url",
+        "timestamp",
+        "permalink",
+    ]
+
+    def _business_discovery_fields(
+        self,
+        username: str,
+        media_limit: int,
+        include_media: bool,
+        include_profile: bool = True,
+        media_after: Optional[str] = None,
+    ) -> str:
+        """Build the `fields` parameter for a Business Discovery query"""
+        fields = list(self.PROFILE_FIELDS) if include_profile else []
+
+        if include_media:
+            edge = f"media.limit({media_limit})"
+            if media_after:
+                edge += f".after({media_after})"
+            fields.append(f"{edge}{{{','.join(self.MEDIA_FIELDS)}}}")
+
+        return f"business_discovery.username({username}){{{','.join(fields)}}}"
+
+    async def _record_usage(self, headers: Mapping[str, str]) -> Optional[ApiUsage]:
+        """Parse the usage headers of a response and feed them to the bucket"""
+        usage = parse_usage_headers(headers)
+        if usage is not None:
+            self.last_usage = usage
+            if self.rate_limiter is not None:
+                await self.rate_limiter.record_usage(
+                    usage.percent, usage.regain_seconds
+                )
+        return usage
+
+    @staticmethod
+    def _retry_after(headers: Mapping[str, str], usage: Optional[ApiUsage]) -> int:
+        """Seconds to wait after throttling, preferring the API's own estimate"""
+        if usage is not None and usage.regain_seconds:
+            return usage.regain_seconds
+        try:
+            return int(headers.get("retry-after", 3600))
+        except ValueError:
+            return 3600
+
+    @staticmethod
+    def _raise_for_graph_error(
+        username: str,
+        data: Any,
+        status_code: Optional[int],
+        retry_after: int = 3600,
+    ) -> None:
+        """Map a Graph API error body to the matching exception"""
+        if not (data and isinstance(data, dict) and "error" in data):
+            return
+
+        error = data["error"] or {}
+        error_code = error.get("code", "")
+        error_message = error.get("message", "Unknown error")
+        subcode = error.get("error_subcode")
+
+        # Map common IG errors
+        if error_code == 80004:  # Account not found or not accessible
+            raise AccountNotFoundError(username)
+        elif error_code == 80001:  # Private account
+            raise PrivateAccountError(username)
+        elif error_code in RATE_LIMIT_ERROR_CODES:
+            raise RateLimitError(error_message, retry_after=retry_after)
+        elif error_code in CREDENTIAL_ERROR_CODES or (
+            isinstance(error_code, int) and 200 <= error_code < 300
+        ):
+            raise CredentialError(
+                error_message, status_code=status_code, error_code=str(error_code)
+            )
+        else:
+            raise InstagramAPIError(
+                f"{error_message}",
+                status_code=status_code,
+                error_code=str(error_code or subcode or "unknown"),
+            )
+
     async def get_profile(
         self, username: str, media_limit: int = 20, include_media: bool = True
     ) -> InstagramProfile:
@@ -146,112 +329,252 @@ class InstagramGraphAPI:
         """
         logger.info("Fetching Instagram profile", username=username)
 
-        # Build fields parameter
-        fields = [
-            "id",
-            "username",
-            "name",
-            "followers_count",
-            "follows_count",
-            "media_count",
-            "biography",
-            "website",
-            "profile_picture_url",
-            "is_verified",
-        ]
+        fields = self._business_discovery_fields(username, media_limit, include_media)
+        business_discovery = await self._request_business_discovery(username, fields)
 
-        if include_media:
-            media_fields = [
-                "id",
-                "caption",
-                "comments_count",
-                "like_count",
-                "media_type",
-                "media_url",
-                "thumbnail_url",
-                "timestamp",
-                "permalink",
-            ]
-            fields.append(f"media.limit({media_limit}){{{','.join(media_fields)}}}")
+        logger.info("Profile fetched successfully", username=username)
+        return InstagramProfile(business_discovery)
+
+    async def get_media_page(
+        self, username: str, limit: int = 25, after: Optional[str] = None
+    ) -> Tuple[List[InstagramMedia], Optional[str]]:
+        """
+        Fetch one page of a profile's media, following a paging cursor.
+
+        Args:
+            username: Instagram username (without @)
+            limit: Page size (max 25 per call)
+            after: `after` cursor from the previous page (None for newest)
+
+        Returns:
+            Tuple of (media on this page, cursor of the next page or None)
+
+        Raises:
+            Same as get_profile()
+        """
+        logger.info("Fetching Instagram media page", username=username, after=after)
+
+        business_discovery = await self._request_business_discovery(
+            username,
+            self._business_discovery_fields(
+                username,
+                limit,
+                include_media=True,
+                include_profile=False,
+                media_after=after,
+            ),
+        )
+
+        edge = business_discovery.get("media") or {}
+        media = [InstagramMedia(m) for m in edge.get("data", [])]
+        return media, _next_cursor(edge)
 
+    async def _request_business_discovery(
+        self, username: str, fields: str
+    ) -> Dict[str, Any]:
+        """Run a Business Discovery query and return its business_discovery node"""
         url = f"{self.base_url}/{self.business_account_id}"
         params = {
-            "fields": f"business_discovery.username({username}){{{','.join(fields)}}}",
+            "fields": fields,
             "access_token": self.access_token,
         }
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        client = self._http_client or get_http_client()
+        try:
+            response = await client.get(url, params=params)
+            usage = await self._record_usage(response.headers)
+            retry_after = self._retry_after(response.headers, usage)
+
+            # Handle rate limiting
+            if response.status_code == 429:
+                logger.warning("Rate limit exceeded", retry_after=retry_after)
+                raise RateLimitError("API rate limit exceeded", retry_after=retry_after)
+
+            # Try to parse body even on HTTP errors to extract Graph error details
+            data = None
             try:
-                response = await client.get(url, params=params)
-
-                # Handle rate limiting
-                if response.status_code == 429:
-                    retry_after = int(response.headers.get("retry-after", 3600))
-                    logger.warning("Rate limit exceeded", retry_after=retry_after)
-                    raise RateLimitError(
-                        "API rate limit exceeded", retry_after=retry_after
+                data = response.json()
+            except Exception:
+                data = None
+
+            self._raise_for_graph_error(
+                username, data, response.status_code, retry_after
+            )
+
+            # If no error body, raise for non-2xx
+            response.raise_for_status()
+
+            # Extract business discovery data
+            business_discovery = data.get("business_discovery", {})
+            if not business_discovery:
+                raise AccountNotFoundError(username)
+
+            return business_discovery
+
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                raise AccountNotFoundError(username)
+            # Try to enrich with body error
+            try:
+                body = e.response.json()
+                if isinstance(body, dict) and "error" in body:
+                    err = body["error"]
+                    msg = err.get("message", str(e))
+                    code = err.get("code")
+                    raise InstagramAPIError(
+                        msg, status_code=e.response.status_code, error_code=str(code)
                     )
+            except Exception:
+                pass
+            logger.error(
+                "HTTP error", status_code=e.response.status_code, error=str(e)
+            )
+            raise InstagramAPIError(
+                f"HTTP error: {e}", status_code=e.response.status_code
+            )
+        except httpx.RequestError as e:
+            logger.error("Request error", error=str(e))
+            raise InstagramAPIError(f"Request failed: {e}")
 
-                # Try to parse body even on HTTP errors to extract Graph error details
-                data = None
-                try:
-                    data = response.json()
-                except Exception:
-                    data = None
-
-                if data and isinstance(data, dict) and "error" in data:
-                    error = data["error"] or {}
-                    error_code = error.get("code", "")
-                    error_message = error.get("message", "Unknown error")
-                    subcode = error.get("error_subcode")
-
-                    # Map common IG errors
-                    if error_code == 80004:  # Account not found or not accessible
-                        raise AccountNotFoundError(username)
-                    elif error_code == 80001:  # Private account
-                        raise PrivateAccountError(username)
-                    else:
-                        raise InstagramAPIError(
-                            f"{error_message}",
-                            status_code=response.status_code,
-                            error_code=str(error_code or subcode or "unknown"),
-                        )
+    async def get_profiles_batch(
+        self,
+        usernames: List[str],
+        media_limit: int = 20,
+        include_media: bool = True,
+        media_limits: Optional[Dict[str, int]] = None,
+    ) -> Dict[str, Union[InstagramProfile, InstagramAPIError]]:
+        """
+        Fetch several profiles in one Graph API batch request.
+
+        Each username becomes one Business Discovery sub-request. Sub-request
+        failures are returned per username instead of failing the whole batch.
+
+        Args:
+            usernames: Instagram usernames (at most MAX_BATCH_SIZE)
+            media_limit: Number of recent media posts to fetch per profile
+            include_media: Whether to include recent media posts
+            media_limits: Optional per-username overrides of media_limit
+
+        Returns:
+            Dict mapping each username to an InstagramProfile or the
+            InstagramAPIError (AccountNotFoundError, PrivateAccountError, ...)
+            raised for that sub-request
 
-                # If no error body, raise for non-2xx
-                response.raise_for_status()
-
-                # Extract business discovery data
-                business_discovery = data.get("business_discovery", {})
-                if not business_discovery:
-                    raise AccountNotFoundError(username)
-
-                logger.info("Profile fetched successfully", username=username)
-                return InstagramProfile(business_discovery)
-
-            except httpx.HTTPStatusError as e:
-                if e.response.status_code == 404:
-                    raise AccountNotFoundError(username)
-                # Try to enrich with body error
-                try:
-                    body = e.response.json()
-                    if isinstance(body, dict) and "error" in body:
-                        err = body["error"]
-                        msg = err.get("message", str(e))
-                        code = err.get("code")
-                        raise InstagramAPIError(
-                            msg, status_code=e.response.status_code, error_code=str(code)
+        Raises:
+            RateLimitError: If the batch call itself is rate limited
+            InstagramAPIError: If the batch call itself fails
+        """
+        if len(usernames) > self.MAX_BATCH_SIZE:
+            raise ValueError(
+                f"At most {self.MAX_BATCH_SIZE} usernames per batch request"
+            )
+        if not usernames:
+            return {}
+
+        logger.info("Fetching Instagram profiles in batch", count=len(usernames))
+
+        batch = [
+            {
+                "method": "GET",
+                "relative_url": f"{self.business_account_id}?"
+                + urlencode(
+                    {
+                        "fields": self._business_discovery_fields(
+                            username,
+                            (media_limits or {}).get(username, media_limit),
+                            include_media,
                         )
-                except Exception:
-                    pass
-                logger.error(
-                    "HTTP error", status_code=e.response.status_code, error=str(e)
+                    }
+                ),
+            }
+            for username in usernames
+        ]
+        payload = {"batch": json.dumps(batch), "access_token": self.access_token}
+
+        client = self._http_client or get_http_client()
+        try:
+            response = await client.post(f"{self.base_url}/", data=payload)
+        except httpx.RequestError as e:
+            logger.error("Batch request error", error=str(e))
+            raise InstagramAPIError(f"Request failed: {e}")
+
+        usage = await self._record_usage(response.headers)
+        retry_after = self._retry_after(response.headers, usage)
+        if response.status_code == 429:
+            logger.warning("Rate limit exceeded", retry_after=retry_after)
+            raise RateLimitError("API rate limit exceeded", retry_after=retry_after)
+
+        try:
+            data = response.json()
+        except Exception:
+            data = None
+
+        if isinstance(data, dict) and "error" in data:
+            err = data["error"] or {}
+            if err.get("code") in RATE_LIMIT_ERROR_CODES:
+                raise RateLimitError(
+                    err.get("message", "API rate limit exceeded"),
+                    retry_after=retry_after,
                 )
-                raise InstagramAPIError(
-                    f"HTTP error: {e}", status_code=e.response.status_code
+            raise InstagramAPIError(
+                err.get("message", "Unknown error"),
+                status_code=response.status_code,
+                error_code=str(err.get("code") or "unknown"),
+            )
+        if response.status_code >= 400 or not isinstance(data, list):
+            raise InstagramAPIError(
+                f"Batch request failed with HTTP {response.status_code}",
+                status_code=response.status_code,
+            )
+
+        results: Dict[str, Union[InstagramProfile, InstagramAPIError]] = {}
+        for username, item in zip(usernames, data):
+            try:
+                results[username] = self._parse_batch_item(
+                    username, item, retry_after
                 )
-            except httpx.RequestError as e:
-                logger.error("Request error", error=str(e))
-                raise InstagramAPIError(f"Request failed: {e}")
+            except InstagramAPIError as e:
+                results[username] = e
+
+        logger.info(
+            "Batch fetched",
+            requested=len(usernames),
+            succeeded=sum(isinstance(r, InstagramProfile) for r in results.values()),
+        )
+        return results
+
+    def _parse_batch_item(
+        self, username: str, item: Optional[Dict[str, Any]], retry_after: int = 3600
+    ) -> InstagramProfile:
+        """Parse one batch sub-response into a profile or raise its error"""
+        # Graph returns null for sub-requests that did not complete in time
+        if item is None:
+            raise InstagramAPIError(
+                "Batch sub-request did not complete", error_code="batch_timeout"
+            )
+
+        status_code = item.get("code")
+        try:
+            body = json.loads(item.get("body") or "null")
+        except ValueError:
+            body = None
+
+        self._raise_for_graph_error(username, body, status_code, retry_after)
+
+        if status_code == 404:
+            raise AccountNotFoundError(username)
+        if status_code == 429:
+            raise RateLimitError("API rate limit exceeded", retry_after=retry_after)
+        if status_code is None or status_code >= 400:
+            raise InstagramAPIError(
+                f"HTTP error: {status_code}", status_code=status_code
+            )
+
+        business_discovery = (body or {}).get("business_discovery", {})
+        if not business_discovery:
+            raise AccountNotFoundError(username)
+
+        return InstagramProfile(business_discovery)
 
     async def validate_account(self, username: str) -> Dict[str, Any]:
         """
@@ -264,41 +587,56 @@ class InstagramGraphAPI:
             profile = await self.get_profile(
                 username, media_limit=0, include_media=False
             )
-            return {
-                "valid": True,
-                "exists": True,
-                "is_business": True,  # Business Discovery only works for business/creator accounts
-                "profile": {
-                    "username": profile.username,
-                    "followers_count": profile.followers_count,
-                    "media_count": profile.media_count,
-                },
-            }
-        except AccountNotFoundError:
+        except InstagramAPIError as e:
+            return self.validation_error(e)
+        return self.validation_success(profile)
+
+    @staticmethod
+    def validation_success(profile: InstagramProfile) -> Dict[str, Any]:
+        """validate_account result for an account that can be analyzed"""
+        return {
+            "valid": True,
+            "exists": True,
+            # Business Discovery only works for business/creator accounts
+            "is_business": True,
+            "profile": {
+                "username": profile.username,
+                "followers_count": profile.followers_count,
+                "media_count": profile.media_count,
+            },
+        }
+
+    @classmethod
+    def validation_error(cls, error: InstagramAPIError) -> Dict[str, Any]:
+        """validate_account result for a failed profile lookup"""
+        if isinstance(error, (AccountNotFoundError, PrivateAccountError)):
+            return cls.validation_failure(error)
+        if isinstance(error, RateLimitError):
+            message = f"Rate limited. Retry after {error.retry_after}s"
+        else:
+            message = error.message
+        return {
+            "valid": False,
+            "exists": None,
+            "is_business": None,
+            "error": message,
+        }
+
+    @staticmethod
+    def validation_failure(
+        error: Union[AccountNotFoundError, PrivateAccountError]
+    ) -> Dict[str, Any]:
+        """validate_account result for an account that cannot be analyzed"""
+        if isinstance(error, AccountNotFoundError):
             return {
                 "valid": False,
                 "exists": False,
                 "is_business": False,
                 "error": "Account not found",
             }
-        except PrivateAccountError:
-            return {
-                "valid": False,
-                "exists": True,
-                "is_business": False,
-                "error": "Not a business/creator account",
-            }
-        except RateLimitError as e:
-            return {
-                "valid": False,
-                "exists": None,
-                "is_business": None,
-                "error": f"Rate limited. Retry after {e.retry_after}s",
-            }
-        except InstagramAPIError as e:
-            return {
-                "valid": False,
-                "exists": None,
-                "is_business": None,
-                "error": e.message,
-            }
+        return {
+            "valid": False,
+            "exists": True,
+            "is_business": False,
+            "error": "Not a business/creator account",
+        }
@@ -0,0 +1,129 @@
+"""Compact, versioned encoding for Instagram cache entries
+
+Entries are stored as:
+
+    b"IG" | version (1 byte) | flags (1 byte) | body
+
+The body is the cache envelope serialized with msgpack (compact JSON if
+msgpack is not installed) and zlib-compressed above a size threshold. Only
+the fields the analysis pipeline reads are kept; large unused fields such as
+media_url/thumbnail_url are dropped.
+
+Entries written as plain JSON by older versions are still decoded.
+"""
+
+import json
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+import structlog
+
+from app.core.config import settings
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional speedup
+    msgpack = None
+
+logger = structlog.get_logger()
+
+MAGIC = b"IG"
+CODEC_VERSION = 1
+
+FLAG_COMPRESSED = 0x01
+FLAG_MSGPACK = 0x02
+
+# Media fields never read by the analysis pipeline
+DROPPED_MEDIA_FIELDS = {"media_url", "thumbnail_url"}
+
+
+def _slim_media(items: Any) -> Any:
+    if not isinstance(items, list):
+        return items
+    return [
+        {k: v for k, v in m.items() if k not in DROPPED_MEDIA_FIELDS}
+        if isinstance(m, dict)
+        else m
+        for m in items
+    ]
+
+
+def slim_payload(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop fields the pipeline does not read from a profile or media payload"""
+    data = dict(data)
+    # Media payload: {"data": [...], "limit": N}
+    if "data" in data:
+        data["data"] = _slim_media(data["data"])
+    # Profile with embedded media: {..., "media": {"data": [...], "paging": ...}}
+    if isinstance(data.get("media"), dict):
+        data["media"] = {"data": _slim_media(data["media"].get("data", []))}
+    return data
+
+
+def encode_entry(data: Dict[str, Any], ttl: int) -> bytes:
+    """
+    Encode a cache envelope.
+
+    Args:
+        data: Profile or media payload
+        ttl: Time to live in seconds (used to derive expires_at)
+
+    Returns:
+        Encoded bytes ready for Redis
+    """
+    cached_at = time.time()
+    envelope = {"d": slim_payload(data), "c": cached_at, "t": ttl}
+
+    flags = 0
+    if msgpack is not None:
+        body = msgpack.packb(envelope, use_bin_type=True)
+        flags |= FLAG_MSGPACK
+    else:
+        body = json.dumps(envelope, separators=(",", ":")).encode()
+
+    if len(body) >= settings.CACHE_COMPRESS_MIN_BYTES:
+        body = zlib.compress(body, 6)
+        flags |= FLAG_COMPRESSED
+
+    return MAGIC + bytes([CODEC_VERSION, flags]) + body
+
+
+def decode_entry(raw: bytes) -> Optional[Dict[str, Any]]:
+    """
+    Decode a cache entry into {"data", "cached_at", "expires_at"}.
+
+    Returns:
+        The envelope, or None if the entry cannot be decoded here (treat as
+        a cache miss)
+    """
+    if isinstance(raw, str):
+        raw = raw.encode()
+
+    # Plain JSON entries written before the compact encoding
+    if not raw.startswith(MAGIC):
+        return json.loads(raw)
+
+    version, flags = raw[2], raw[3]
+    if version != CODEC_VERSION:
+        logger.warning("Unknown cache encoding version", version=version)
+        return None
+
+    body = raw[4:]
+    if flags & FLAG_COMPRESSED:
+        body = zlib.decompress(body)
+
+    if flags & FLAG_MSGPACK:
+        if msgpack is None:
+            logger.warning("msgpack not installed, cannot decode cache entry")
+            return None
+        envelope = msgpack.unpackb(body, raw=False)
+    else:
+        envelope = json.loads(body)
+
+    cached_at = datetime.utcfromtimestamp(envelope["c"])
+    return {
+        "data": envelope["d"],
+        "cached_at": cached_at.isoformat(),
+        "expires_at": (cached_at + timedelta(seconds=envelope["t"])).isoformat(),
+    }
@@ -0,0 +1,320 @@
+"""Pool of Instagram credentials, each with its own rate limit bucket
+
+Every access token / business account pair gets its own Redis token bucket.
+acquire() charges the credential with the most remaining capacity, so
+throughput grows with the number of credentials. Credentials that the Graph
+API rejects or throttles are ejected from the pool for a while; ejections
+are stored in Redis so every worker skips them.
+"""
+
+import asyncio
+import hashlib
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+import redis.asyncio as redis
+import structlog
+
+from app.core.config import settings
+from app.services.instagram.rate_limiter import (
+    PRIORITY_INTERACTIVE,
+    Reservation,
+    TokenBucketRateLimiter,
+    RateLimitExceeded,
+)
+
+logger = structlog.get_logger()
+
+# Bucket of the INSTAGRAM_ACCESS_TOKEN pair (kept from the single-credential
+# setup so its state carries over)
+PRIMARY_BUCKET_KEY = "instagram_api_rate_limit"
+
+
+class NoActiveCredentialsError(RateLimitExceeded):
+    """Raised when every credential in the pool is ejected"""
+
+    pass
+
+
+@dataclass(frozen=True)
+class Credential:
+    """An access token and the business account it queries through"""
+
+    id: str
+    access_token: str = field(repr=False)
+    business_account_id: str
+
+    @classmethod
+    def create(cls, access_token: str, business_account_id: str) -> "Credential":
+        # The id goes into Redis keys and logs, so it must not reveal the token
+        digest = hashlib.sha256(access_token.encode()).hexdigest()[:10]
+        return cls(f"{business_account_id}:{digest}", access_token, business_account_id)
+
+
+def parse_credentials(entries: List[str]) -> List[Credential]:
+    """Parse "<access_token>:<business_account_id>" entries"""
+    credentials = []
+    for entry in entries:
+        token, sep, account_id = entry.rpartition(":")
+        if not sep or not token or not account_id:
+            logger.warning("Ignoring malformed Instagram credential entry")
+            continue
+        credentials.append(Credential.create(token, account_id))
+    return credentials
+
+
+class CredentialPool:
+    """Chooses, charges and ejects credentials"""
+
+    def __init__(
+        self,
+        credentials: List[Credential],
+        limiters: Optional[Dict[str, TokenBucketRateLimiter]] = None,
+        redis_client: Optional[redis.Redis] = None,
+        key_prefix: str = "ig:cred",
+    ):
+        if not credentials:
+            raise ValueError("At least one Instagram credential is required")
+        self.credentials = credentials
+        limiters = dict(limiters or {})
+        for credential in credentials:
+            limiters.setdefault(
+                credential.id,
+                TokenBucketRateLimiter(
+                    redis_client, bucket_key=f"{PRIMARY_BUCKET_KEY}:{credential.id}"
+                ),
+            )
+        self.limiters = limiters
+        self.redis = redis_client
+        self.key_prefix = key_prefix
+        # Local fallback for ejections when Redis is not available
+        self._local_ejections: Dict[str, float] = {}
+
+    @classmethod
+    def from_settings(
+        cls,
+        access_token: Optional[str] = None,
+        business_account_id: Optional[str] = None,
+        rate_limiter: Optional[TokenBucketRateLimiter] = None,
+    ) -> "CredentialPool":
+        """
+        Build the pool from INSTAGRAM_ACCESS_TOKEN/INSTAGRAM_BUSINESS_ACCOUNT_ID
+        plus INSTAGRAM_CREDENTIALS.
+
+        Args:
+            access_token: Primary token (default: INSTAGRAM_ACCESS_TOKEN); when
+                given explicitly, the pool holds only this credential
+            business_account_id: Business account of the primary token
+            rate_limiter: Bucket for the primary credential
+        """
+        primary_token = access_token or settings.INSTAGRAM_ACCESS_TOKEN
+        primary_account = business_account_id or settings.INSTAGRAM_BUSINESS_ACCOUNT_ID
+
+        credentials: List[Credential] = []
+        limiters: Dict[str, TokenBucketRateLimiter] = {}
+        if primary_token and primary_account:
+            primary = Credential.create(primary_token, primary_account)
+            credentials.append(primary)
+            limiters[primary.id] = rate_limiter or TokenBucketRateLimiter(
+                bucket_key=PRIMARY_BUCKET_KEY
+            )
+        if access_token is None:
+            seen = {c.id for c in credentials}
+            for credential in parse_credentials(settings.INSTAGRAM_CREDENTIALS):
+                if credential.id not in seen:
+                    seen.add(credential.id)
+                    credentials.append(credential)
+
+        return cls(credentials, limiters)
+
+    @property
+    def size(self) -> int:
+        return len(self.credentials)
+
+    async def _get_redis(self) -> redis.Redis:
+        """Get or create Redis connection"""
+        if self.redis is None:
+            self.redis = redis.from_url(settings.REDIS_URL)
+        return self.redis
+
+    def _ejected_key(self, credential: Credential) -> str:
+        return f"{self.key_prefix}:ejected:{credential.id}"
+
+    async def _active(self) -> List[Credential]:
+        """Credentials not currently ejected"""
+        try:
+            r = await self._get_redis()
+            ejected = await r.mget([self._ejected_key(c) for c in self.credentials])
+            return [c for c, flag in zip(self.credentials, ejected) if flag is None]
+        except redis.ConnectionError:
+            now = time.monotonic()
+            return [
+                c
+                for c in self.credentials
+                if self._local_ejections.get(c.id, 0) <= now
+            ]
+
+    async def _ranked(self, priority: str) -> List[Credential]:
+        """Active credentials, most capacity left in the lane first"""
+        active = await self._active()
+        if len(active) > 1:
+            statuses = await asyncio.gather(
+                *(self.limiters[c.id].get_status() for c in active)
+            )
+            ranked = sorted(
+                zip(active, statuses),
+                key=lambda cs: cs[1]["lanes"].get(priority, 0),
+                reverse=True,
+            )
+            active = [c for c, _ in ranked]
+        return active
+
+    async def acquire(
+        self,
+        tokens: int = 1,
+        block: bool = True,
+        timeout: Optional[float] = None,
+        priority: str = PRIORITY_INTERACTIVE,
+    ) -> Credential:
+        """
+        Charge tokens to the credential with the most remaining capacity.
+
+        Args:
+            tokens: Number of tokens to acquire (usually 1 per API call)
+            block: If True, wait until some credential has capacity
+            timeout: Maximum time to wait (seconds)
+            priority: Rate limit lane to charge
+
+        Returns:
+            The charged credential; use it for the API call
+
+        Raises:
+            NoActiveCredentialsError: If every credential is ejected
+            RateLimitExceeded: If no credential has capacity and block=False
+                (or the timeout expired)
+        """
+        start_time = time.time()
+        if timeout is None:
+            timeout = settings.INSTAGRAM_RATE_LIMIT_MAX_WAIT_SECONDS
+
+        active = await self._ranked(priority)
+        if not active:
+            # Ejections last minutes to an hour: fail now instead of waiting
+            raise NoActiveCredentialsError("All Instagram credentials are ejected")
+
+        best: Optional[Credential] = None
+        retry_after = 10
+        for credential in active:
+            acquired, wait = await self.limiters[credential.id].try_acquire(
+                tokens, priority
+            )
+            if acquired:
+                return credential
+            if best is None or wait < retry_after:
+                best, retry_after = credential, wait
+
+        if not block:
+            raise RateLimitExceeded(
+                f"Rate limit exceeded. Try again in {retry_after} seconds"
+            )
+
+        remaining = timeout - (time.time() - start_time)
+        if remaining <= 0:
+            raise RateLimitExceeded("Timeout waiting for rate limit")
+
+        # Queue on the credential that frees up first
+        await self.limiters[best.id].acquire(
+            tokens, timeout=remaining, priority=priority
+        )
+        return best
+
+    async def reserve(
+        self, tokens: int, priority: str = PRIORITY_INTERACTIVE
+    ) -> Tuple[Credential, Reservation]:
+        """
+        Reserve tokens for a job on the credential with the most capacity.
+
+        Args:
+            tokens: Tokens the job expects to spend
+            priority: Rate limit lane to charge
+
+        Returns:
+            Tuple of (credential, reservation); the reservation may hold fewer
+            tokens than requested (see TokenBucketRateLimiter.reserve)
+        """
+        active = await self._ranked(priority)
+        if not active:
+            # Every credential is ejected: the job waits in acquire() instead
+            credential = self.credentials[0]
+            return credential, Reservation(self.limiters[credential.id], 0, priority)
+        credential = active[0]
+        reservation = await self.limiters[credential.id].reserve(tokens, priority)
+        return credential, reservation
+
+    async def eject(self, credential: Credential, seconds: int, reason: str) -> bool:
+        """
+        Take a credential out of rotation for every worker for a while.
+
+        The last active credential is never ejected: the error then reaches
+        the caller instead of every later call failing without trying.
+
+        Returns:
+            True if the credential was ejected
+        """
+        active = await self._active()
+        if [c.id for c in active] == [credential.id]:
+            logger.warning(
+                "Not ejecting the last active Instagram credential",
+                credential=credential.id,
+                reason=reason,
+            )
+            return False
+
+        seconds = max(1, int(seconds))
+        logger.warning(
+            "Ejecting Instagram credential",
+            credential=credential.id,
+            seconds=seconds,
+            reason=reason,
+        )
+        self._local_ejections[credential.id] = time.monotonic() + seconds
+        try:
+            r = await self._get_redis()
+            await r.set(self._ejected_key(credential), reason[:200], ex=seconds)
+        except redis.ConnectionError:
+            pass
+        return True
+
+    async def get_status(self) -> dict:
+        """Combined rate limit status, with a per-credential breakdown"""
+        active_ids = {c.id for c in await self._active()}
+        statuses = await asyncio.gather(
+            *(self.limiters[c.id].get_status() for c in self.credentials)
+        )
+        available = sum(
+            s["available_calls"]
+            for c, s in zip(self.credentials, statuses)
+            if c.id in active_ids
+        )
+        max_calls = sum(s["max_calls"] for s in statuses)
+        lanes: Dict[str, int] = {}
+        for c, s in zip(self.credentials, statuses):
+            if c.id in active_ids:
+                for lane, lane_available in s["lanes"].items():
+                    lanes[lane] = lanes.get(lane, 0) + lane_available
+        return {
+            "available_calls": available,
+            "max_calls": max_calls,
+            "used_calls": max_calls - available,
+            "reset_time": max(s["reset_time"] for s in statuses),
+            "lanes": lanes,
+            "credentials": [
+                {
+                    "id": c.id,
+                    "active": c.id in active_ids,
+                    "available_calls": s["available_calls"],
+                    "max_calls": s["max_calls"],
+                }
+                for c, s in zip(self.credentials, statuses)
+            ],
+        }
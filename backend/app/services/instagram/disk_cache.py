@@ -0,0 +1,165 @@
+"""Per-host SQLite cache used as a fallback tier while Redis is unavailable
+
+Every Redis write is mirrored here (write-through), so when Redis goes down
+reads can still be served from disk. Entries written during an outage are
+marked dirty and pushed back to Redis once it returns (see
+cache._resync_from_disk).
+
+Rows hold the same encoded payload Redis does and expire at the Redis
+(hard) TTL. SQLite calls run in a thread so they never block the event loop;
+WAL mode lets every worker process on the host share one file.
+"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+# Expired rows are pruned every this many writes
+PRUNE_EVERY_WRITES = 500
+
+
+class DiskCache:
+    """SQLite-backed key/value store with expiries and dirty tracking"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " payload BLOB NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " dirty INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS entries_dirty ON entries (dirty)"
+                " WHERE dirty = 1"
+            )
+            self._conn = conn
+        return self._conn
+
+    # --------------------
+    # Blocking implementations (run in a thread)
+    # --------------------
+
+    def _get_many_sync(self, keys: List[str]) -> Dict[str, bytes]:
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT key, payload FROM entries"
+                f" WHERE key IN ({placeholders}) AND expires_at > ?",
+                [*keys, time.time()],
+            )
+            return {key: payload for key, payload in rows}
+
+    def _put_many_sync(
+        self, items: List[Tuple[str, bytes, int]], dirty: bool
+    ) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO entries (key, payload, expires_at, dirty)"
+                    " VALUES (?, ?, ?, ?)",
+                    [
+                        (key, payload, now + ttl, int(dirty))
+                        for key, payload, ttl in items
+                    ],
+                )
+                self._writes += len(items)
+                if self._writes >= PRUNE_EVERY_WRITES:
+                    self._writes = 0
+                    conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+
+    def _delete_many_sync(self, keys: List[str]) -> None:
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(f"DELETE FROM entries WHERE key IN ({placeholders})", keys)
+
+    def _dirty_sync(self, limit: int) -> List[Tuple[str, bytes, int]]:
+        now = time.time()
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT key, payload, expires_at FROM entries"
+                " WHERE dirty = 1 AND expires_at > ? LIMIT ?",
+                (now, limit),
+            )
+            return [
+                (key, payload, int(expires_at - now))
+                for key, payload, expires_at in rows
+            ]
+
+    def _mark_clean_sync(self, keys: List[str]) -> None:
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    f"UPDATE entries SET dirty = 0 WHERE key IN ({placeholders})", keys
+                )
+
+    # --------------------
+    # Async API
+    # --------------------
+
+    async def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """Get live payloads by key (missing and expired keys are omitted)"""
+        if not keys:
+            return {}
+        return await asyncio.to_thread(self._get_many_sync, keys)
+
+    async def put_many(
+        self, items: List[Tuple[str, bytes, int]], dirty: bool = False
+    ) -> None:
+        """
+        Store (key, payload, ttl seconds) items.
+
+        Args:
+            items: Entries to store
+            dirty: True if the entries did not reach Redis and must be resynced
+        """
+        if items:
+            await asyncio.to_thread(self._put_many_sync, items, dirty)
+
+    async def delete_many(self, keys: List[str]) -> None:
+        if keys:
+            await asyncio.to_thread(self._delete_many_sync, keys)
+
+    async def dirty(self, limit: int = 500) -> List[Tuple[str, bytes, int]]:
+        """Live entries written during an outage, as (key, payload, ttl left)"""
+        return await asyncio.to_thread(self._dirty_sync, limit)
+
+    async def mark_clean(self, keys: List[str]) -> None:
+        if keys:
+            await asyncio.to_thread(self._mark_clean_sync, keys)
+
+
+_disk_cache: Optional[DiskCache] = None
+
+
+def get_disk_cache() -> Optional[DiskCache]:
+    """Process-wide disk tier, or None if disabled (CACHE_DISK_ENABLED)"""
+    global _disk_cache
+    if not settings.CACHE_DISK_ENABLED:
+        return None
+    if _disk_cache is None:
+        _disk_cache = DiskCache(settings.CACHE_DISK_PATH)
+    return _disk_cache
@@ -0,0 +1,146 @@
+"""Distributed fetch lease for Instagram cache fills
+
+When several Celery workers miss the cache for the same username at once,
+only the worker holding the Redis lease calls the Graph API and fills the
+cache. The others wait for a release notification (pub/sub) and then read
+the cache. A lease expires on its own if its holder crashes.
+"""
+
+import asyncio
+import uuid
+from typing import Optional
+import redis.asyncio as redis
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+
+# Delete the lease only if we still own it, then wake up the waiters
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    redis.call('PUBLISH', KEYS[2], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+
+class DistributedFetchLock:
+    """Redis-based lease so only one worker fetches a given resource"""
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        lease_seconds: Optional[int] = None,
+        key_prefix: str = "ig:lock",
+    ):
+        self.redis = redis_client
+        self.lease_seconds = lease_seconds or settings.INSTAGRAM_FETCH_LOCK_SECONDS
+        self.key_prefix = key_prefix
+
+    async def _get_redis(self) -> redis.Redis:
+        """Get or create Redis connection"""
+        if self.redis is None:
+            self.redis = redis.from_url(settings.REDIS_URL)
+        return self.redis
+
+    def _lock_key(self, resource: str) -> str:
+        return f"{self.key_prefix}:{resource}"
+
+    def _channel(self, resource: str) -> str:
+        return f"{self.key_prefix}:released:{resource}"
+
+    async def acquire(self, resource: str) -> Optional[str]:
+        """
+        Try to take the lease for a resource (e.g. "profile:<username>").
+
+        Returns:
+            Lease token if acquired, None if another worker holds it, or ""
+            if Redis is unavailable (proceed without coordination)
+        """
+        token = uuid.uuid4().hex
+        try:
+            r = await self._get_redis()
+            acquired = await r.set(
+                self._lock_key(resource), token, nx=True, ex=self.lease_seconds
+            )
+        except redis.ConnectionError:
+            logger.warning("Redis unavailable, fetching without lease")
+            return ""
+
+        if acquired:
+            logger.debug("Fetch lease acquired", resource=resource)
+            return token
+        return None
+
+    async def release(self, resource: str, token: str) -> bool:
+        """Release a lease we hold and notify waiting workers"""
+        if not token:
+            return False
+        try:
+            r = await self._get_redis()
+            released = await r.eval(
+                RELEASE_SCRIPT,
+                2,
+                self._lock_key(resource),
+                self._channel(resource),
+                token,
+            )
+            return released == 1
+        except redis.ConnectionError:
+            return False
+
+    async def wait(self, resource: str, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until the current lease holder releases the resource.
+
+        Also returns when the lease expires (crashed holder), which publishes
+        no notification, by never waiting past the lease's remaining TTL.
+
+        Args:
+            resource: Resource name passed to acquire()
+            timeout: Maximum time to wait (defaults to the lease duration)
+
+        Returns:
+            True if the lease was released or expired, False on timeout
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.lease_seconds)
+        lock_key = self._lock_key(resource)
+
+        try:
+            r = await self._get_redis()
+            pubsub = r.pubsub()
+            # Subscribe before checking the lease so no release is missed
+            await pubsub.subscribe(self._channel(resource))
+        except redis.ConnectionError:
+            return True
+
+        try:
+            while True:
+                ttl_ms = await r.pttl(lock_key)
+                if ttl_ms == -2:  # Lease gone
+                    return True
+
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    logger.debug("Timed out waiting for fetch lease", resource=resource)
+                    return False
+
+                wait_for = remaining if ttl_ms < 0 else min(remaining, ttl_ms / 1000)
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=wait_for
+                )
+                if message is not None:
+                    return True
+        except redis.ConnectionError:
+            return True
+        finally:
+            try:
+                await pubsub.unsubscribe()
+                await pubsub.aclose()
+            except redis.ConnectionError:
+                pass
@@ -0,0 +1,181 @@
+"""Host-wide fallback token bucket used while Redis is unreachable
+
+Without Redis every process would fall back to a private bucket, so N API
+and worker processes could send N times the quota. Instead the fallback
+state lives in a small memory-mapped file updated under an exclusive flock,
+and every process on the host draws from the same bucket.
+
+The bucket only holds INSTAGRAM_DEGRADED_QUOTA_FRACTION of the quota; with
+several hosts, keep the fraction at most 1 / number of hosts so their sum
+stays within the real limit.
+"""
+
+import fcntl
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+MAGIC = b"IGRL"
+VERSION = 2
+
+
+@dataclass
+class BucketState:
+    """Fallback bucket state; mutate it inside HostBucket.transaction()"""
+
+    capacity: float
+    last_refill: float
+    blocked_until: float
+    # Last AIMD capacity step (see TokenBucketRateLimiter.record_usage)
+    last_adjust: float
+    tokens: Dict[str, float]
+
+
+class HostBucket:
+    """Bucket state shared by the processes of one host through an mmap"""
+
+    def __init__(self, path: str, lanes: List[Tuple[str, float]], capacity: float):
+        """
+        Args:
+            path: State file (created if missing)
+            lanes: (lane, share) pairs, in a fixed order
+            capacity: Hourly capacity of a fresh bucket
+        """
+        self.path = path
+        self.lanes = lanes
+        self.initial_capacity = capacity
+        self._format = "<4sI4d" + "d" * len(lanes)
+        self._size = struct.calcsize(self._format)
+        self._fd: Optional[int] = None
+        self._map: Optional[mmap.mmap] = None
+        self._pid: Optional[int] = None
+        # flock excludes other processes, this lock other threads
+        self._lock = threading.Lock()
+        # Used when the file cannot be opened (process-local, like before)
+        self._memory: Optional[BucketState] = None
+
+    @classmethod
+    def for_bucket(
+        cls, bucket_key: str, lanes: List[Tuple[str, float]], max_calls: int
+    ) -> "HostBucket":
+        """Fallback bucket of a Redis bucket key, sized by the degraded fraction"""
+        name = re.sub(r"[^A-Za-z0-9_.-]", "_", bucket_key)
+        return cls(
+            os.path.join(settings.INSTAGRAM_FALLBACK_BUCKET_DIR, f"{name}.bucket"),
+            lanes,
+            max_calls * settings.INSTAGRAM_DEGRADED_QUOTA_FRACTION,
+        )
+
+    def _fresh_state(self) -> BucketState:
+        return BucketState(
+            capacity=self.initial_capacity,
+            last_refill=time.time(),
+            blocked_until=0.0,
+            last_adjust=0.0,
+            tokens={
+                lane: self.initial_capacity * share for lane, share in self.lanes
+            },
+        )
+
+    def _ensure_open(self) -> bool:
+        """Map the state file in this process; False if it is unusable"""
+        if self._map is not None and self._pid == os.getpid():
+            return True
+        if self._map is not None:
+            # Inherited across fork: the child needs its own open file so
+            # flock excludes the parent too
+            self._map.close()
+            os.close(self._fd)
+            self._map = self._fd = None
+        try:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                if os.fstat(fd).st_size < self._size:
+                    os.ftruncate(fd, self._size)
+                self._map = mmap.mmap(fd, self._size)
+            except OSError:
+                os.close(fd)
+                raise
+        except OSError as e:
+            if self._memory is None:
+                logger.warning(
+                    "Host fallback bucket unavailable, using process-local bucket",
+                    path=self.path,
+                    error=str(e),
+                )
+                self._memory = self._fresh_state()
+            return False
+        self._fd = fd
+        self._pid = os.getpid()
+        return True
+
+    def _read(self) -> BucketState:
+        (
+            magic,
+            version,
+            capacity,
+            last_refill,
+            blocked_until,
+            last_adjust,
+            *tokens,
+        ) = struct.unpack_from(self._format, self._map)
+        if magic != MAGIC or version != VERSION:
+            # New (zero-filled) or written by another layout
+            return self._fresh_state()
+        return BucketState(
+            capacity=capacity,
+            last_refill=last_refill,
+            blocked_until=blocked_until,
+            last_adjust=last_adjust,
+            tokens={lane: t for (lane, _), t in zip(self.lanes, tokens)},
+        )
+
+    def _write(self, state: BucketState) -> None:
+        struct.pack_into(
+            self._format,
+            self._map,
+            0,
+            MAGIC,
+            VERSION,
+            state.capacity,
+            state.last_refill,
+            state.blocked_until,
+            state.last_adjust,
+            *(state.tokens.get(lane, 0.0) for lane, _ in self.lanes),
+        )
+
+    @contextmanager
+    def transaction(self) -> Iterator[BucketState]:
+        """Read the state under an exclusive host-wide lock, write it back on exit"""
+        with self._lock:
+            if not self._ensure_open():
+                yield self._memory
+                return
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                state = self._read()
+                yield state
+                self._write(state)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def reset(self) -> None:
+        """Start over with a full bucket (for testing)"""
+        with self.transaction() as state:
+            fresh = self._fresh_state()
+            state.capacity = fresh.capacity
+            state.last_refill = fresh.last_refill
+            state.blocked_until = fresh.blocked_until
+            state.last_adjust = fresh.last_adjust
+            state.tokens = fresh.tokens
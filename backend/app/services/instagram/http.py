@@ -0,0 +1,87 @@
+"""Shared HTTP transport for Instagram Graph API calls
+
+Keeps a single pooled, keep-alive httpx.AsyncClient per process so that
+Business Discovery requests reuse TCP/TLS connections to graph.facebook.com
+instead of paying DNS, TCP and TLS setup on every call.
+"""
+
+import asyncio
+from typing import Optional
+import httpx
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package (httpx[http2])"""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _build_client() -> httpx.AsyncClient:
+    """Create the pooled client from settings"""
+    http2 = settings.INSTAGRAM_HTTP2 and _http2_available()
+    if settings.INSTAGRAM_HTTP2 and not http2:
+        logger.warning("h2 not installed, falling back to HTTP/1.1")
+
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(settings.INSTAGRAM_HTTP_TIMEOUT_SECONDS),
+        limits=httpx.Limits(
+            max_connections=settings.INSTAGRAM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.INSTAGRAM_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=settings.INSTAGRAM_HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        http2=http2,
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Get the process-wide Instagram HTTP client.
+
+    Pooled connections belong to the event loop that opened them, so a new
+    client is created if called from a different loop than the current one.
+
+    Returns:
+        Shared httpx.AsyncClient
+    """
+    global _client, _client_loop
+
+    loop = asyncio.get_running_loop()
+    if _client is not None and not _client.is_closed and _client_loop is loop:
+        return _client
+
+    if _client is not None and _client_loop is not loop:
+        logger.debug("Event loop changed, creating new Instagram HTTP client")
+
+    _client = _build_client()
+    _client_loop = loop
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the shared client (call on app/worker shutdown)"""
+    global _client, _client_loop
+
+    client, loop = _client, _client_loop
+    _client, _client_loop = None, None
+
+    if client is None or client.is_closed:
+        return
+
+    if loop is not asyncio.get_running_loop():
+        # Connections of a foreign loop cannot be closed from here
+        logger.debug("Dropping Instagram HTTP client bound to another loop")
+        return
+
+    await client.aclose()
+    logger.info("Instagram HTTP client closed")
@@ -0,0 +1,114 @@
+"""Bounded in-process TTL/LRU cache (L1 tier in front of Redis)
+
+Holds already-decoded cache entries so repeated reads of the same profile in
+one process skip the Redis round-trip and JSON decoding.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+
+class LocalTTLCache:
+    """LRU cache bounded by entry count and (approximate) bytes, with TTLs"""
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (value, expires_at monotonic, size in bytes)
+        self._entries: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get a live entry and mark it most recently used"""
+        item = self._entries.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+
+        value, expires_at, _ = item
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, size: int, ttl_seconds: float) -> None:
+        """
+        Store an entry.
+
+        Args:
+            key: Cache key
+            value: Decoded value (shared with callers; treat as read-only)
+            size: Approximate size in bytes (e.g. the encoded Redis payload)
+            ttl_seconds: Time to live; entries never outlive their Redis copy
+        """
+        if ttl_seconds <= 0 or size > self.max_bytes:
+            return
+
+        self._remove(key)
+        self._entries[key] = (value, time.monotonic() + ttl_seconds, size)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def delete(self, key: str) -> bool:
+        """Drop an entry (e.g. on invalidation)"""
+        return self._remove(key)
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        self._entries.clear()
+        self._bytes = 0
+
+    def _remove(self, key: str) -> bool:
+        item = self._entries.pop(key, None)
+        if item is None:
+            return False
+        self._bytes -= item[2]
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+_local_cache: Optional[LocalTTLCache] = None
+
+
+def get_local_cache() -> Optional[LocalTTLCache]:
+    """Process-wide L1 cache, or None if disabled (CACHE_LOCAL_ENABLED)"""
+    global _local_cache
+    if not settings.CACHE_LOCAL_ENABLED:
+        return None
+    if _local_cache is None:
+        _local_cache = LocalTTLCache(
+            max_entries=settings.CACHE_LOCAL_MAX_ENTRIES,
+            max_bytes=settings.CACHE_LOCAL_MAX_BYTES,
+        )
+    return _local_cache
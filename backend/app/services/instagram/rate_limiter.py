@@ -5,16 +5,53 @@ Instagram's 200 calls/hour limit across all workers.
 """
 
 import asyncio
+import math
 import time
-from typing import Optional
+import uuid
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 import redis.asyncio as redis
 import structlog
 
 from app.core.config import settings
+from app.services.instagram.host_bucket import BucketState, HostBucket
 
 logger = structlog.get_logger()
 
+# Priority lanes, highest priority first
+PRIORITY_INTERACTIVE = "interactive"  # Jobs a user is waiting on
+PRIORITY_BACKGROUND = "background"  # Stale refreshes, cache warming
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND)
+
+
+# Blocked acquire() calls queue up per bucket lane (sorted set by arrival
+# time) and are woken through this channel when it is their turn
+WAKE_CHANNEL = "instagram_api_rate_limit:wake"
+# Queued waiters re-check at least this often, which keeps their entry alive
+WAITER_RECHECK_SECONDS = 30
+# Entries of waiters that stopped re-checking (crashed worker) expire after
+WAITER_TTL_SECONDS = 90
+
+# Lua helper shared by the scripts: oldest live waiter of a queue, dropping
+# entries whose liveness key has expired
+QUEUE_LUA = (
+    """
+local wake_channel = '"""
+    + WAKE_CHANNEL
+    + """'
+local function queue_head(queue)
+    while true do
+        local first = redis.call('ZRANGE', queue, 0, 0)[1]
+        if not first then return nil end
+        if redis.call('EXISTS', queue .. ':alive:' .. first) == 1 then
+            return first
+        end
+        redis.call('ZREM', queue, first)
+    end
+end
+"""
+)
+
 
 class RateLimitExceeded(Exception):
     """Raised when rate limit is exceeded and no capacity available"""
@@ -22,12 +59,106 @@ class RateLimitExceeded(Exception):
     pass
 
 
+class _WakeupHub:
+    """
+    Per-process subscription to WAKE_CHANNEL.
+
+    Waiters register an event under their id. The scripts publish the id of
+    the waiter whose turn has come, so only that coroutine wakes up.
+    """
+
+    def __init__(self):
+        self._events: Dict[str, asyncio.Event] = {}
+        self._listener: Optional[asyncio.Task] = None
+
+    async def register(self, r: redis.Redis, waiter_id: str) -> asyncio.Event:
+        event = asyncio.Event()
+        self._events[waiter_id] = event
+        listener = self._listener
+        if (
+            listener is None
+            or listener.done()
+            or listener.get_loop() is not asyncio.get_running_loop()
+        ):
+            pubsub = r.pubsub()
+            await pubsub.subscribe(WAKE_CHANNEL)
+            self._listener = asyncio.create_task(self._listen(pubsub))
+        return event
+
+    def unregister(self, waiter_id: str) -> None:
+        self._events.pop(waiter_id, None)
+
+    async def close(self) -> None:
+        """Stop the listener and release its pub/sub connection"""
+        listener, self._listener = self._listener, None
+        if listener is None or listener.done():
+            return
+        if listener.get_loop() is not asyncio.get_running_loop():
+            # Started on another (closed) loop: nothing left to await here
+            return
+        listener.cancel()
+        await asyncio.gather(listener, return_exceptions=True)
+
+    async def _listen(self, pubsub) -> None:
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                data = message["data"]
+                waiter_id = data.decode() if isinstance(data, bytes) else str(data)
+                event = self._events.get(waiter_id)
+                if event is not None:
+                    event.set()
+        except redis.ConnectionError:
+            # Waiters fall back to their timed re-checks
+            logger.warning("Rate limit wake-up subscription lost")
+        finally:
+            try:
+                await pubsub.reset()
+            except Exception:
+                pass
+
+
+_wakeups = _WakeupHub()
+
+
+async def close_wakeup_listener() -> None:
+    """Close this process's rate limit wake-up subscription (call on shutdown)"""
+    await _wakeups.close()
+
+
+def lane_shares() -> List[Tuple[str, float]]:
+    """(lane, share of the bucket) pairs from INSTAGRAM_PRIORITY_SHARES"""
+    shares = [
+        (lane, max(0.0, float(settings.INSTAGRAM_PRIORITY_SHARES.get(lane, 0))))
+        for lane in PRIORITIES
+    ]
+    total = sum(share for _, share in shares)
+    if total <= 0:
+        return [(lane, 1 / len(PRIORITIES)) for lane in PRIORITIES]
+    return [(lane, share / total) for lane, share in shares]
+
+
 class TokenBucketRateLimiter:
     """
     Token bucket rate limiter using Redis for distributed coordination.
 
     Instagram Graph API limit: 200 calls per hour per app.
     We use a conservative limit of 180 calls/hour to have a safety buffer.
+
+    That figure is only an estimate of the real quota. record_usage() feeds
+    back the usage the Graph API reports in its response headers: the
+    bucket's hourly capacity shrinks while reported usage is above
+    INSTAGRAM_USAGE_TARGET_PERCENT and grows while it is well below, the
+    available tokens never exceed the quota the API reports as left
+    ((100 - usage)% of capacity), and the bucket stays empty until the API
+    says access is regained.
+
+    The bucket is split into priority lanes, each refilled at its share of
+    the rate (INSTAGRAM_PRIORITY_SHARES). A lane spends its own tokens first
+    and then borrows idle tokens from the other lanes, but never below
+    INSTAGRAM_PRIORITY_FLOOR of their share, so a background burst cannot
+    drain what interactive jobs are guaranteed (nor the reverse).
     """
 
     def __init__(
@@ -40,10 +171,13 @@ class TokenBucketRateLimiter:
         self.max_calls = max_calls_per_hour
         self.bucket_key = bucket_key
         self.window_seconds = 3600  # 1 hour
+        self.lanes = lane_shares()
 
-        # Local fallback for when Redis is not available (single instance only)
-        self._local_tokens = max_calls_per_hour
-        self._local_last_refill = time.time()
+        # Fallback for when Redis is not available, shared by every process
+        # on the host and holding only its degraded share of the quota
+        self._host_bucket = HostBucket.for_bucket(
+            bucket_key, self.lanes, max_calls_per_hour
+        )
 
     async def _get_redis(self) -> redis.Redis:
         """Get or create Redis connection"""
@@ -51,16 +185,32 @@ class TokenBucketRateLimiter:
             self.redis = redis.from_url(settings.REDIS_URL)
         return self.redis
 
+    def _lane_args(self) -> List:
+        """Script arguments describing the lanes (name, share pairs)"""
+        args: List = []
+        for lane, share in self.lanes:
+            args.extend((lane, share))
+        return args
+
     async def acquire(
-        self, tokens: int = 1, block: bool = True, timeout: Optional[float] = None
+        self,
+        tokens: int = 1,
+        block: bool = True,
+        timeout: Optional[float] = None,
+        priority: str = PRIORITY_INTERACTIVE,
     ) -> bool:
         """
         Attempt to acquire tokens from the bucket.
 
+        Blocked callers wait in a FIFO queue per lane: the oldest waiter is
+        served first and sleeps until its tokens have refilled (or returned
+        tokens wake it), the others until they are at the head.
+
         Args:
             tokens: Number of tokens to acquire (usually 1 per API call)
             block: If True, wait until tokens are available
             timeout: Maximum time to wait (seconds)
+            priority: Lane to charge (PRIORITY_INTERACTIVE/PRIORITY_BACKGROUND)
 
         Returns:
             True if tokens were acquired, False otherwise
@@ -69,69 +219,337 @@ class TokenBucketRateLimiter:
             RateLimitExceeded: If tokens cannot be acquired and block=False
         """
         start_time = time.time()
+        available, retry_after = await self._check_and_consume(tokens, priority)
+
+        if available:
+            return True
+
+        if not block:
+            raise RateLimitExceeded(
+                f"Rate limit exceeded. Try again in {retry_after} seconds"
+            )
 
-        while True:
-            available, retry_after = await self._check_and_consume(tokens)
+        return await self._wait_in_queue(tokens, priority, timeout, start_time)
 
-            if available:
-                return True
+    def _queue_key(self, priority: str) -> str:
+        return f"{self.bucket_key}:queue:{priority}"
 
-            if not block:
-                raise RateLimitExceeded(
-                    f"Rate limit exceeded. Try again in {retry_after} seconds"
+    async def _wait_in_queue(
+        self,
+        tokens: int,
+        priority: str,
+        timeout: Optional[float],
+        start_time: float,
+    ) -> bool:
+        """Queue for tokens until it is our turn and they have refilled"""
+        waiter_id = uuid.uuid4().hex
+        try:
+            event = await _wakeups.register(await self._get_redis(), waiter_id)
+        except redis.ConnectionError:
+            # Never set: the timed re-checks below still work
+            event = asyncio.Event()
+
+        acquired = False
+        try:
+            while True:
+                event.clear()
+                acquired, retry_ms, _ = await self._consume(
+                    tokens, priority, waiter_id=waiter_id
+                )
+                if acquired:
+                    return True
+
+                elapsed = time.time() - start_time
+                if timeout and elapsed >= timeout:
+                    raise RateLimitExceeded("Timeout waiting for rate limit")
+
+                # At the head: until the tokens have refilled. Behind other
+                # waiters (retry_ms None): until woken up
+                wait_time = WAITER_RECHECK_SECONDS
+                if retry_ms is not None:
+                    wait_time = min(wait_time, retry_ms / 1000)
+                if timeout:
+                    wait_time = min(wait_time, timeout - elapsed)
+                logger.debug(
+                    "Rate limit reached, waiting",
+                    wait_seconds=round(wait_time, 3),
+                    queued=retry_ms is None,
                 )
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=wait_time)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            _wakeups.unregister(waiter_id)
+            if not acquired:
+                await self._leave_queue(priority, waiter_id)
+
+    async def _leave_queue(self, priority: str, waiter_id: str) -> None:
+        """Drop a waiter that gave up, handing its turn to the next one"""
+        lua_script = (
+            QUEUE_LUA
+            + """
+            local queue = KEYS[1]
+            local waiter = ARGV[1]
+            local was_head = queue_head(queue) == waiter
+            redis.call('ZREM', queue, waiter)
+            redis.call('DEL', queue .. ':alive:' .. waiter)
+            if was_head then
+                local next_waiter = queue_head(queue)
+                if next_waiter then
+                    redis.call('PUBLISH', wake_channel, next_waiter)
+                end
+            end
+            return 1
+            """
+        )
+        try:
+            r = await self._get_redis()
+            await r.eval(lua_script, 1, self._queue_key(priority), waiter_id)
+        except redis.ConnectionError:
+            pass
+
+    async def try_acquire(
+        self, tokens: int = 1, priority: str = PRIORITY_INTERACTIVE
+    ) -> tuple[bool, int]:
+        """
+        Take tokens if available, without waiting or raising.
+
+        Returns:
+            Tuple of (acquired: bool, retry_after_seconds: int)
+        """
+        return await self._check_and_consume(tokens, priority)
 
-            if timeout and (time.time() - start_time) >= timeout:
-                raise RateLimitExceeded("Timeout waiting for rate limit")
+    async def reserve(
+        self, tokens: int, priority: str = PRIORITY_INTERACTIVE
+    ) -> "Reservation":
+        """
+        Set tokens aside for one job up front.
+
+        Takes as many of the requested tokens as are available right now
+        (possibly none) without waiting; calls beyond the reservation fall
+        back to acquire(). Release the reservation when the job ends to
+        return what it did not use.
 
-            # Wait before retrying
-            wait_time = min(retry_after, 10)  # Max 10 second wait between checks
-            logger.debug("Rate limit reached, waiting", wait_seconds=wait_time)
-            await asyncio.sleep(wait_time)
+        Args:
+            tokens: Tokens the job expects to spend
+            priority: Lane to charge
 
-    async def _check_and_consume(self, tokens: int) -> tuple[bool, int]:
+        Returns:
+            The Reservation holding the granted tokens
+        """
+        granted = 0
+        if tokens > 0:
+            _, _, granted = await self._consume(tokens, priority, partial=True)
+        logger.debug(
+            "Rate limit tokens reserved",
+            bucket=self.bucket_key,
+            requested=tokens,
+            granted=granted,
+        )
+        return Reservation(self, granted, priority)
+
+    async def refund(self, tokens: int, priority: str = PRIORITY_INTERACTIVE):
+        """Return unused tokens to a lane (capped at the lane's size)"""
+        if tokens <= 0:
+            return
+        try:
+            r = await self._get_redis()
+            lua_script = QUEUE_LUA + """
+            local key = KEYS[1]
+            local nominal = tonumber(ARGV[1])
+            local lane = ARGV[2]
+            local amount = tonumber(ARGV[3])
+            local share = 0
+            for i = 4, #ARGV, 2 do
+                if ARGV[i] == lane then share = tonumber(ARGV[i + 1]) end
+            end
+            -- Nothing to return to if the bucket has expired (it is full)
+            if redis.call('EXISTS', key) == 0 then return 0 end
+            local capacity = tonumber(redis.call('HGET', key, 'capacity')) or nominal
+            local field = 'tokens:' .. lane
+            local current = tonumber(redis.call('HGET', key, field)) or 0
+            redis.call('HSET', key, field, math.min(capacity * share, current + amount))
+
+            -- Let the oldest waiters have a go at the returned tokens
+            for i = 4, #ARGV, 2 do
+                local first = queue_head(key .. ':queue:' .. ARGV[i])
+                if first then redis.call('PUBLISH', wake_channel, first) end
+            end
+            return 1
+            """
+            await r.eval(
+                lua_script,
+                1,
+                self.bucket_key,
+                self.max_calls,
+                priority,
+                tokens,
+                *self._lane_args(),
+            )
+        except redis.ConnectionError:
+            shares = dict(self.lanes)
+            with self._host_bucket.transaction() as state:
+                self._local_refill(state, time.time())
+                state.tokens[priority] = min(
+                    state.capacity * shares.get(priority, 0),
+                    state.tokens.get(priority, 0) + tokens,
+                )
+
+    async def _check_and_consume(
+        self, tokens: int, priority: str = PRIORITY_INTERACTIVE
+    ) -> tuple[bool, int]:
         """
         Check availability and consume tokens if available.
 
         Returns:
             Tuple of (success: bool, retry_after_seconds: int)
         """
+        success, retry_ms, _ = await self._consume(tokens, priority)
+        # None: other callers are queued ahead
+        retry_after = 1 if retry_ms is None else math.ceil(retry_ms / 1000)
+        return success, retry_after
+
+    async def _consume(
+        self,
+        tokens: int,
+        priority: str,
+        partial: bool = False,
+        waiter_id: str = "",
+    ) -> Tuple[bool, Optional[int], int]:
+        """
+        Consume tokens from a lane, borrowing from the others if needed.
+
+        Nobody is served ahead of the lane's queued waiters: a queued caller
+        only gets tokens at the head of the queue, others not at all while
+        the queue is non-empty.
+
+        Args:
+            tokens: Tokens requested
+            priority: Lane to charge
+            partial: Take whatever is available (up to tokens) instead of
+                all or nothing
+            waiter_id: Queue entry of a blocked acquire() ("" = not queueing);
+                it is enqueued on failure and dequeued on success
+
+        Returns:
+            Tuple of (success: bool, retry_after_ms: int or None if waiting
+            behind other waiters, taken: int)
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown rate limit priority: {priority}")
         try:
             r = await self._get_redis()
             now = time.time()
 
             # Use Redis Lua script for atomic operation
-            lua_script = """
+            lua_script = QUEUE_LUA + """
             local key = KEYS[1]
-            local max_tokens = tonumber(ARGV[1])
             local window = tonumber(ARGV[2])
             local requested = tonumber(ARGV[3])
             local now = tonumber(ARGV[4])
-            
-            -- Get current state
-            local state = redis.call('HMGET', key, 'tokens', 'last_refill')
-            local current_tokens = tonumber(state[1]) or max_tokens
-            local last_refill = tonumber(state[2]) or now
-            
-            -- Calculate tokens to add based on time passed
+            local lane = ARGV[5]
+            local floor = tonumber(ARGV[6])
+            local partial = ARGV[7] == '1'
+            local waiter = ARGV[8]
+            local waiter_ttl = tonumber(ARGV[9])
+            local lanes, shares = {}, {}
+            for i = 10, #ARGV, 2 do
+                lanes[#lanes + 1] = ARGV[i]
+                shares[#shares + 1] = tonumber(ARGV[i + 1])
+            end
+
+            local queue = key .. ':queue:' .. lane
+            local function enqueue()
+                if waiter ~= '' then
+                    redis.call('ZADD', queue, 'NX', now, waiter)
+                    redis.call('EXPIRE', queue, waiter_ttl)
+                    redis.call(
+                        'SET', queue .. ':alive:' .. waiter, 1, 'EX', waiter_ttl
+                    )
+                end
+            end
+
+            -- First come, first served: wait behind older waiters
+            local first = queue_head(queue)
+            if first and first ~= waiter then
+                enqueue()
+                return {0, -1, '0'}
+            end
+
+            -- Get current state (capacity is adapted by record_usage)
+            local state = redis.call(
+                'HMGET', key, 'last_refill', 'capacity', 'blocked_until'
+            )
+            local max_tokens = tonumber(state[2]) or tonumber(ARGV[1])
+            local last_refill = tonumber(state[1]) or now
+            local blocked_until = tonumber(state[3]) or 0
+
+            -- The API told us to stay away until then
+            if now < blocked_until then
+                enqueue()
+                return {0, math.ceil((blocked_until - now) * 1000), '0'}
+            end
+
+            -- Refill every lane at its share of the rate
             local time_passed = now - last_refill
-            local tokens_to_add = (time_passed / window) * max_tokens
-            current_tokens = math.min(max_tokens, current_tokens + tokens_to_add)
-            
-            -- Check if we can fulfill the request
-            if current_tokens >= requested then
-                current_tokens = current_tokens - requested
-                redis.call('HMSET', key, 'tokens', current_tokens, 'last_refill', now)
-                redis.call('EXPIRE', key, window)
-                return {1, 0}  -- Success, no retry needed
-            else
-                -- Calculate retry after
-                local tokens_needed = requested - current_tokens
-                local retry_after = math.ceil((tokens_needed / max_tokens) * window)
-                redis.call('HMSET', key, 'tokens', current_tokens, 'last_refill', now)
-                redis.call('EXPIRE', key, window)
-                return {0, retry_after}  -- Failed, return retry_after
+            local current, own = {}, 1
+            for i, name in ipairs(lanes) do
+                local lane_max = max_tokens * shares[i]
+                local tokens = tonumber(redis.call('HGET', key, 'tokens:' .. name))
+                    or lane_max
+                current[i] = math.min(
+                    lane_max, tokens + (time_passed / window) * lane_max
+                )
+                if name == lane then own = i end
             end
+
+            -- Own tokens first, then the others' above their floor (lowest
+            -- priority lanes first)
+            local take, needed = {}, requested
+            take[own] = math.min(current[own], needed)
+            needed = needed - take[own]
+            for i = #lanes, 1, -1 do
+                if i ~= own and needed > 0 then
+                    local spare = current[i] - max_tokens * shares[i] * floor
+                    take[i] = math.min(math.max(spare, 0), needed)
+                    needed = needed - take[i]
+                end
+            end
+
+            local success = needed <= 0
+            local taken = 0
+            if success or partial then
+                for i, amount in pairs(take) do
+                    if partial then amount = math.floor(amount) end
+                    current[i] = current[i] - amount
+                    taken = taken + amount
+                end
+            end
+
+            redis.call('HSET', key, 'last_refill', now)
+            for i, name in ipairs(lanes) do
+                redis.call('HSET', key, 'tokens:' .. name, current[i])
+            end
+            redis.call('EXPIRE', key, window)
+
+            if success then
+                if first and first == waiter then
+                    -- Our turn is over: wake the next waiter
+                    redis.call('ZREM', queue, waiter)
+                    redis.call('DEL', queue .. ':alive:' .. waiter)
+                    local next_waiter = queue_head(queue)
+                    if next_waiter then
+                        redis.call('PUBLISH', wake_channel, next_waiter)
+                    end
+                end
+                return {1, 0, tostring(taken)}  -- Success, no retry needed
+            end
+            enqueue()
+            -- Calculate retry after (ms) from the lane's own refill rate
+            local rate = max_tokens * shares[own]
+            local retry_ms = math.ceil((needed / rate) * window * 1000)
+            return {partial and 1 or 0, retry_ms, tostring(taken)}
             """
 
             result = await r.eval(
@@ -142,41 +560,245 @@ class TokenBucketRateLimiter:
                 self.window_seconds,
                 tokens,
                 now,
+                priority,
+                settings.INSTAGRAM_PRIORITY_FLOOR,
+                "1" if partial else "0",
+                waiter_id,
+                WAITER_TTL_SECONDS,
+                *self._lane_args(),
             )
 
             success = result[0] == 1
-            retry_after = result[1]
+            retry_ms = result[1] if result[1] >= 0 else None
+            taken = int(float(result[2]))
 
-            return success, retry_after
+            return success, retry_ms, taken
 
         except redis.ConnectionError:
-            # Fallback to local rate limiting if Redis is unavailable
-            logger.warning("Redis unavailable, using local rate limiter")
-            return self._local_check_and_consume(tokens)
+            # Fall back to the host-wide bucket if Redis is unavailable
+            logger.warning("Redis unavailable, using host fallback rate limiter")
+            with self._host_bucket.transaction() as state:
+                return self._local_consume(state, tokens, priority, partial)
+
+    def _local_refill(self, state: BucketState, now: float) -> None:
+        time_passed = max(0.0, now - state.last_refill)
+        for lane, share in self.lanes:
+            lane_max = state.capacity * share
+            state.tokens[lane] = min(
+                lane_max,
+                state.tokens.get(lane, lane_max)
+                + (time_passed / self.window_seconds) * lane_max,
+            )
+        state.last_refill = now
 
-    def _local_check_and_consume(self, tokens: int) -> tuple[bool, int]:
-        """Local in-memory rate limiting (fallback)"""
+    def _local_consume(
+        self, state: BucketState, tokens: int, priority: str, partial: bool = False
+    ) -> Tuple[bool, int, int]:
+        """Fallback bucket consumption, same rules as _consume (no queueing)"""
         now = time.time()
-        time_passed = now - self._local_last_refill
+        if now < state.blocked_until:
+            return False, math.ceil((state.blocked_until - now) * 1000), 0
 
         # Refill tokens
-        tokens_to_add = (time_passed / self.window_seconds) * self.max_calls
-        self._local_tokens = min(self.max_calls, self._local_tokens + tokens_to_add)
-        self._local_last_refill = now
-
-        if self._local_tokens >= tokens:
-            self._local_tokens -= tokens
-            return True, 0
-        else:
-            tokens_needed = tokens - self._local_tokens
-            retry_after = int((tokens_needed / self.max_calls) * self.window_seconds)
-            return False, retry_after
+        self._local_refill(state, now)
+
+        shares = dict(self.lanes)
+        floor = settings.INSTAGRAM_PRIORITY_FLOOR
+        take = {priority: min(state.tokens[priority], tokens)}
+        needed = tokens - take[priority]
+        for lane, share in reversed(self.lanes):
+            if lane != priority and needed > 0:
+                spare = state.tokens[lane] - state.capacity * share * floor
+                take[lane] = min(max(spare, 0.0), needed)
+                needed -= take[lane]
+
+        success = needed <= 0
+        taken = 0
+        if success or partial:
+            for lane, amount in take.items():
+                if partial:
+                    amount = math.floor(amount)
+                state.tokens[lane] -= amount
+                taken += amount
+
+        if success:
+            return True, 0, int(taken)
+        rate = state.capacity * shares[priority]
+        retry_ms = math.ceil((needed / rate) * self.window_seconds * 1000)
+        return partial, retry_ms, int(taken)
+
+    def _adapt_capacity(
+        self, capacity: float, usage_percent: float, scale: float = 1.0
+    ) -> float:
+        """AIMD step of the hourly capacity for a reported usage"""
+        target = settings.INSTAGRAM_USAGE_TARGET_PERCENT
+        if usage_percent >= target:
+            capacity *= 0.75
+        elif usage_percent < target / 2:
+            capacity += self.max_calls * scale * 0.05
+        return min(
+            max(capacity, settings.INSTAGRAM_ADAPTIVE_MIN_CALLS_PER_HOUR * scale),
+            settings.INSTAGRAM_ADAPTIVE_MAX_CALLS_PER_HOUR * scale,
+        )
+
+    async def record_usage(self, usage_percent: float, regain_seconds: int = 0):
+        """
+        Feed back the usage reported by the Graph API.
+
+        Args:
+            usage_percent: Highest usage percentage from the X-App-Usage /
+                X-Business-Use-Case-Usage headers
+            regain_seconds: estimated_time_to_regain_access, in seconds (0 if
+                not throttled)
+        """
+        now = time.time()
+        regain_seconds = max(0, int(regain_seconds))
+        try:
+            r = await self._get_redis()
+
+            # Read, adapt and write back atomically so concurrent reports from
+            # other workers are not lost
+            lua_script = QUEUE_LUA + """
+            local key = KEYS[1]
+            local nominal = tonumber(ARGV[1])
+            local window = tonumber(ARGV[2])
+            local usage = tonumber(ARGV[3])
+            local regain = tonumber(ARGV[4])
+            local now = tonumber(ARGV[5])
+            local target = tonumber(ARGV[6])
+            local min_capacity = tonumber(ARGV[7])
+            local max_capacity = tonumber(ARGV[8])
+
+            local interval = tonumber(ARGV[9])
+
+            local state = redis.call(
+                'HMGET', key, 'capacity', 'last_refill', 'last_adjust'
+            )
+            local capacity = tonumber(state[1]) or nominal
+            local last_refill = tonumber(state[2]) or now
+            local last_adjust = tonumber(state[3]) or 0
+
+            -- Bring the lanes up to date before last_refill moves to now
+            local time_passed = now - last_refill
+            local current = {}
+            for i = 10, #ARGV, 2 do
+                local lane_max = capacity * tonumber(ARGV[i + 1])
+                local tokens = tonumber(redis.call('HGET', key, 'tokens:' .. ARGV[i]))
+                    or lane_max
+                current[i] = math.min(
+                    lane_max, tokens + (time_passed / window) * lane_max
+                )
+            end
+
+            -- Multiplicative decrease above the target, additive increase
+            -- well below it; at most one step per interval however many
+            -- responses report usage
+            if (usage >= target or usage < target / 2)
+                and now - last_adjust >= interval then
+                if usage >= target then
+                    capacity = capacity * 0.75
+                else
+                    capacity = capacity + nominal * 0.05
+                end
+                capacity = math.min(math.max(capacity, min_capacity), max_capacity)
+                redis.call('HSET', key, 'last_adjust', now)
+            end
+
+            -- Available tokens never exceed the quota the API reports as
+            -- left (100 - usage percent of capacity), split across the lanes
+            -- by share; tokens already spent by other workers stay spent.
+            -- Holding usage near the target is left to the capacity step.
+            local headroom = capacity * math.max(0, 100 - usage) / 100
+            if regain > 0 then headroom = 0 end
+            for i = 10, #ARGV, 2 do
+                redis.call(
+                    'HSET', key, 'tokens:' .. ARGV[i],
+                    math.min(current[i], headroom * tonumber(ARGV[i + 1]))
+                )
+            end
+
+            local ttl = window
+            if regain > 0 then
+                redis.call('HSET', key, 'blocked_until', now + regain)
+                ttl = math.max(window, regain)
+            end
+            redis.call(
+                'HSET', key, 'last_refill', now, 'capacity', capacity, 'usage', usage
+            )
+            redis.call('EXPIRE', key, math.ceil(ttl))
+
+            -- Headroom may have grown: let the oldest waiters re-check
+            if regain == 0 then
+                for i = 10, #ARGV, 2 do
+                    local first = queue_head(key .. ':queue:' .. ARGV[i])
+                    if first then redis.call('PUBLISH', wake_channel, first) end
+                end
+            end
+            return tostring(capacity)
+            """
+
+            capacity = await r.eval(
+                lua_script,
+                1,
+                self.bucket_key,
+                self.max_calls,
+                self.window_seconds,
+                usage_percent,
+                regain_seconds,
+                now,
+                settings.INSTAGRAM_USAGE_TARGET_PERCENT,
+                settings.INSTAGRAM_ADAPTIVE_MIN_CALLS_PER_HOUR,
+                settings.INSTAGRAM_ADAPTIVE_MAX_CALLS_PER_HOUR,
+                settings.INSTAGRAM_ADAPTIVE_INTERVAL_SECONDS,
+                *self._lane_args(),
+            )
+            capacity = float(capacity)
+        except redis.ConnectionError:
+            target = settings.INSTAGRAM_USAGE_TARGET_PERCENT
+            with self._host_bucket.transaction() as state:
+                self._local_refill(state, now)
+                if (
+                    usage_percent >= target or usage_percent < target / 2
+                ) and now - state.last_adjust >= (
+                    settings.INSTAGRAM_ADAPTIVE_INTERVAL_SECONDS
+                ):
+                    # The host bucket is scaled down to its degraded share
+                    state.capacity = self._adapt_capacity(
+                        state.capacity,
+                        usage_percent,
+                        settings.INSTAGRAM_DEGRADED_QUOTA_FRACTION,
+                    )
+                    state.last_adjust = now
+                capacity = state.capacity
+                # Same headroom as the Lua script: the quota left per the API
+                headroom = capacity * max(0.0, 100 - usage_percent) / 100
+                if regain_seconds:
+                    headroom = 0
+                    state.blocked_until = now + regain_seconds
+                for lane, share in self.lanes:
+                    state.tokens[lane] = min(state.tokens[lane], headroom * share)
+
+        if usage_percent >= settings.INSTAGRAM_USAGE_TARGET_PERCENT or regain_seconds:
+            logger.warning(
+                "Instagram API usage high",
+                bucket=self.bucket_key,
+                usage_percent=usage_percent,
+                regain_seconds=regain_seconds,
+                capacity=round(capacity, 1),
+            )
 
     async def get_status(self) -> dict:
         """Get current rate limit status"""
         try:
             r = await self._get_redis()
-            state = await r.hmget(self.bucket_key, "tokens", "last_refill")
+            state = await r.hmget(
+                self.bucket_key,
+                "last_refill",
+                "capacity",
+                "blocked_until",
+                "usage",
+                *(f"tokens:{lane}" for lane, _ in self.lanes),
+            )
 
             if state[0] is None:
                 return {
@@ -185,32 +807,60 @@ class TokenBucketRateLimiter:
                     "used_calls": 0,
                     "reset_time": datetime.utcnow()
                     + timedelta(seconds=self.window_seconds),
+                    "lanes": {
+                        lane: int(self.max_calls * share) for lane, share in self.lanes
+                    },
                 }
 
-            tokens = float(state[0])
-            last_refill = float(state[1])
+            last_refill = float(state[0])
+            max_calls = int(float(state[1])) if state[1] else self.max_calls
+            blocked_until = float(state[2]) if state[2] else 0.0
             now = time.time()
 
-            # Calculate current available tokens
+            # Calculate current available tokens per lane
             time_passed = now - last_refill
-            tokens_to_add = (time_passed / self.window_seconds) * self.max_calls
-            available = min(self.max_calls, tokens + tokens_to_add)
-
-            return {
-                "available_calls": int(available),
-                "max_calls": self.max_calls,
-                "used_calls": self.max_calls - int(available),
+            lanes = {}
+            for (lane, share), tokens in zip(self.lanes, state[4:]):
+                lane_max = max_calls * share
+                tokens = float(tokens) if tokens is not None else lane_max
+                tokens_to_add = (time_passed / self.window_seconds) * lane_max
+                lanes[lane] = int(min(lane_max, tokens + tokens_to_add))
+                if now < blocked_until:
+                    lanes[lane] = 0
+            available = sum(lanes.values())
+
+            status = {
+                "available_calls": available,
+                "max_calls": max_calls,
+                "used_calls": max_calls - available,
                 "reset_time": datetime.utcnow()
                 + timedelta(seconds=self.window_seconds),
+                "lanes": lanes,
             }
+            if state[3] is not None:
+                status["reported_usage_percent"] = float(state[3])
+            if now < blocked_until:
+                status["blocked_until"] = datetime.utcfromtimestamp(blocked_until)
+            return status
         except redis.ConnectionError:
+            now = time.time()
+            with self._host_bucket.transaction() as state:
+                self._local_refill(state, now)
+                max_calls = int(state.capacity)
+                blocked = now < state.blocked_until
+                lanes = {
+                    lane: 0 if blocked else int(tokens)
+                    for lane, tokens in state.tokens.items()
+                }
+            available = sum(lanes.values())
             return {
-                "available_calls": int(self._local_tokens),
-                "max_calls": self.max_calls,
-                "used_calls": self.max_calls - int(self._local_tokens),
+                "available_calls": available,
+                "max_calls": max_calls,
+                "used_calls": max_calls - available,
                 "reset_time": datetime.utcnow()
                 + timedelta(seconds=self.window_seconds),
-                "fallback": "local",
+                "lanes": lanes,
+                "fallback": "host",
             }
 
     async def reset(self):
@@ -221,5 +871,43 @@ class TokenBucketRateLimiter:
         except redis.ConnectionError:
             pass
 
-        self._local_tokens = self.max_calls
-        self._local_last_refill = time.time()
+        self._host_bucket.reset()
+
+
+class Reservation:
+    """
+    Tokens set aside for one job (see TokenBucketRateLimiter.reserve).
+
+    Not shared across processes: a job's tasks draw from it through take(),
+    and release() hands back what is left. Use as an async context manager
+    so the tokens are returned even if the job fails or is cancelled.
+    """
+
+    def __init__(self, limiter: TokenBucketRateLimiter, tokens: int, priority: str):
+        self.limiter = limiter
+        self.priority = priority
+        self.granted = tokens
+        self.remaining = tokens
+
+    def take(self, tokens: int = 1) -> int:
+        """Spend up to `tokens` reserved tokens; returns how many were spent"""
+        spent = min(tokens, self.remaining)
+        self.remaining -= spent
+        return spent
+
+    def untake(self, tokens: int) -> None:
+        """Put back tokens from take() whose API call never happened"""
+        self.remaining += tokens
+
+    async def release(self) -> int:
+        """Return the unused tokens to the bucket; returns how many"""
+        unused, self.remaining = self.remaining, 0
+        if unused:
+            await self.limiter.refund(unused, self.priority)
+        return unused
+
+    async def __aenter__(self) -> "Reservation":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.release()
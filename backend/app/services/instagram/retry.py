@@ -12,6 +12,10 @@ from app.services.instagram.client import (
     AccountNotFoundError,
     PrivateAccountError,
 )
+from app.services.instagram.circuit_breaker import (
+    CircuitOpenError,
+    get_circuit_breaker,
+)
 
 logger = structlog.get_logger()
 
@@ -25,6 +29,7 @@ def with_retry(
     exponential_base: float = 2.0,
     retryable_exceptions: tuple = (InstagramAPIError,),
     non_retryable_exceptions: tuple = (AccountNotFoundError, PrivateAccountError),
+    retry_budget: bool = True,
 ):
     """
     Decorator that adds exponential backoff retry logic to async functions.
@@ -36,6 +41,10 @@ def with_retry(
         exponential_base: Base for exponential backoff calculation
         retryable_exceptions: Tuple of exceptions that should trigger a retry
         non_retryable_exceptions: Tuple of exceptions that should NOT trigger a retry
+        retry_budget: Draw retries from the global retry budget (see
+            CircuitBreaker.try_spend_retry) and give up when it is exhausted
+
+    CircuitOpenError is never retried.
     """
 
     def decorator(func: Callable[..., T]) -> Callable[..., T]:
@@ -47,6 +56,10 @@ def with_retry(
                 try:
                     return await func(*args, **kwargs)
 
+                except CircuitOpenError:
+                    # Failing fast is the point: no waiting, no retrying
+                    raise
+
                 except non_retryable_exceptions as e:
                     # Don't retry for these exceptions
                     logger.debug(
@@ -67,6 +80,16 @@ def with_retry(
                         )
                         raise
 
+                    if retry_budget and not (
+                        await get_circuit_breaker().try_spend_retry()
+                    ):
+                        logger.warning(
+                            "Retry budget exhausted, not retrying",
+                            func=func.__name__,
+                            error=str(e),
+                        )
+                        raise
+
                     # Handle rate limit specially
                     if isinstance(e, RateLimitError):
                         delay = min(e.retry_after, max_delay)
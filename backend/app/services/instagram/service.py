@@ -1,50 +1,186 @@
 """High-level Instagram service with caching and rate limiting"""
 
-from typing import Optional, Dict, Any
-from datetime import datetime
+import asyncio
+import contextvars
+import math
+from contextlib import asynccontextmanager
+from typing import (
+    Optional,
+    Dict,
+    Any,
+    List,
+    Union,
+    AsyncIterator,
+    Tuple,
+    Set,
+    Callable,
+    Awaitable,
+    TypeVar,
+)
+from datetime import datetime, timezone
+import httpx
 import structlog
 
+from app.core.config import settings
+
 from app.services.instagram.client import (
     InstagramGraphAPI,
     InstagramProfile,
+    InstagramMedia,
     InstagramAPIError,
     AccountNotFoundError,
     PrivateAccountError,
+    RateLimitError,
+    CredentialError,
 )
+from app.services.instagram.credentials import Credential, CredentialPool
 from app.services.instagram.rate_limiter import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    Reservation,
     TokenBucketRateLimiter,
     RateLimitExceeded,
 )
-from app.services.instagram.cache import CacheManager
+from app.services.instagram.cache import (
+    CacheManager,
+    NEGATIVE_NOT_FOUND,
+    NEGATIVE_PRIVATE,
+)
+from app.services.instagram.circuit_breaker import (
+    CircuitBreaker,
+    CircuitOpenError,
+    get_circuit_breaker,
+)
+from app.services.instagram.fetch_lock import DistributedFetchLock
 from app.services.instagram.retry import with_retry
+from app.services.instagram.singleflight import SingleFlight
 
 logger = structlog.get_logger()
 
+T = TypeVar("T")
+
+# Shared by every InstagramService in the process so concurrent jobs
+# coalesce fetches for the same username
+_profile_flights = SingleFlight()
+
+# Stale-while-revalidate refreshes running in this process
+_background_tasks: Set[asyncio.Task] = set()
+# Rate limit lane charged by API calls in this task; background refreshes and
+# cache warming use PRIORITY_BACKGROUND
+_priority: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "instagram_priority", default=PRIORITY_INTERACTIVE
+)
+# Tokens reserved for the job running in this task (see reserve_quota)
+_reservation: contextvars.ContextVar[
+    Optional[Tuple[Credential, Reservation]]
+] = contextvars.ContextVar("instagram_reservation", default=None)
+# Credential charged by the last token acquisition in this task; the next
+# API call goes out with it
+_credential: contextvars.ContextVar[Optional[Credential]] = contextvars.ContextVar(
+    "instagram_credential", default=None
+)
+
+
+async def drain_background_refreshes(timeout: float = 30.0) -> int:
+    """
+    Wait for pending background refreshes to finish.
+
+    Callers that stop running their event loop between jobs (e.g. Celery
+    workers) use this so refreshes do not sit paused while holding a lease.
+
+    Args:
+        timeout: Maximum time to wait (seconds)
+
+    Returns:
+        Number of refreshes still running after the timeout
+    """
+    if not _background_tasks:
+        return 0
+    _, pending = await asyncio.wait(set(_background_tasks), timeout=timeout)
+    return len(pending)
+
 
 class InstagramService:
     """
     High-level service for Instagram API operations.
 
     Features:
-    - Rate limiting (200 calls/hour)
-    - Caching (profile: 6h, media: 1h)
-    - Retry logic with exponential backoff
+    - Rate limiting (180 calls/hour per credential, pooled across credentials)
+      adapted to the usage the Graph API reports
+    - Caching (profile: 6h, media: 1h), served stale while refreshing
+    - Negative caching of not-found / non-business accounts (30m)
+    - Retry logic with exponential backoff, capped by a global retry budget
+    - Circuit breaker shared across workers, failing fast during API incidents
+    - In-process coalescing of concurrent fetches
+    - Cross-worker fetch lease so one worker fills the cache per username
     - Account validation
     """
 
+    # Times to wait on another worker's fetch lease before fetching anyway
+    MAX_LEASE_WAITS = 2
+
     def __init__(
         self,
         access_token: Optional[str] = None,
         business_account_id: Optional[str] = None,
         rate_limiter: Optional[TokenBucketRateLimiter] = None,
         cache: Optional[CacheManager] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        fetch_lock: Optional[DistributedFetchLock] = None,
+        credential_pool: Optional[CredentialPool] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
     ):
-        self.client = InstagramGraphAPI(access_token, business_account_id)
-        self.rate_limiter = rate_limiter or TokenBucketRateLimiter()
+        self.credential_pool = credential_pool or CredentialPool.from_settings(
+            access_token, business_account_id, rate_limiter
+        )
+        # Bucket of the first (primary) credential
+        self.rate_limiter = self.credential_pool.limiters[
+            self.credential_pool.credentials[0].id
+        ]
+        self._http_client = http_client
+        self._clients: Dict[str, InstagramGraphAPI] = {}
         self.cache = cache or CacheManager()
+        self.fetch_lock = fetch_lock or DistributedFetchLock()
+        self.circuit_breaker = circuit_breaker or get_circuit_breaker()
+        self._flights = _profile_flights
+
+    @property
+    def client(self) -> InstagramGraphAPI:
+        """Graph API client for the credential charged last in this task"""
+        credential = _credential.get()
+        if credential is None or credential.id not in self.credential_pool.limiters:
+            credential = self.credential_pool.credentials[0]
+        client = self._clients.get(credential.id)
+        if client is None:
+            client = InstagramGraphAPI(
+                credential.access_token,
+                credential.business_account_id,
+                http_client=self._http_client,
+                rate_limiter=(
+                    self.credential_pool.limiters[credential.id]
+                    if settings.INSTAGRAM_USAGE_ADAPTIVE
+                    else None
+                ),
+            )
+            self._clients[credential.id] = client
+        return client
+
+    @staticmethod
+    def _flight_key(username: str, media_limit: int) -> tuple:
+        """Deduplication key for in-flight profile fetches"""
+        return ("profile", username.lower(), media_limit)
+
+    @staticmethod
+    def _lock_resource(username: str) -> str:
+        """Fetch lease name guarding the ig:profile:<username> cache entry"""
+        return f"profile:{username.lower()}"
 
     async def get_profile_with_cache(
-        self, username: str, media_limit: int = 20, use_cache: bool = True
+        self,
+        username: str,
+        media_limit: int = 20,
+        use_cache: bool = True,
+        known_media: Optional[List[InstagramMedia]] = None,
     ) -> InstagramProfile:
         """
         Get profile with caching and rate limiting.
@@ -53,35 +189,986 @@ class InstagramService:
             username: Instagram username
             media_limit: Number of media posts to fetch
             use_cache: Whether to use cached data
+            known_media: Media already stored for this profile (e.g. from
+                MediaSnapshot). When given, a fetch only pages back until it
+                reaches these posts and merges the new ones into them.
 
         Returns:
             InstagramProfile object
         """
         logger.info("Getting profile", username=username, use_cache=use_cache)
 
-        # Check cache first
         if use_cache:
-            cached = await self.cache.get_profile(username)
-            if cached:
+            error = await self._cached_error(username)
+            if error:
+                raise error
+
+        if not use_cache:
+            return await self._load_profile(
+                username, media_limit, use_cache=False, known_media=known_media
+            )
+
+        # Concurrent callers for the same profile share one cache miss/API call
+        return await self._flights.do(
+            self._flight_key(username, media_limit),
+            lambda: self._load_profile(username, media_limit, known_media=known_media),
+        )
+
+    async def _load_profile(
+        self,
+        username: str,
+        media_limit: int,
+        use_cache: bool = True,
+        known_media: Optional[List[InstagramMedia]] = None,
+    ) -> InstagramProfile:
+        """Read through the cache, fetching only the expired parts on a miss"""
+        lease = None
+        resource = self._lock_resource(username)
+
+        if not use_cache:
+            return await self._fetch_full_profile(username, media_limit, known_media)
+
+        # Check cache first
+        profile_entry, media_entry = await self._read_cache(username)
+        cached = self._compose_cached(profile_entry, media_entry, media_limit)
+        if cached:
+            if self.cache.is_stale(profile_entry) or self.cache.is_stale(media_entry):
+                # Past the soft TTL: serve it now, refresh off the request path
+                logger.info("Serving stale profile", username=username)
+                self._schedule_refresh(username, media_limit, known_media)
+            else:
                 logger.info("Using cached profile", username=username)
-                return InstagramProfile(cached["data"])
+            return cached
+
+        # Only the lease holder across workers fetches; others wait for
+        # it to fill the cache
+        for _ in range(self.MAX_LEASE_WAITS):
+            lease = await self.fetch_lock.acquire(resource)
+            if lease is not None:
+                break
+            logger.info("Profile being fetched by another worker", username=username)
+            await self.fetch_lock.wait(resource)
+            profile_entry, media_entry = await self._read_cache(username)
+            cached = self._compose_cached(profile_entry, media_entry, media_limit)
+            if cached:
+                logger.info(
+                    "Using profile cached by another worker", username=username
+                )
+                return cached
+
+        try:
+            return await self._refresh_profile(
+                username,
+                media_limit,
+                self._fresh(profile_entry),
+                self._fresh(media_entry),
+                known_media,
+            )
+        finally:
+            if lease:
+                await self.fetch_lock.release(resource, lease)
+
+    async def _refresh_profile(
+        self,
+        username: str,
+        media_limit: int,
+        profile_entry: Optional[Dict[str, Any]],
+        media_entry: Optional[Dict[str, Any]],
+        known_media: Optional[List[InstagramMedia]] = None,
+    ) -> InstagramProfile:
+        """Fetch whichever of metadata/media has no fresh entry and cache it"""
+        try:
+            return await self._fetch_missing_parts(
+                username, media_limit, profile_entry, media_entry, known_media
+            )
+        except (AccountNotFoundError, PrivateAccountError) as e:
+            await self._remember_error(username, e)
+            raise
+
+    async def _fetch_missing_parts(
+        self,
+        username: str,
+        media_limit: int,
+        profile_entry: Optional[Dict[str, Any]],
+        media_entry: Optional[Dict[str, Any]],
+        known_media: Optional[List[InstagramMedia]] = None,
+    ) -> InstagramProfile:
+        """Metadata-only, media-only or full fetch depending on what is fresh"""
+        media_fresh = self._media_covers(media_entry, media_limit)
+
+        if profile_entry and not media_fresh:
+            # Metadata still fresh: refresh the media list only
+            media = await self._fetch_media(username, media_limit, known_media)
+            await self.cache.set_media(
+                username, self._media_cache_data(media, media_limit)
+            )
+            return self._compose(profile_entry["data"], media)
+
+        if media_fresh and not profile_entry:
+            # Media still fresh: cheap metadata-only fetch
+            await self._acquire_token()
+            meta = await self._fetch_profile(username, media_limit, include_media=False)
+            await self.cache.set_profile(username, meta.raw_data)
+            return self._compose_cached(
+                {"data": meta.raw_data}, media_entry, media_limit
+            )
+
+        profile = await self._fetch_full_profile(username, media_limit, known_media)
+        await self._cache_profile(username, profile, media_limit)
+        return profile
+
+    # --------------------
+    # Negative cache
+    # --------------------
+
+    async def _cached_error(self, username: str) -> Optional[InstagramAPIError]:
+        """The lookup error cached for a username, if any"""
+        return self._negative_error(username, await self.cache.get_negative(username))
+
+    @staticmethod
+    def _negative_error(
+        username: str, kind: Optional[str]
+    ) -> Optional[InstagramAPIError]:
+        """Rebuild the error recorded in a negative cache entry"""
+        if kind == NEGATIVE_NOT_FOUND:
+            return AccountNotFoundError(username)
+        if kind == NEGATIVE_PRIVATE:
+            return PrivateAccountError(username)
+        return None
+
+    async def _remember_error(self, username: str, error: Exception) -> None:
+        """Negative-cache errors that will not go away on a retry"""
+        if isinstance(error, AccountNotFoundError):
+            await self.cache.set_negative(username, NEGATIVE_NOT_FOUND)
+        elif isinstance(error, PrivateAccountError):
+            await self.cache.set_negative(username, NEGATIVE_PRIVATE)
+
+    # --------------------
+    # Stale-while-revalidate
+    # --------------------
+
+    def _fresh(
+        self, entry: Optional[Dict[str, Any]], margin_seconds: float = 0
+    ) -> Optional[Dict[str, Any]]:
+        """The entry if it stays within its soft TTL for margin_seconds, else None"""
+        return None if self.cache.is_stale(entry, margin_seconds) else entry
+
+    def _schedule_refresh(
+        self,
+        username: str,
+        media_limit: int,
+        known_media: Optional[List[InstagramMedia]] = None,
+    ) -> None:
+        """Start a background refresh unless one is already running here"""
+        key = ("refresh", username.lower(), media_limit)
+        if self._flights.join(key) is not None:
+            return
+
+        task = asyncio.create_task(
+            self._background_refresh(key, username, media_limit, known_media)
+        )
+        # Keep a reference so the task is not garbage collected mid-flight
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+    async def _background_refresh(
+        self,
+        key: tuple,
+        username: str,
+        media_limit: int,
+        known_media: Optional[List[InstagramMedia]],
+    ) -> None:
+        """Refresh a stale profile with spare quota; failures are only logged"""
+        # The task inherited the job's context: charge the background lane,
+        # not the job's reservation
+        _priority.set(PRIORITY_BACKGROUND)
+        _reservation.set(None)
+        try:
+            await self._flights.do(
+                key,
+                lambda: self._refresh_stale(username, media_limit, known_media),
+            )
+        except RateLimitExceeded:
+            logger.info("No spare quota for background refresh", username=username)
+        except Exception as e:
+            logger.warning(
+                "Background refresh failed", username=username, error=str(e)
+            )
+
+    async def _refresh_stale(
+        self,
+        username: str,
+        media_limit: int,
+        known_media: Optional[List[InstagramMedia]],
+        margin_seconds: float = 0,
+    ) -> Optional[InstagramProfile]:
+        """
+        Refresh the stale parts of a cached profile under the fetch lease.
+
+        Args:
+            username: Instagram username
+            media_limit: Number of media posts to cache
+            known_media: Media already stored for this profile
+            margin_seconds: Also refresh parts expiring within this many seconds
+
+        Returns:
+            The refreshed profile, or None if nothing needed refreshing or
+            another worker holds the lease
+        """
+        resource = self._lock_resource(username)
+        lease = await self.fetch_lock.acquire(resource)
+        if lease is None:
+            logger.debug("Profile already being refreshed", username=username)
+            return None
+
+        try:
+            # Another worker may have refreshed it since we read it
+            profile_entry, media_entry = await self._read_cache(username)
+            profile_entry = self._fresh(profile_entry, margin_seconds)
+            media_entry = self._fresh(media_entry, margin_seconds)
+            if self._compose_cached(profile_entry, media_entry, media_limit):
+                return None
+
+            profile = await self._refresh_profile(
+                username, media_limit, profile_entry, media_entry, known_media
+            )
+            logger.info("Stale profile refreshed", username=username)
+            return profile
+        finally:
+            if lease:
+                await self.fetch_lock.release(resource, lease)
+
+    async def _acquire_token(self, tokens: int = 1) -> None:
+        """
+        Acquire rate limit tokens for an API call.
+
+        Tokens come from the job's reservation while it lasts; whatever it
+        cannot cover comes from the bucket lane of the current priority.
+        Background refreshes and cache warming never wait.
+
+        Raises:
+            RateLimitExceeded: In the background with no spare quota
+            CircuitOpenError: If the circuit breaker is open (no tokens spent)
+        """
+        self.circuit_breaker.check()
+
+        held = _reservation.get()
+        taken = held[1].take(tokens) if held is not None else 0
+        if taken == tokens:
+            _credential.set(held[0])
+            return
+
+        priority = _priority.get()
+        try:
+            credential = await self.credential_pool.acquire(
+                tokens=tokens - taken,
+                block=priority != PRIORITY_BACKGROUND,
+                priority=priority,
+            )
+        except BaseException:
+            if taken:
+                held[1].untake(taken)
+            raise
+        _credential.set(credential)
+
+    @asynccontextmanager
+    async def reserve_quota(self, tokens: int) -> AsyncIterator[Reservation]:
+        """
+        Set rate limit tokens aside for a job up front.
+
+        API calls made inside the block draw from the reservation first, so
+        a burst of background work cannot stall the job halfway. Tokens left
+        unused are returned when the block exits, including on errors and
+        cancellation.
+
+        Args:
+            tokens: Tokens the job expects to spend; fewer may be granted if
+                the bucket is low (the rest is acquired as usual)
+
+        Yields:
+            The Reservation
+        """
+        credential, reservation = await self.credential_pool.reserve(
+            tokens, _priority.get()
+        )
+        token = _reservation.set((credential, reservation))
+        try:
+            yield reservation
+        finally:
+            _reservation.reset(token)
+            unused = await reservation.release()
+            logger.info(
+                "Rate limit reservation released",
+                granted=reservation.granted,
+                unused=unused,
+            )
+
+    async def _call_api(
+        self, call: Callable[[InstagramGraphAPI], Awaitable[T]], tokens: int = 1
+    ) -> T:
+        """
+        Make an API call with the current credential, ejecting it from the
+        pool if the Graph API rejects or throttles it.
+
+        Args:
+            call: Coroutine factory taking the client to use
+            tokens: Tokens the call was charged (re-charged to the next
+                credential when switching)
+        """
+        credential = _credential.get()
+        try:
+            async with self.circuit_breaker.guard():
+                return await call(self.client)
+        except (RateLimitError, CredentialError) as e:
+            if credential is None:
+                raise
+            if isinstance(e, RateLimitError):
+                seconds = min(
+                    e.retry_after, settings.INSTAGRAM_CREDENTIAL_EJECT_SECONDS
+                )
+            else:
+                seconds = settings.INSTAGRAM_CREDENTIAL_AUTH_EJECT_SECONDS
+            if not await self.credential_pool.eject(
+                credential, seconds, reason=str(e)
+            ):
+                raise
+            held = _reservation.get()
+            if held is not None and held[0].id == credential.id:
+                # Tokens of an ejected credential are of no use to the job
+                await held[1].release()
+
+            if self.credential_pool.size > 1:
+                try:
+                    await self._acquire_token(tokens=tokens)
+                except RateLimitExceeded:
+                    raise e
+                if isinstance(e, RateLimitError):
+                    # The retry goes out with another credential: no need to
+                    # wait out this one's throttling
+                    e.retry_after = 0
+            raise
+
+    async def _fetch_full_profile(
+        self,
+        username: str,
+        media_limit: int,
+        known_media: Optional[List[InstagramMedia]] = None,
+    ) -> InstagramProfile:
+        """Fetch metadata and media from the API"""
+        if known_media:
+            return await self._fetch_profile_incremental(
+                username, media_limit, known_media
+            )
 
         # Acquire rate limit token
-        await self.rate_limiter.acquire(tokens=1)
+        await self._acquire_token()
 
         # Fetch from API
-        profile = await self._fetch_profile(username, media_limit)
+        return await self._fetch_profile(username, media_limit)
 
-        # Cache the result
-        if use_cache:
-            await self.cache.set_profile(username, profile.raw_data)
+    async def _fetch_media(
+        self,
+        username: str,
+        media_limit: int,
+        known_media: Optional[List[InstagramMedia]] = None,
+    ) -> List[InstagramMedia]:
+        """Fetch just the media list (incrementally if media is known)"""
+        first_page = media_limit
+        if known_media:
+            first_page = min(settings.INSTAGRAM_INCREMENTAL_PAGE_SIZE, media_limit)
+
+        await self._acquire_token()
+        page, after = await self._fetch_media_page(username, first_page, None)
+
+        if not known_media:
+            return page
+        return await self._page_until_known(
+            username, page, after, media_limit, known_media
+        )
+
+    # --------------------
+    # Split profile/media cache helpers
+    # --------------------
+
+    async def _read_cache(
+        self, username: str
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Read the profile metadata and media cache entries (one round-trip)"""
+        entries = (await self.cache.get_profiles([username]))[username]
+        return entries["profile"], entries["media"]
 
+    @staticmethod
+    def _media_covers(media_entry: Optional[Dict[str, Any]], media_limit: int) -> bool:
+        """Whether a cached media entry holds enough posts for media_limit"""
+        if not media_entry:
+            return False
+        data = media_entry["data"]
+        return data.get("limit", 0) >= media_limit or len(data["data"]) >= media_limit
+
+    @classmethod
+    def _compose_cached(
+        cls,
+        profile_entry: Optional[Dict[str, Any]],
+        media_entry: Optional[Dict[str, Any]],
+        media_limit: int,
+    ) -> Optional[InstagramProfile]:
+        """Build a profile from cache entries, or None if a part is missing"""
+        if not profile_entry:
+            return None
+
+        data = profile_entry["data"]
+        if cls._media_covers(media_entry, media_limit):
+            cached = media_entry["data"]
+            media = {"data": cached["data"][:media_limit]}
+            if cached.get("after") and len(media["data"]) == len(cached["data"]):
+                # The cursor continues right after the last cached post
+                media["paging"] = {"cursors": {"after": cached["after"]}}
+            return InstagramProfile({**data, "media": media})
+
+        # Entries cached before profile and media were split embed the media
+        if "media" in data:
+            return InstagramProfile(data)
+        return None
+
+    @staticmethod
+    def _compose(
+        profile_data: Dict[str, Any], media: List[InstagramMedia]
+    ) -> InstagramProfile:
+        """Build a profile from metadata and a media list"""
+        profile_data = {k: v for k, v in profile_data.items() if k != "media"}
+        return InstagramProfile(
+            {**profile_data, "media": {"data": [m.raw_data for m in media]}}
+        )
+
+    @staticmethod
+    def _media_cache_data(
+        media: List[InstagramMedia], media_limit: int, after: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Media cache payload; `limit` records how many posts were asked for,
+        `after` the cursor of the page following them, if known.
+        """
+        payload = {"data": [m.raw_data for m in media], "limit": media_limit}
+        if after:
+            payload["after"] = after
+        return payload
+
+    async def _cache_profile(
+        self, username: str, profile: InstagramProfile, media_limit: int
+    ) -> None:
+        """Cache metadata and media separately so each keeps its own TTL"""
+        await self._cache_profiles({username: profile}, media_limit)
+
+    async def _cache_profiles(
+        self, profiles: Dict[str, InstagramProfile], media_limit: int
+    ) -> None:
+        """Cache metadata and media for many profiles in one pipeline"""
+        if not profiles:
+            return
+        metadata = {
+            username: {k: v for k, v in p.raw_data.items() if k != "media"}
+            for username, p in profiles.items()
+        }
+        media = {
+            username: self._media_cache_data(
+                p.media, media_limit, p.media_after_cursor
+            )
+            for username, p in profiles.items()
+        }
+        await self.cache.set_profiles(metadata, media)
+
+    async def _fetch_profile_incremental(
+        self, username: str, media_limit: int, known_media: List[InstagramMedia]
+    ) -> InstagramProfile:
+        """Fetch profile metadata plus only the media newer than known_media"""
+        page_size = min(settings.INSTAGRAM_INCREMENTAL_PAGE_SIZE, media_limit)
+
+        await self._acquire_token()
+        profile = await self._fetch_profile(username, page_size)
+
+        return await self._complete_incremental(
+            username, profile, media_limit, known_media
+        )
+
+    async def _complete_incremental(
+        self,
+        username: str,
+        profile: InstagramProfile,
+        media_limit: int,
+        known_media: List[InstagramMedia],
+    ) -> InstagramProfile:
+        """Complete a profile fetched with a small first media page"""
+        merged = await self._page_until_known(
+            username,
+            profile.media,
+            profile.media_after_cursor,
+            media_limit,
+            known_media,
+        )
+
+        profile.media = merged
+        profile.media_after_cursor = None
+        profile.raw_data["media"] = {"data": [m.raw_data for m in merged]}
         return profile
 
+    async def _page_until_known(
+        self,
+        username: str,
+        first_page: List[InstagramMedia],
+        after: Optional[str],
+        media_limit: int,
+        known_media: List[InstagramMedia],
+    ) -> List[InstagramMedia]:
+        """
+        Page back from the first media page until known media is reached,
+        then merge the new posts into the known ones.
+
+        Known posts that show up again carry fresh like/comment counters and
+        replace the stored versions.
+        """
+        fetched = list(first_page)
+        pages = 1
+
+        while (
+            after
+            and len(fetched) < media_limit
+            and not self._reaches_known(fetched, known_media)
+        ):
+            await self._acquire_token()
+            page, after = await self._fetch_media_page(
+                username, min(25, media_limit - len(fetched)), after
+            )
+            if not page:
+                break
+            fetched.extend(page)
+            pages += 1
+
+        known_ids = {m.id for m in known_media}
+        logger.info(
+            "Incremental media refresh",
+            username=username,
+            pages=pages,
+            new_posts=sum(m.id not in known_ids for m in fetched),
+            refreshed_posts=sum(m.id in known_ids for m in fetched),
+        )
+        return self._merge_media(fetched, known_media, media_limit)
+
+    @staticmethod
+    def _reaches_known(
+        fetched: List[InstagramMedia], known_media: List[InstagramMedia]
+    ) -> bool:
+        """Whether fetched pages have reached posts we already have"""
+        known_ids = {m.id for m in known_media}
+        known_dates = [m.posted_at for m in known_media if m.posted_at]
+        newest_known = max(known_dates) if known_dates else None
+
+        for media in fetched:
+            if media.id in known_ids:
+                return True
+            if newest_known and media.posted_at and media.posted_at <= newest_known:
+                return True
+        return False
+
+    @staticmethod
+    def _merge_media(
+        fetched: List[InstagramMedia],
+        known_media: List[InstagramMedia],
+        limit: int,
+    ) -> List[InstagramMedia]:
+        """Merge fetched media over known media, newest first"""
+        by_id = {m.id: m for m in known_media}
+        by_id.update({m.id: m for m in fetched})  # Fresh counters win
+
+        oldest = datetime.min.replace(tzinfo=timezone.utc)
+        merged = sorted(
+            by_id.values(), key=lambda m: m.posted_at or oldest, reverse=True
+        )
+        return merged[:limit]
+
+    async def get_profiles_with_cache(
+        self,
+        usernames: List[str],
+        media_limit: int = 20,
+        use_cache: bool = True,
+        known_media: Optional[Dict[str, List[InstagramMedia]]] = None,
+    ) -> Dict[str, Union[InstagramProfile, InstagramAPIError]]:
+        """
+        Get several profiles, packing cache misses into Graph API batch requests.
+
+        One rate limit token is charged per batched sub-request, since the
+        Graph API counts each of them as a separate call.
+
+        Args:
+            usernames: Instagram usernames
+            media_limit: Number of media posts to fetch per profile
+            use_cache: Whether to use cached data
+            known_media: Media already stored per username; those profiles
+                are refreshed incrementally (see get_profile_with_cache)
+
+        Returns:
+            Dict mapping each username to an InstagramProfile, or to the
+            InstagramAPIError (e.g. AccountNotFoundError, PrivateAccountError)
+            returned for that username
+        """
+        logger.info("Getting profiles", count=len(usernames), use_cache=use_cache)
+
+        results: Dict[str, Union[InstagramProfile, InstagramAPIError]] = {}
+        misses: List[str] = []
+        partial: List[str] = []
+
+        unique = list(dict.fromkeys(usernames))
+        # Every cache hit for the job in one round-trip, before planning misses
+        entries = await self.cache.get_profiles(unique) if use_cache else {}
+
+        for username in unique:
+            if use_cache:
+                error = self._negative_error(username, entries[username]["negative"])
+                if error:
+                    results[username] = error
+                    continue
+                profile_entry = entries[username]["profile"]
+                media_entry = entries[username]["media"]
+                cached = self._compose_cached(profile_entry, media_entry, media_limit)
+                if cached:
+                    if self.cache.is_stale(profile_entry) or self.cache.is_stale(
+                        media_entry
+                    ):
+                        self._schedule_refresh(
+                            username,
+                            media_limit,
+                            (known_media or {}).get(username),
+                        )
+                    results[username] = cached
+                    continue
+                if profile_entry or media_entry:
+                    partial.append(username)
+            misses.append(username)
+
+        # Misses already being fetched elsewhere in this process are joined
+        # instead of being fetched again
+        joined: Dict[str, asyncio.Future] = {}
+        leading: Dict[str, asyncio.Future] = {}
+        leases: Dict[str, str] = {}
+        individual: List[str] = []
+        if use_cache:
+            for username in misses:
+                key = self._flight_key(username, media_limit)
+                fut = self._flights.join(key)
+                if fut is not None:
+                    joined[username] = fut
+                else:
+                    leading[username] = self._flights.lead(key)
+            to_fetch = []
+        else:
+            to_fetch = misses
+
+        try:
+            # Misses being fetched by another worker are left to that worker,
+            # and profiles with only one expired cache part are refreshed on
+            # their own (a metadata- or media-only call)
+            for username in leading:
+                if username in partial:
+                    individual.append(username)
+                    continue
+                lease = await self.fetch_lock.acquire(self._lock_resource(username))
+                if lease is None:
+                    individual.append(username)
+                else:
+                    leases[username] = lease
+                    to_fetch.append(username)
+
+            batch_size = self.client.MAX_BATCH_SIZE
+            for start in range(0, len(to_fetch), batch_size):
+                chunk = to_fetch[start : start + batch_size]
+
+                # One token per sub-request
+                await self._acquire_token(tokens=len(chunk))
+
+                first_pages = self._first_page_limits(chunk, media_limit, known_media)
+                fetched = await self._fetch_profiles_batch(
+                    chunk, media_limit, media_limits=first_pages
+                )
+                to_cache: Dict[str, InstagramProfile] = {}
+                for username, outcome in fetched.items():
+                    known = (known_media or {}).get(username)
+                    if known and isinstance(outcome, InstagramProfile):
+                        try:
+                            outcome = await self._complete_incremental(
+                                username, outcome, media_limit, known
+                            )
+                        except InstagramAPIError as e:
+                            outcome = e
+                    results[username] = outcome
+                    if use_cache and isinstance(outcome, InstagramProfile):
+                        to_cache[username] = outcome
+                    elif use_cache:
+                        await self._remember_error(username, outcome)
+                    self._settle_flight(leading, username, media_limit, outcome)
+                await self._cache_profiles(to_cache, media_limit)
+
+            outcomes = await asyncio.gather(
+                *(
+                    self._load_profile_outcome(
+                        u, media_limit, (known_media or {}).get(u)
+                    )
+                    for u in individual
+                )
+            )
+            for username, outcome in zip(individual, outcomes):
+                results[username] = outcome
+                self._settle_flight(leading, username, media_limit, outcome)
+
+            # Never leave joiners hanging on a sub-response that never came
+            for username, fut in leading.items():
+                if not fut.done():
+                    error = InstagramAPIError("Missing batch sub-response")
+                    results[username] = error
+                    self._settle_flight(leading, username, media_limit, error)
+        except BaseException as e:
+            for username, fut in leading.items():
+                self._flights.reject(self._flight_key(username, media_limit), fut, e)
+            raise
+        finally:
+            for username, lease in leases.items():
+                await self.fetch_lock.release(self._lock_resource(username), lease)
+
+        for username, fut in joined.items():
+            results[username] = await self._join_flight(username, media_limit, fut)
+
+        logger.info(
+            "Profiles resolved",
+            requested=len(results),
+            api_fetched=len(to_fetch),
+            coalesced=len(joined),
+        )
+        return results
+
+    @staticmethod
+    def _first_page_limits(
+        usernames: List[str],
+        media_limit: int,
+        known_media: Optional[Dict[str, List[InstagramMedia]]],
+    ) -> Dict[str, int]:
+        """Smaller first media page for profiles refreshed incrementally"""
+        page_size = min(settings.INSTAGRAM_INCREMENTAL_PAGE_SIZE, media_limit)
+        return {u: page_size for u in usernames if (known_media or {}).get(u)}
+
+    def _settle_flight(
+        self,
+        leading: Dict[str, asyncio.Future],
+        username: str,
+        media_limit: int,
+        outcome: Union[InstagramProfile, InstagramAPIError],
+    ) -> None:
+        """Publish a batch outcome to in-process waiters, if we lead that fetch"""
+        fut = leading.get(username)
+        if fut is None:
+            return
+        key = self._flight_key(username, media_limit)
+        if isinstance(outcome, InstagramProfile):
+            self._flights.resolve(key, fut, outcome)
+        else:
+            self._flights.reject(key, fut, outcome)
+
+    async def _load_profile_outcome(
+        self,
+        username: str,
+        media_limit: int,
+        known_media: Optional[List[InstagramMedia]] = None,
+    ) -> Union[InstagramProfile, InstagramAPIError]:
+        """_load_profile, returning API errors instead of raising them"""
+        try:
+            return await self._load_profile(
+                username, media_limit, known_media=known_media
+            )
+        except InstagramAPIError as e:
+            return e
+
+    async def _join_flight(
+        self, username: str, media_limit: int, fut: asyncio.Future
+    ) -> Union[InstagramProfile, InstagramAPIError]:
+        """Wait for another caller's fetch of a profile"""
+        try:
+            return await self._flights.wait(fut)
+        except InstagramAPIError as e:
+            return e
+        except asyncio.CancelledError:
+            if not fut.cancelled():
+                raise
+
+        # The other fetch was cancelled: fetch it ourselves
+        try:
+            return await self.get_profile_with_cache(username, media_limit)
+        except InstagramAPIError as e:
+            return e
+
     @with_retry(max_retries=3, base_delay=2.0)
-    async def _fetch_profile(self, username: str, media_limit: int) -> InstagramProfile:
+    async def _fetch_profile(
+        self, username: str, media_limit: int, include_media: bool = True
+    ) -> InstagramProfile:
         """Internal method to fetch profile with retry logic"""
-        return await self.client.get_profile(username, media_limit)
+        return await self._call_api(
+            lambda client: client.get_profile(
+                username, media_limit, include_media=include_media
+            )
+        )
+
+    async def iter_media_pages(
+        self,
+        username: str,
+        max_posts: Optional[int] = None,
+        since: Optional[datetime] = None,
+        page_size: Optional[int] = None,
+        after: Optional[str] = None,
+    ) -> AsyncIterator[List[InstagramMedia]]:
+        """
+        Lazily page through a profile's media, newest first.
+
+        Follows the media `after` cursors beyond the single Business Discovery
+        page, taking one rate limit token per page, so deep analyses can
+        stream hundreds of posts without loading them all up front.
+
+        Args:
+            username: Instagram username
+            max_posts: Stop after yielding this many posts (None = no limit)
+            since: Stop at the first post older than this
+            page_size: Posts per API call (max 25)
+            after: Cursor to continue from (e.g. a profile's
+                media_after_cursor; None = newest post)
+
+        Yields:
+            Lists of InstagramMedia, one per fetched page
+        """
+        page_size = min(page_size or settings.INSTAGRAM_MEDIA_PAGE_SIZE, 25)
+        if since is not None and since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+
+        yielded = 0
+
+        while max_posts is None or yielded < max_posts:
+            limit = page_size
+            if max_posts is not None:
+                limit = min(page_size, max_posts - yielded)
+
+            await self._acquire_token()
+            page, after = await self._fetch_media_page(username, limit, after)
+
+            reached_since = False
+            if since is not None:
+                recent = [
+                    m for m in page if m.posted_at is None or m.posted_at >= since
+                ]
+                reached_since = len(recent) < len(page)
+                page = recent
+
+            if page:
+                yielded += len(page)
+                yield page
+
+            if reached_since or not after or not page:
+                break
+
+        logger.info("Media paging finished", username=username, posts=yielded)
+
+    @with_retry(max_retries=3, base_delay=2.0)
+    async def _fetch_media_page(
+        self, username: str, limit: int, after: Optional[str]
+    ) -> Tuple[List[InstagramMedia], Optional[str]]:
+        """Internal method to fetch one media page with retry logic"""
+        return await self._call_api(
+            lambda client: client.get_media_page(username, limit=limit, after=after)
+        )
+
+    @with_retry(max_retries=3, base_delay=2.0)
+    async def _fetch_profiles_batch(
+        self,
+        usernames: List[str],
+        media_limit: int,
+        media_limits: Optional[Dict[str, int]] = None,
+    ) -> Dict[str, Union[InstagramProfile, InstagramAPIError]]:
+        """Internal method to fetch a batch of profiles with retry logic"""
+        return await self._call_api(
+            lambda client: client.get_profiles_batch(
+                usernames, media_limit, media_limits=media_limits
+            ),
+            tokens=len(usernames),
+        )
+
+    async def warm_profiles(
+        self,
+        usernames: List[str],
+        media_limit: int = 20,
+        margin_seconds: Optional[float] = None,
+        known_media: Optional[Dict[str, List[InstagramMedia]]] = None,
+    ) -> Dict[str, int]:
+        """
+        Refresh cached profiles that are missing, stale or about to expire.
+
+        Usernames are refreshed in the given order (most important first)
+        from the background rate limit lane until it runs dry; the bucket is
+        never waited on.
+
+        Args:
+            usernames: Usernames to keep warm, highest priority first
+            media_limit: Number of media posts to cache per profile
+            margin_seconds: Refresh entries expiring within this many seconds
+                (default: CACHE_WARM_MARGIN_MINUTES)
+            known_media: Media already stored per username (incremental refresh)
+
+        Returns:
+            Dict with "candidates", "due", "refreshed" and "failed" counts
+        """
+        if margin_seconds is None:
+            margin_seconds = settings.CACHE_WARM_MARGIN_MINUTES * 60
+
+        entries = await self.cache.get_profiles(usernames)
+        due = [
+            u
+            for u in usernames
+            if not entries[u]["negative"]
+            and not self._compose_cached(
+                self._fresh(entries[u]["profile"], margin_seconds),
+                self._fresh(entries[u]["media"], margin_seconds),
+                media_limit,
+            )
+        ]
+
+        refreshed = failed = 0
+        token = _priority.set(PRIORITY_BACKGROUND)
+        try:
+            for username in due:
+                try:
+                    profile = await self._flights.do(
+                        ("refresh", username.lower(), media_limit),
+                        lambda: self._refresh_stale(
+                            username,
+                            media_limit,
+                            (known_media or {}).get(username),
+                            margin_seconds,
+                        ),
+                    )
+                except RateLimitExceeded:
+                    logger.info("Cache warming stopped, background lane empty")
+                    break
+                except InstagramAPIError as e:
+                    logger.warning(
+                        "Cache warming failed", username=username, error=str(e)
+                    )
+                    failed += 1
+                    continue
+                if profile is not None:
+                    refreshed += 1
+        finally:
+            _priority.reset(token)
+
+        summary = {
+            "candidates": len(usernames),
+            "due": len(due),
+            "refreshed": refreshed,
+            "failed": failed,
+        }
+        logger.info("Cache warming complete", **summary)
+        return summary
 
     async def validate_account(self, username: str) -> Dict[str, Any]:
         """
@@ -92,15 +1179,34 @@ class InstagramService:
         """
         logger.info("Validating account", username=username)
 
-        try:
-            await self.rate_limiter.acquire(tokens=1)
-            result = await self.client.validate_account(username)
+        error = await self._cached_error(username)
+        if error:
             logger.info(
-                "Account validation complete",
-                username=username,
-                valid=result.get("valid"),
+                "Account validation served from negative cache", username=username
+            )
+            return self.client.validation_failure(error)
+
+        try:
+            await self._acquire_token()
+            profile = await self._call_api(
+                lambda client: client.get_profile(
+                    username, media_limit=0, include_media=False
+                )
             )
-            return result
+            result = self.client.validation_success(profile)
+        except CircuitOpenError as e:
+            logger.warning("Circuit breaker open during validation", username=username)
+            return {
+                "valid": False,
+                "exists": None,
+                "is_business": None,
+                "error": (
+                    "Instagram API temporarily unavailable. "
+                    f"Retry after {math.ceil(e.retry_after)}s"
+                ),
+            }
+        except InstagramAPIError as e:
+            result = self.client.validation_error(e)
         except RateLimitExceeded as e:
             logger.warning("Rate limit exceeded during validation", username=username)
             return {
@@ -110,15 +1216,29 @@ class InstagramService:
                 "error": str(e),
             }
 
+        if result.get("exists") is False:
+            await self.cache.set_negative(username, NEGATIVE_NOT_FOUND)
+        elif result.get("exists") and result.get("is_business") is False:
+            await self.cache.set_negative(username, NEGATIVE_PRIVATE)
+        logger.info(
+            "Account validation complete",
+            username=username,
+            valid=result.get("valid"),
+        )
+        return result
+
     async def invalidate_cache(self, username: str) -> None:
         """Invalidate cached data for a username"""
         await self.cache.invalidate_profile(username)
         await self.cache.invalidate_media(username)
+        await self.cache.invalidate_negative(username)
         logger.info("Cache invalidated", username=username)
 
     async def get_rate_limit_status(self) -> Dict[str, Any]:
-        """Get current rate limit status"""
-        return await self.rate_limiter.get_status()
+        """Get current rate limit status (summed over the credential pool)"""
+        status = await self.credential_pool.get_status()
+        status["circuit_breaker"] = await self.circuit_breaker.get_status()
+        return status
 
     async def get_cache_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
@@ -0,0 +1,106 @@
+"""In-process request coalescing ("singleflight") for Instagram fetches
+
+Concurrent callers asking for the same key share one in-flight future, so a
+burst of lookups for one username costs a single cache miss, rate limit token
+and API call. The first result or error fans out to every waiter.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+import structlog
+
+logger = structlog.get_logger()
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Deduplicate concurrent async calls that share a key"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    def join(self, key: Hashable) -> Optional[asyncio.Future]:
+        """
+        Get the in-flight future for a key, if any.
+
+        Futures belong to the loop that created them; one left over from
+        another (e.g. closed) loop is ignored.
+        """
+        fut = self._calls.get(key)
+        if fut is None or fut.done():
+            return None
+        if fut.get_loop() is not asyncio.get_running_loop():
+            return None
+        return fut
+
+    def lead(self, key: Hashable) -> asyncio.Future:
+        """Register the caller as the one doing the work for a key"""
+        fut = asyncio.get_running_loop().create_future()
+        # Mark errors as retrieved even when nobody else was waiting
+        fut.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._calls[key] = fut
+        return fut
+
+    def resolve(self, key: Hashable, fut: asyncio.Future, result: Any) -> None:
+        """Publish a result to every waiter and forget the key"""
+        if not fut.done():
+            fut.set_result(result)
+        self._forget(key, fut)
+
+    def reject(self, key: Hashable, fut: asyncio.Future, error: BaseException) -> None:
+        """Publish an error to every waiter and forget the key"""
+        if not fut.done():
+            if isinstance(error, asyncio.CancelledError):
+                # Waiters see a cancelled future and take over the work
+                fut.cancel()
+            else:
+                fut.set_exception(error)
+        self._forget(key, fut)
+
+    def _forget(self, key: Hashable, fut: asyncio.Future) -> None:
+        if self._calls.get(key) is fut:
+            del self._calls[key]
+
+    async def wait(self, fut: asyncio.Future) -> Any:
+        """
+        Wait for another caller's future without cancelling it.
+
+        Raises:
+            asyncio.CancelledError: If the caller is cancelled or the leading
+                call was cancelled (check fut.cancelled() to tell them apart)
+        """
+        return await asyncio.shield(fut)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run fn() once per key among concurrent callers.
+
+        Args:
+            key: Deduplication key
+            fn: Zero-argument coroutine factory doing the actual work
+
+        Returns:
+            The (shared) result of fn()
+        """
+        while True:
+            fut = self.join(key)
+            if fut is None:
+                break
+            try:
+                logger.debug("Joining in-flight call", key=str(key))
+                return await self.wait(fut)
+            except asyncio.CancelledError:
+                if fut.cancelled():
+                    # The leader was cancelled, not us: retry as leader
+                    continue
+                raise
+
+        fut = self.lead(key)
+        try:
+            result = await fn()
+        except BaseException as e:
+            self.reject(key, fut, e)
+            raise
+        self.resolve(key, fut, result)
+        return result
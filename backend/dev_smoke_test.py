@@ -11,7 +11,7 @@ from typing import Any, Dict, List
 from datetime import datetime, timedelta
 
 from app.services.analysis.orchestrator import AnalysisOrchestrator
-from app.services.instagram.client import InstagramProfile
+from app.services.instagram.client import AccountNotFoundError, InstagramProfile
 from app.db.database import AsyncSession
 
 
@@ -35,6 +35,9 @@ def test_fastapi_health() -> None:
 # Orchestrator smoke test
 # ----------------------
 class FakeInstagramService:
+    # 피처 캐시 비활성화
+    cache = None
+
     def __init__(self) -> None:
         now = datetime.utcnow()
         # 브랜드 프로필(해시태그 분포 유도용)
@@ -103,11 +106,35 @@ class FakeInstagramService:
             }
         )
 
-    async def get_profile_with_cache(self, username: str, media_limit: int = 20, use_cache: bool = True) -> InstagramProfile:
+    async def get_profile_with_cache(self, username: str, media_limit: int = 20, use_cache: bool = True, known_media=None) -> InstagramProfile:
         if username == "brandx":
             return self.brand_profile
+        if username == "missing":
+            raise AccountNotFoundError(username)
         return self.influencer_profile
 
+    async def get_profiles_with_cache(
+        self,
+        usernames: List[str],
+        media_limit: int = 20,
+        use_cache: bool = True,
+        known_media=None,
+    ) -> Dict[str, Any]:
+        # 일괄 조회 실패 시 개별 조회로 대체되는지 확인
+        return {}
+
+    async def iter_media_pages(
+        self,
+        username: str,
+        max_posts=None,
+        since=None,
+        page_size=None,
+        after=None,
+    ):
+        # 첫 페이지 이후 추가 게시물 없음
+        return
+        yield
+
 
 def test_orchestrator_pipeline() -> None:
     fake_ig = FakeInstagramService()
@@ -133,6 +160,104 @@ def test_orchestrator_pipeline() -> None:
     assert 0 <= infl["scores"]["final_score"] <= 100
 
 
+def test_orchestrator_run_pipeline() -> None:
+    import asyncio
+
+    fake_ig = FakeInstagramService()
+    batches: List[List[str]] = []
+
+    async def persist(batch):
+        batches.append([item.username for item in batch])
+        return batch
+
+    async def run() -> None:
+        orch = AnalysisOrchestrator(fake_ig, db_session=None)  # type: ignore
+        brand, results = await orch.run_pipeline(
+            "brandx", ["influencer_a", "missing"], persist
+        )
+        assert brand["username"] == "brandx"
+        # 실패한 인플루언서는 건너뜀
+        assert [r["username"] for r in results] == ["influencer_a"]
+        assert batches and batches[0][0] == "brandx"
+
+        # 브랜드 실패 시 파이프라인 전체가 실패하고 남은 작업이 없어야 함
+        orch = AnalysisOrchestrator(fake_ig, db_session=None)  # type: ignore
+        try:
+            await orch.run_pipeline("missing", ["influencer_a"], persist)
+        except AccountNotFoundError:
+            pass
+        else:
+            raise AssertionError("run_pipeline() should fail without a brand")
+        pending = asyncio.all_tasks() - {asyncio.current_task()}
+        assert not pending, pending
+
+    asyncio.run(run())
+
+
+# ----------------------
+# Credential pool smoke test
+# ----------------------
+def test_credential_pool_without_active_credentials() -> None:
+    import asyncio
+    from app.services.instagram.credentials import (
+        Credential,
+        CredentialPool,
+        NoActiveCredentialsError,
+    )
+
+    only = Credential.create("token", "1234")
+    pool = CredentialPool([only])
+
+    async def run() -> None:
+        async def last_one() -> List[Credential]:
+            return [only]
+
+        async def none() -> List[Credential]:
+            return []
+
+        # 마지막 남은 자격 증명은 제외하지 않음
+        pool._active = last_one  # type: ignore
+        assert await pool.eject(only, 3600, reason="expired") is False
+
+        # 모두 제외된 경우 대기하지 않고 즉시 실패
+        pool._active = none  # type: ignore
+        try:
+            await asyncio.wait_for(pool.acquire(block=True), timeout=1)
+        except NoActiveCredentialsError:
+            return
+        raise AssertionError("acquire() should fail without active credentials")
+
+    asyncio.run(run())
+
+
+# ----------------------
+# Circuit breaker smoke test
+# ----------------------
+def test_validate_account_with_open_breaker() -> None:
+    import asyncio
+    import time
+    from app.services.instagram import CircuitBreaker, InstagramService
+
+    class NoNegativeCache:
+        async def get_negative(self, username: str) -> None:
+            return None
+
+    breaker = CircuitBreaker(name="smoke")
+    # 차단기가 열린 상태: API 호출 없이 실패해야 함
+    breaker._open_until = time.time() + 30
+    service = InstagramService(
+        access_token="token",
+        business_account_id="1234",
+        cache=NoNegativeCache(),  # type: ignore
+        circuit_breaker=breaker,
+    )
+
+    result = asyncio.run(service.validate_account("influencer_a"))
+    assert result["valid"] is False
+    assert result["exists"] is None
+    assert "Retry after" in result["error"]
+
+
 if __name__ == "__main__":
     print("[SMOKE] FastAPI health...")
     test_fastapi_health()
@@ -142,5 +267,17 @@ if __name__ == "__main__":
     test_orchestrator_pipeline()
     print("[OK] Orchestrator")
 
+    print("[SMOKE] Orchestrator staged pipeline...")
+    test_orchestrator_run_pipeline()
+    print("[OK] Staged pipeline")
+
+    print("[SMOKE] Credential pool...")
+    test_credential_pool_without_active_credentials()
+    print("[OK] Credential pool")
+
+    print("[SMOKE] Validation with open circuit breaker...")
+    test_validate_account_with_open_breaker()
+    print("[OK] Circuit breaker")
+
     print("All smoke tests passed.")
 
@@ -10,6 +10,8 @@ from app.core.middleware import (
 )
 from app.api.router import api_router
 from app.db.database import get_engine, dispose_engine_if_exists, Base
+from app.services.instagram.http import close_http_client
+from app.services.instagram.rate_limiter import close_wakeup_listener
 import structlog
 
 logger = structlog.get_logger()
@@ -38,6 +40,14 @@ async def lifespan(app: FastAPI):
         await dispose_engine_if_exists()
     except Exception as e:
         logger.warning("Error disposing engine", error=str(e))
+    try:
+        await close_wakeup_listener()
+    except Exception as e:
+        logger.warning("Error closing rate limit wake-up listener", error=str(e))
+    try:
+        await close_http_client()
+    except Exception as e:
+        logger.warning("Error closing Instagram HTTP client", error=str(e))
 
 
 app = FastAPI(